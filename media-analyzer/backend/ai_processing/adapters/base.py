@@ -1,5 +1,18 @@
+import threading
 from abc import ABC, abstractmethod
 
+_failures = threading.local()
+
+
+def record_detection_failure():
+    """Note a detection whose error was swallowed and returned as no detections"""
+    _failures.count = detection_failures() + 1
+
+
+def detection_failures() -> int:
+    """Detection failures recorded on this thread; compare before and after a call"""
+    return getattr(_failures, 'count', 0)
+
 
 class DetectionAdapter(ABC):
     """Base class for detection adapters (image-based analysis)"""
@@ -13,6 +26,15 @@ class DetectionAdapter(ABC):
         [{'label': str, 'confidence': float, 'bbox': {'x': float, 'y': float, 'width': float, 'height': float}}]
         """
         pass
+    
+    def detect_batch(self, images, confidence_threshold=0.5):
+        """
+        Detect features in several images
+        
+        Returns: List of detection result lists, one per image.
+        Adapters with a batched forward pass override this.
+        """
+        return [self.detect(image, confidence_threshold) for image in images]
 
 
 class VideoAnalysisAdapter(ABC):
@@ -26,6 +48,14 @@ class VideoAnalysisAdapter(ABC):
         Returns: Dict of analysis results
         """
         pass
+    
+    def create_frame_analyzer(self, **kwargs):
+        """
+        Streaming analyzer fed by a shared SegmentDecoder (see segment_decoder.FrameSubscriber)
+        
+        Returns None when the adapter has to read the video file itself.
+        """
+        return None
 
 
 class AdapterFactory(ABC):
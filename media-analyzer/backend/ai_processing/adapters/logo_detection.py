@@ -1,23 +1,34 @@
 import logging
-from .base import DetectionAdapter, AdapterFactory
-import io
+import numpy as np
+from .base import DetectionAdapter, AdapterFactory, record_detection_failure
+from ..model_pool import model_pool
+from ..onnx_models import get_session
+from ..frame import as_frame
+from ..brand_embeddings import brand_embeddings
+from ..batching import batchers
 
 logger = logging.getLogger(__name__)
 
 
+def load_clip(model_identifier):
+    """Load CLIP model (eval mode) and processor"""
+    from transformers import CLIPProcessor, CLIPModel
+    model = CLIPModel.from_pretrained(model_identifier)
+    model.eval()
+    return model, CLIPProcessor.from_pretrained(model_identifier)
+
+
 class GCPLogoDetectionAdapter(DetectionAdapter):
     """Google Cloud Vision logo detection"""
     
     def __init__(self):
         from google.cloud import vision
-        self.client = vision.ImageAnnotatorClient()
+        self.client = model_pool.get(('gcp_vision', 'client'), vision.ImageAnnotatorClient, size_mb=0)
     
     def detect(self, image, confidence_threshold=0.5):
         try:
-            # Convert image to bytes
-            img_byte_arr = io.BytesIO()
-            image.save(img_byte_arr, format='JPEG')
-            image_bytes = img_byte_arr.getvalue()
+            # Encode straight from the frame buffer
+            image_bytes = as_frame(image).to_jpeg()
             
             # GCP Vision API call
             from google.cloud import vision
@@ -51,6 +62,7 @@ class GCPLogoDetectionAdapter(DetectionAdapter):
             
         except Exception as e:
             logger.error(f"GCP logo detection error: {e}")
+            record_detection_failure()
             return []
 
 
@@ -63,86 +75,164 @@ class CLIPLogoDetectionAdapter(DetectionAdapter):
         self.processor = None
         
     def _load_model(self):
-        if not self.model:
-            from transformers import CLIPProcessor, CLIPModel
-            self.model = CLIPModel.from_pretrained(self.model_identifier)
-            self.processor = CLIPProcessor.from_pretrained(self.model_identifier)
+        """
+        Fetch (model, processor) from the resident model pool and return them
+        
+        Callers work on the returned pair, never on self.model/self.processor: the
+        adapter of the task that created a batcher serves other tasks after its own cleanup().
+        """
+        model, processor = model_pool.get(
+            ('clip', self.model_identifier), lambda: load_clip(self.model_identifier)
+        )
+        self.model, self.processor = model, processor
+        return model, processor
     
     def cleanup(self):
-        """Release model and processor memory"""
-        if self.model:
-            del self.model
-            self.model = None
-        if self.processor:
-            del self.processor
-            self.processor = None
-        
-        import torch
-        import gc
-        if torch.cuda.is_available():
-            torch.cuda.empty_cache()
-        gc.collect()
+        """Drop references to pooled model (weights stay resident in the pool)"""
+        self.model = None
+        self.processor = None
     
     def detect(self, image, confidence_threshold=0.5):
         try:
-            self._load_model()
-            from ..models import Brand
-            
-            # Get active brands from database
-            active_brands = Brand.objects.filter(active=True)
-            if not active_brands.exists():
-                return []
-            
-            # Collect search terms
-            text_prompts = []
-            brand_mapping = {}
-            
-            for brand in active_brands:
-                for term in brand.search_terms:
-                    prompt = f"a photo containing {term}"
-                    text_prompts.append(prompt)
-                    brand_mapping[len(text_prompts)-1] = brand.name
-            
-            text_prompts.append("a photo with no brands or logos")
-            
-            # CLIP inference
-            inputs = self.processor(text=text_prompts, images=image, return_tensors="pt", padding=True)
-            
-            import torch
-            with torch.no_grad():
-                outputs = self.model(**inputs)
-                probs = outputs.logits_per_image.softmax(dim=1)
-                
-                # Clear GPU cache immediately after inference
-                if torch.cuda.is_available():
-                    torch.cuda.empty_cache()
-                
-                # Clear input tensors
-                del inputs
-                del outputs
-            
-            results = []
-            for i, prob in enumerate(probs[0][:-1]):
-                confidence = float(prob)
-                if confidence > confidence_threshold and i in brand_mapping:
-                    results.append({
-                        'label': brand_mapping[i],
-                        'confidence': confidence,
-                        'bbox': {'x': 0, 'y': 0, 'width': 1, 'height': 1}  # Full frame for CLIP
-                    })
-            
-            # Clear probability tensors
-            del probs
-            
-            return sorted(results, key=lambda x: x['confidence'], reverse=True)[:5]
+            # Frames from concurrent tasks share one forward pass when batching is enabled
+            batcher = batchers.get(
+                self._batch_key(confidence_threshold),
+                lambda images: self.detect_batch(images, confidence_threshold)
+            )
+            if batcher:
+                return batcher.submit(image, timeout=batcher.result_timeout)
+            return self.detect_batch([image], confidence_threshold)[0]
             
         except Exception as e:
             logger.error(f"CLIP logo detection error: {e}")
+            record_detection_failure()
             return []
-        finally:
-            # Force garbage collection after processing
-            import gc
-            gc.collect()
+    
+    def _batch_key(self, confidence_threshold):
+        return ('clip', self.model_identifier, confidence_threshold)
+    
+    def detect_batch(self, images, confidence_threshold=0.5):
+        labels, probs = self.brand_probabilities(images)
+        if probs is None:
+            return [[] for _ in images]
+        return [self._to_detections(row, labels, confidence_threshold) for row in probs.tolist()]
+    
+    def brand_probabilities(self, images):
+        """(labels, probs) with one softmax row over the brand prompts per image; probs is None without brands"""
+        model, processor = self._load_model()
+        
+        # Brand prompts and their text embeddings are cached across frames
+        labels, text_embeds = brand_embeddings.get(self.model_identifier, model, processor)
+        if text_embeds is None:
+            return labels, None
+        
+        # CLIP inference: batched image encode plus one matmul against cached text embeddings
+        inputs = processor(images=[as_frame(image).pil for image in images], return_tensors="pt")
+        
+        import torch
+        with torch.no_grad():
+            image_embeds = model.get_image_features(**inputs)
+            image_embeds = image_embeds / image_embeds.norm(dim=-1, keepdim=True)
+            logits = model.logit_scale.exp() * image_embeds @ text_embeds.T
+            probs = logits.softmax(dim=1)
+        
+        return labels, probs.numpy()
+    
+    def _to_detections(self, probs, labels, confidence_threshold):
+        results = []
+        for i, prob in enumerate(probs):
+            if prob > confidence_threshold and labels[i] is not None:
+                results.append({
+                    'label': labels[i],
+                    'confidence': prob,
+                    'bbox': {'x': 0, 'y': 0, 'width': 1, 'height': 1}  # Full frame for CLIP
+                })
+        
+        return sorted(results, key=lambda x: x['confidence'], reverse=True)[:5]
+
+
+def export_clip_image_encoder(model_identifier, path):
+    """Export the CLIP image tower to ONNX; output is the normalized embedding times logit_scale"""
+    import torch
+    
+    class ImageEncoder(torch.nn.Module):
+        def __init__(self, clip):
+            super().__init__()
+            self.clip = clip
+        
+        def forward(self, pixel_values):
+            embeds = self.clip.get_image_features(pixel_values=pixel_values)
+            return self.clip.logit_scale.exp() * embeds / embeds.norm(dim=-1, keepdim=True)
+    
+    model, _ = load_clip(model_identifier)
+    size = model.config.vision_config.image_size
+    with torch.no_grad():
+        torch.onnx.export(
+            ImageEncoder(model),
+            torch.zeros(1, 3, size, size),
+            path,
+            input_names=['pixel_values'],
+            output_names=['scaled_image_embeds'],
+            dynamic_axes={'pixel_values': {0: 'batch'}, 'scaled_image_embeds': {0: 'batch'}},
+            opset_version=14
+        )
+
+
+class CLIPONNXLogoDetectionAdapter(CLIPLogoDetectionAdapter):
+    """
+    CLIP logo detection with the image tower under ONNX Runtime (CPU)
+    
+    Brand text embeddings still come from the shared cache; the PyTorch model is
+    only loaded (outside the pool) when they have to be recomputed.
+    """
+    
+    def __init__(self, model_identifier="openai/clip-vit-base-patch32", quantize=False, intra_op_threads=0):
+        super().__init__(model_identifier)
+        self.quantize = quantize
+        self.intra_op_threads = intra_op_threads
+        self.session = None
+    
+    def _load_model(self):
+        """Fetch ONNX session and processor from the resident model pool and return them"""
+        session = get_session(
+            self.model_identifier,
+            lambda path: export_clip_image_encoder(self.model_identifier, path),
+            quantize=self.quantize,
+            intra_op_threads=self.intra_op_threads
+        )
+        
+        def processor_loader():
+            from transformers import CLIPProcessor
+            return CLIPProcessor.from_pretrained(self.model_identifier)
+        
+        processor = model_pool.get(('clip_processor', self.model_identifier), processor_loader, size_mb=0)
+        self.session, self.processor = session, processor
+        return session, processor
+    
+    def cleanup(self):
+        super().cleanup()
+        self.session = None
+    
+    def _batch_key(self, confidence_threshold):
+        return ('clip_onnx', self.model_identifier, self.quantize, confidence_threshold)
+    
+    def brand_probabilities(self, images):
+        session, processor = self._load_model()
+        
+        labels, text_embeds = brand_embeddings.get(
+            self.model_identifier, loader=lambda: load_clip(self.model_identifier)
+        )
+        if text_embeds is None:
+            return labels, None
+        
+        inputs = processor(images=[as_frame(image).pil for image in images], return_tensors="np")
+        image_embeds, = session.run(None, {'pixel_values': inputs['pixel_values'].astype(np.float32)})
+        
+        logits = image_embeds @ text_embeds.numpy().T
+        logits -= logits.max(axis=1, keepdims=True)
+        probs = np.exp(logits)
+        probs /= probs.sum(axis=1, keepdims=True)
+        return labels, probs
 
 
 class LogoDetectionAdapterFactory(AdapterFactory):
@@ -157,5 +247,13 @@ class LogoDetectionAdapterFactory(AdapterFactory):
         elif provider_type == 'local_clip':
             model_id = provider_config.get('model_identifier', 'openai/clip-vit-base-patch32')
             return CLIPLogoDetectionAdapter(model_id)
+        elif provider_type == 'local_clip_onnx':
+            model_id = provider_config.get('model_identifier', 'openai/clip-vit-base-patch32')
+            options = provider_config.get('config') or {}
+            return CLIPONNXLogoDetectionAdapter(
+                model_id,
+                quantize=bool(options.get('quantize', False)),
+                intra_op_threads=int(options.get('intra_op_threads', 0))
+            )
         else:
             raise ValueError(f"Unknown logo detection provider: {provider_type}")
\ No newline at end of file
@@ -1,53 +1,185 @@
 import logging
+import math
+import threading
+from django.conf import settings
 from .base import VideoAnalysisAdapter, AdapterFactory
+from ..segment_decoder import FrameSubscriber, SegmentDecoder, STATE_LOCK_TIMEOUT
+from ..stream_registry import StreamStateRegistry
 import cv2
 import numpy as np
 
 logger = logging.getLogger(__name__)
 
+# Worker-local motion analyzers per (stream, config), evicted when the stream goes idle
+motion_states = StreamStateRegistry(
+    idle_timeout=getattr(settings, 'AI_MOTION_STATE_IDLE_TIMEOUT', 120)
+)
+
+
+class MotionAnalyzer(FrameSubscriber):
+    """
+    Streaming motion scoring over frames from a shared segment decoder
+    
+    An analyzer can be kept per stream and fed consecutive segments: the
+    background model / previous frame survive between segments while scores
+    are collected per segment (between on_start and on_end).
+    """
+    
+    mode = 'exact'
+    
+    def __init__(self, scale=1.0, stride=1):
+        # Work on the frame pyramid level closest to scale, and every stride-th frame
+        self.pyramid_level = max(0, int(round(math.log2(1.0 / scale)))) if scale > 0 else 0
+        self.stride = max(1, int(stride))
+        self.motion_scores = []
+        self.frame_count = 0
+        self._shape = None
+        self._result = None
+        self._lock = threading.Lock()
+    
+    def on_start(self, decoder):
+        # One segment at a time per stream model
+        if not self._lock.acquire(timeout=STATE_LOCK_TIMEOUT):
+            raise RuntimeError(f"Motion state still held by the stream's previous segment after {STATE_LOCK_TIMEOUT}s")
+        self.motion_scores = []
+        self.frame_count = 0
+        self._result = None
+    
+    def on_frame(self, decoded):
+        # Skipped frames never have their pixels converted
+        if decoded.index % self.stride:
+            return
+        
+        image = decoded.frame.pyramid_level(self.pyramid_level)
+        if image.shape != self._shape:
+            # Resolution changed (or first frame): previous state does not apply
+            self.reset_model()
+            self._shape = image.shape
+        
+        score = self.score(image)
+        if score is not None:
+            self.motion_scores.append(score)
+        self.frame_count += 1
+    
+    def on_end(self):
+        try:
+            self._result = self._summarize()
+        finally:
+            self._lock.release()
+    
+    def score(self, image):
+        """Fraction of changed pixels for one frame, or None while warming up"""
+        raise NotImplementedError
+    
+    def reset_model(self):
+        """Drop state carried over from previous frames"""
+        pass
+    
+    def result(self):
+        """Motion summary of the last segment"""
+        return self._result if self._result is not None else self._summarize()
+    
+    def _summarize(self):
+        if self.motion_scores:
+            return {
+                'average_motion': float(np.mean(self.motion_scores)),
+                'max_motion': float(np.max(self.motion_scores)),
+                'activity_score': float(np.mean(self.motion_scores) * 10),  # Scale to 0-10
+                'frame_count': self.frame_count,
+                'mode': self.mode
+            }
+        else:
+            return {}
+
+
+class MOG2MotionAnalyzer(MotionAnalyzer):
+    """MOG2 background subtraction; full resolution with shadows is the exact mode"""
+    
+    def __init__(self, scale=1.0, stride=1, detect_shadows=True):
+        super().__init__(scale, stride)
+        if scale < 1.0 or stride > 1 or not detect_shadows:
+            self.mode = 'fast'
+        self.detect_shadows = detect_shadows
+        self.backSub = None
+    
+    def reset_model(self):
+        # Initialize background subtractor
+        self.backSub = cv2.createBackgroundSubtractorMOG2(detectShadows=self.detect_shadows)
+    
+    def score(self, image):
+        # Apply background subtraction
+        fgMask = self.backSub.apply(image)
+        
+        # Calculate motion score (percentage of changed pixels)
+        motion_pixels = cv2.countNonZero(fgMask)
+        total_pixels = fgMask.shape[0] * fgMask.shape[1]
+        return motion_pixels / total_pixels
+
+
+class FrameDiffMotionAnalyzer(MotionAnalyzer):
+    """Cheap motion score: fraction of pixels whose luma changed since the previous analyzed frame"""
+    
+    mode = 'fast'
+    
+    def __init__(self, scale=0.25, stride=2, diff_threshold=25):
+        super().__init__(scale, stride)
+        self.diff_threshold = diff_threshold
+        self.previous = None
+    
+    def reset_model(self):
+        self.previous = None
+    
+    def score(self, image):
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        previous, self.previous = self.previous, gray
+        if previous is None:
+            return None
+        
+        _, changed = cv2.threshold(cv2.absdiff(gray, previous), self.diff_threshold, 255, cv2.THRESH_BINARY)
+        return cv2.countNonZero(changed) / gray.size
+
 
 class OpenCVMotionAnalysisAdapter(VideoAnalysisAdapter):
-    """Local OpenCV-based motion analysis"""
+    """
+    Local OpenCV-based motion analysis
+    
+    Provider api_config:
+        mode: 'exact' (full-resolution MOG2 on every frame, default) or 'fast'
+        method: fast-mode algorithm, 'frame_diff' (default) or 'mog2' (no shadow detection)
+        scale: fast-mode resolution factor, snapped to a frame pyramid level (default 0.25)
+        stride: fast mode analyzes every stride-th frame (default 2)
+        diff_threshold: luma change counted as motion for frame_diff (default 25)
+    
+    With a stream_key the analyzer (background model and last frame) is kept
+    in a worker-local registry, so segments after the first need no warm-up.
+    """
+    
+    def __init__(self, mode='exact', method='frame_diff', scale=0.25, stride=2, diff_threshold=25):
+        self.mode = mode
+        self.method = method
+        self.scale = scale
+        self.stride = stride
+        self.diff_threshold = diff_threshold
+    
+    def create_frame_analyzer(self, stream_key=None, **kwargs):
+        """Per-stream analyzer whose background model persists across segments"""
+        if not stream_key:
+            return self._new_analyzer()
+        config_key = (self.mode, self.method, self.scale, self.stride, self.diff_threshold)
+        return motion_states.get((stream_key, config_key), self._new_analyzer)
+    
+    def _new_analyzer(self):
+        if self.mode != 'fast':
+            return MOG2MotionAnalyzer()
+        if self.method == 'mog2':
+            return MOG2MotionAnalyzer(scale=self.scale, stride=self.stride, detect_shadows=False)
+        return FrameDiffMotionAnalyzer(scale=self.scale, stride=self.stride, diff_threshold=self.diff_threshold)
     
     def analyze(self, video_path, **kwargs):
         try:
-            cap = cv2.VideoCapture(video_path)
-            if not cap.isOpened():
-                return {}
-            
-            # Initialize background subtractor
-            backSub = cv2.createBackgroundSubtractorMOG2(detectShadows=True)
-            
-            frame_count = 0
-            motion_scores = []
-            
-            while True:
-                ret, frame = cap.read()
-                if not ret:
-                    break
-                    
-                # Apply background subtraction
-                fgMask = backSub.apply(frame)
-                
-                # Calculate motion score (percentage of changed pixels)
-                motion_pixels = cv2.countNonZero(fgMask)
-                total_pixels = fgMask.shape[0] * fgMask.shape[1]
-                motion_score = motion_pixels / total_pixels
-                motion_scores.append(motion_score)
-                
-                frame_count += 1
-            
-            cap.release()
-            
-            if motion_scores:
-                return {
-                    'average_motion': float(np.mean(motion_scores)),
-                    'max_motion': float(np.max(motion_scores)),
-                    'activity_score': float(np.mean(motion_scores) * 10),  # Scale to 0-10
-                    'frame_count': frame_count
-                }
-            else:
-                return {}
+            analyzer = self.create_frame_analyzer(**kwargs)
+            SegmentDecoder(video_path).run([analyzer])
+            return analyzer.result()
                 
         except Exception as e:
             logger.error(f"Motion analysis error: {e}")
@@ -124,7 +256,14 @@ class MotionAnalysisAdapterFactory(AdapterFactory):
         provider_type = provider_config.get('provider_type')
         
         if provider_type == 'local_opencv':
-            return OpenCVMotionAnalysisAdapter()
+            options = provider_config.get('config') or {}
+            return OpenCVMotionAnalysisAdapter(
+                mode=options.get('mode', 'exact'),
+                method=options.get('method', 'frame_diff'),
+                scale=float(options.get('scale', 0.25)),
+                stride=int(options.get('stride', 2)),
+                diff_threshold=int(options.get('diff_threshold', 25))
+            )
         elif provider_type == 'gcp_video_intelligence':
             return GCPVideoIntelligenceAdapter()
         else:
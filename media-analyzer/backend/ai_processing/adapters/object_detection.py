@@ -1,6 +1,14 @@
+import ast
 import logging
-from .base import DetectionAdapter, AdapterFactory
-import io
+import os
+import shutil
+import cv2
+import numpy as np
+from .base import DetectionAdapter, AdapterFactory, record_detection_failure
+from ..model_pool import model_pool
+from ..onnx_models import get_session
+from ..frame import as_frame
+from ..batching import batchers
 
 logger = logging.getLogger(__name__)
 
@@ -10,14 +18,12 @@ class GCPObjectDetectionAdapter(DetectionAdapter):
     
     def __init__(self):
         from google.cloud import vision
-        self.client = vision.ImageAnnotatorClient()
+        self.client = model_pool.get(('gcp_vision', 'client'), vision.ImageAnnotatorClient, size_mb=0)
     
     def detect(self, image, confidence_threshold=0.5):
         try:
-            # Convert image to bytes
-            img_byte_arr = io.BytesIO()
-            image.save(img_byte_arr, format='JPEG')
-            image_bytes = img_byte_arr.getvalue()
+            # Encode straight from the frame buffer
+            image_bytes = as_frame(image).to_jpeg()
             
             # GCP Vision API call
             from google.cloud import vision
@@ -49,6 +55,7 @@ class GCPObjectDetectionAdapter(DetectionAdapter):
             
         except Exception as e:
             logger.error(f"GCP object detection error: {e}")
+            record_detection_failure()
             return []
 
 
@@ -60,51 +67,183 @@ class YOLOObjectDetectionAdapter(DetectionAdapter):
         self.model = None
         
     def _load_model(self):
-        if not self.model:
+        """
+        Fetch YOLO model from the resident model pool and return it
+        
+        Callers work on the returned model, never on self.model: the adapter of the
+        task that created a batcher serves other tasks after its own cleanup().
+        """
+        def loader():
             from ultralytics import YOLO
-            self.model = YOLO(self.model_path)
+            return YOLO(self.model_path)
+        
+        model = model_pool.get(('yolo', self.model_path), loader)
+        self.model = model
+        return model
+    
+    def cleanup(self):
+        """Drop reference to pooled model (weights stay resident in the pool)"""
+        self.model = None
     
     def detect(self, image, confidence_threshold=0.5):
         try:
-            self._load_model()
-            
-            # Convert PIL to OpenCV format
-            import cv2
-            import numpy as np
-            img_array = np.array(image)
-            
-            # YOLO inference
-            results = self.model(img_array, conf=confidence_threshold)
-            
-            detections = []
-            for result in results:
-                boxes = result.boxes
-                if boxes is not None:
-                    for box in boxes:
-                        # Get normalized coordinates
-                        x1, y1, x2, y2 = box.xyxyn[0].tolist()
-                        confidence = float(box.conf[0])
-                        class_id = int(box.cls[0])
-                        class_name = self.model.names[class_id]
-                        
-                        bbox = {
-                            'x': x1,
-                            'y': y1,
-                            'width': x2 - x1,
-                            'height': y2 - y1
-                        }
-                        
-                        detections.append({
-                            'label': class_name,
-                            'confidence': confidence,
-                            'bbox': bbox
-                        })
-            
-            return detections
+            # Frames from concurrent tasks share one forward pass when batching is enabled
+            batcher = batchers.get(
+                self._batch_key(confidence_threshold),
+                lambda images: self.detect_batch(images, confidence_threshold)
+            )
+            if batcher:
+                return batcher.submit(image, timeout=batcher.result_timeout)
+            return self.detect_batch([image], confidence_threshold)[0]
             
         except Exception as e:
             logger.error(f"YOLO object detection error: {e}")
+            record_detection_failure()
+            return []
+    
+    def _batch_key(self, confidence_threshold):
+        return ('yolo', self.model_path, confidence_threshold)
+    
+    def detect_batch(self, images, confidence_threshold=0.5):
+        model = self._load_model()
+        
+        # Ultralytics expects BGR arrays, which is the frame's native layout
+        img_arrays = [as_frame(image).bgr for image in images]
+        
+        # YOLO inference, one result per input image
+        results = model(img_arrays, conf=confidence_threshold, verbose=False)
+        
+        return [self._to_detections(result, model.names) for result in results]
+    
+    def _to_detections(self, result, names):
+        boxes = result.boxes
+        if boxes is None or len(boxes) == 0:
+            return []
+        
+        # One device-to-host copy per tensor instead of per-box indexing
+        return detections_from_arrays(
+            boxes.xyxyn.cpu().numpy(),
+            boxes.conf.cpu().numpy(),
+            boxes.cls.cpu().numpy().astype(np.int64),
+            names
+        )
+
+
+def detections_from_arrays(xyxyn, confidences, class_ids, names):
+    """Build detection dicts from (N, 4) normalized xyxy boxes, (N,) confidences and (N,) class ids"""
+    xyxyn = np.asarray(xyxyn, dtype=np.float64)
+    sizes = xyxyn[:, 2:] - xyxyn[:, :2]
+    return [
+        {
+            'label': names.get(class_id, str(class_id)),
+            'confidence': confidence,
+            'bbox': {'x': x, 'y': y, 'width': width, 'height': height}
+        }
+        for (x, y), (width, height), confidence, class_id in zip(
+            xyxyn[:, :2].tolist(), sizes.tolist(),
+            np.asarray(confidences, dtype=np.float64).tolist(), np.asarray(class_ids).tolist()
+        )
+    ]
+
+
+def export_yolo(model_path, path, imgsz=640):
+    """Export a YOLO checkpoint to ONNX with dynamic batch and image size"""
+    from ultralytics import YOLO
+    exported = YOLO(model_path).export(format='onnx', imgsz=imgsz, dynamic=True, simplify=False)
+    shutil.move(exported, path)
+
+
+class YOLOONNXObjectDetectionAdapter(YOLOObjectDetectionAdapter):
+    """
+    YOLO object detection under ONNX Runtime (CPU)
+    
+    Preprocessing (letterbox) and post-processing (confidence filter, class-aware
+    NMS) are done with OpenCV/numpy, matching Ultralytics defaults.
+    """
+    
+    def __init__(self, model_path="yolov8n.pt", quantize=False, intra_op_threads=0,
+                 imgsz=640, iou_threshold=0.7, max_detections=300):
+        super().__init__(model_path)
+        self.quantize = quantize
+        self.intra_op_threads = intra_op_threads
+        self.imgsz = imgsz
+        self.iou_threshold = iou_threshold
+        self.max_detections = max_detections
+        self.names = None
+    
+    def _load_model(self):
+        """Fetch ONNX session from the resident model pool and return it"""
+        session = get_session(
+            f"{os.path.splitext(os.path.basename(self.model_path))[0]}-{self.imgsz}",
+            lambda path: export_yolo(self.model_path, path, self.imgsz),
+            quantize=self.quantize,
+            intra_op_threads=self.intra_op_threads
+        )
+        if self.names is None:
+            # Ultralytics stores the class names in the ONNX metadata
+            metadata = session.get_modelmeta().custom_metadata_map
+            self.names = ast.literal_eval(metadata.get('names', '{}'))
+        self.model = session
+        return session
+    
+    def _batch_key(self, confidence_threshold):
+        return ('yolo_onnx', self.model_path, self.quantize, self.imgsz, confidence_threshold)
+    
+    def detect_batch(self, images, confidence_threshold=0.5):
+        session = self._load_model()
+        
+        frames = [as_frame(image) for image in images]
+        letterboxed = [self._letterbox(frame.bgr) for frame in frames]
+        blob = cv2.dnn.blobFromImages([canvas for canvas, _, _, _ in letterboxed], 1 / 255.0, swapRB=True)
+        
+        input_name = session.get_inputs()[0].name
+        predictions, = session.run(None, {input_name: blob})
+        
+        return [
+            self._postprocess(prediction, frame, scale, pad_x, pad_y, confidence_threshold)
+            for prediction, frame, (_, scale, pad_x, pad_y) in zip(predictions, frames, letterboxed)
+        ]
+    
+    def _letterbox(self, bgr):
+        """Resize keeping aspect ratio and pad to imgsz x imgsz (gray 114, like Ultralytics)"""
+        height, width = bgr.shape[:2]
+        scale = min(self.imgsz / height, self.imgsz / width)
+        new_width, new_height = round(width * scale), round(height * scale)
+        pad_x, pad_y = (self.imgsz - new_width) // 2, (self.imgsz - new_height) // 2
+        
+        canvas = np.full((self.imgsz, self.imgsz, 3), 114, dtype=np.uint8)
+        canvas[pad_y:pad_y + new_height, pad_x:pad_x + new_width] = cv2.resize(
+            bgr, (new_width, new_height), interpolation=cv2.INTER_LINEAR
+        )
+        return canvas, scale, pad_x, pad_y
+    
+    def _postprocess(self, prediction, frame, scale, pad_x, pad_y, confidence_threshold):
+        # (4 + num_classes, num_anchors) -> per-anchor rows of cx, cy, w, h, class scores
+        prediction = prediction.T
+        class_scores = prediction[:, 4:]
+        class_ids = class_scores.argmax(axis=1)
+        confidences = class_scores[np.arange(len(class_ids)), class_ids]
+        
+        keep = confidences >= confidence_threshold
+        if not keep.any():
             return []
+        boxes, confidences, class_ids = prediction[keep, :4], confidences[keep], class_ids[keep]
+        
+        # Class-aware NMS on (x, y, w, h) boxes in letterbox space
+        xywh = boxes.copy()
+        xywh[:, :2] -= xywh[:, 2:] / 2
+        indices = cv2.dnn.NMSBoxesBatched(
+            xywh.tolist(), confidences.tolist(), class_ids.tolist(), confidence_threshold, self.iou_threshold
+        )
+        indices = np.asarray(indices, dtype=np.int64).reshape(-1)[:self.max_detections]
+        
+        # Undo letterbox and normalize to the original frame
+        xyxy = np.concatenate([xywh[indices, :2], xywh[indices, :2] + xywh[indices, 2:]], axis=1)
+        xyxy -= (pad_x, pad_y, pad_x, pad_y)
+        xyxy /= (scale * frame.width, scale * frame.height, scale * frame.width, scale * frame.height)
+        np.clip(xyxy, 0.0, 1.0, out=xyxy)
+        
+        return detections_from_arrays(xyxy, confidences[indices], class_ids[indices], self.names)
 
 
 class ObjectDetectionAdapterFactory(AdapterFactory):
@@ -119,5 +258,15 @@ class ObjectDetectionAdapterFactory(AdapterFactory):
         elif provider_type == 'local_yolo':
             model_path = provider_config.get('model_identifier', 'yolov8n.pt')
             return YOLOObjectDetectionAdapter(model_path)
+        elif provider_type == 'local_yolo_onnx':
+            model_path = provider_config.get('model_identifier', 'yolov8n.pt')
+            options = provider_config.get('config') or {}
+            return YOLOONNXObjectDetectionAdapter(
+                model_path,
+                quantize=bool(options.get('quantize', False)),
+                intra_op_threads=int(options.get('intra_op_threads', 0)),
+                imgsz=int(options.get('imgsz', 640)),
+                iou_threshold=float(options.get('iou_threshold', 0.7))
+            )
         else:
             raise ValueError(f"Unknown object detection provider: {provider_type}")
\ No newline at end of file
@@ -0,0 +1,153 @@
+import logging
+import threading
+from django.conf import settings
+from .base import VideoAnalysisAdapter, AdapterFactory
+from ..segment_decoder import FrameSubscriber, SegmentDecoder, STATE_LOCK_TIMEOUT
+from ..stream_registry import StreamStateRegistry
+from ..gating import FrameSignals
+import cv2
+
+logger = logging.getLogger(__name__)
+
+# Worker-local shot detectors per (stream, config), so a cut between two segments is still seen
+shot_states = StreamStateRegistry(
+    idle_timeout=getattr(settings, 'AI_MOTION_STATE_IDLE_TIMEOUT', 120)
+)
+
+
+class HistogramShotDetector(FrameSubscriber):
+    """
+    Shot boundaries from the HSV histogram distance between consecutive analyzed frames
+
+    A boundary is reported when the Bhattacharyya distance exceeds threshold and
+    the previous boundary is at least min_shot_frames analyzed frames back (flashes
+    and fast pans do not split shots). The first frame a detector ever sees is a
+    boundary. Boundaries are collected per segment, between on_start and on_end.
+    """
+
+    def __init__(self, threshold=0.35, min_shot_frames=10, stride=1):
+        self.threshold = threshold
+        self.min_shot_frames = min_shot_frames
+        self.stride = max(1, int(stride))
+        self.boundaries = []
+        self.frame_count = 0
+        self.last_boundary_index = None  # Decoded-frame index of the latest boundary in this segment
+        self._previous = None
+        self._since_boundary = None
+        self._duration = None
+        self._result = None
+        self._lock = threading.Lock()
+
+    def on_start(self, decoder):
+        # One segment at a time per stream detector
+        if not self._lock.acquire(timeout=STATE_LOCK_TIMEOUT):
+            raise RuntimeError(f"Shot state still held by the stream's previous segment after {STATE_LOCK_TIMEOUT}s")
+        self.boundaries = []
+        self.frame_count = 0
+        self.last_boundary_index = None
+        self._duration = decoder.duration
+        self._result = None
+
+    def on_frame(self, decoded):
+        if decoded.index % self.stride:
+            return
+
+        histogram = FrameSignals(decoded.frame).hsv_histogram
+        previous, self._previous = self._previous, histogram
+        self.frame_count += 1
+
+        if previous is None:
+            self._mark(decoded, 1.0)
+            return
+
+        self._since_boundary += 1
+        distance = cv2.compareHist(histogram, previous, cv2.HISTCMP_BHATTACHARYYA)
+        if distance > self.threshold and self._since_boundary >= self.min_shot_frames:
+            self._mark(decoded, distance)
+
+    def on_end(self):
+        try:
+            self._result = self._summarize()
+        finally:
+            self._lock.release()
+
+    def is_boundary(self, decoded):
+        """Whether the detector marked this decoded frame as a shot boundary"""
+        return self.last_boundary_index == decoded.index
+
+    def result(self):
+        """Shot boundaries of the last segment"""
+        return self._result if self._result is not None else self._summarize()
+
+    def _mark(self, decoded, score):
+        self.boundaries.append({'time': decoded.pts, 'score': float(score)})
+        self.last_boundary_index = decoded.index
+        self._since_boundary = 0
+
+    def _summarize(self):
+        # Shots within the segment, split at the boundaries
+        starts = [0.0] + [b['time'] for b in self.boundaries if b['time'] > 0]
+        ends = starts[1:] + [self._duration]
+        return {
+            'boundaries': self.boundaries,
+            'shots': [{'start_time': start, 'end_time': end} for start, end in zip(starts, ends)],
+            'shot_count': len(self.boundaries),
+            'frame_count': self.frame_count
+        }
+
+
+class HistogramShotDetectionAdapter(VideoAnalysisAdapter):
+    """
+    Local histogram-based shot boundary detection
+
+    Provider api_config:
+        threshold: HSV histogram Bhattacharyya distance that counts as a cut (default 0.35)
+        min_shot_frames: minimum analyzed frames between two boundaries (default 10)
+        stride: analyze every stride-th decoded frame (default 1)
+    """
+
+    def __init__(self, threshold=0.35, min_shot_frames=10, stride=1):
+        self.threshold = threshold
+        self.min_shot_frames = min_shot_frames
+        self.stride = stride
+
+    def create_frame_analyzer(self, stream_key=None, **kwargs):
+        """Per-stream detector whose last histogram persists across segments"""
+        if not stream_key:
+            return self._new_detector()
+        config_key = (self.threshold, self.min_shot_frames, self.stride)
+        return shot_states.get((stream_key, config_key), self._new_detector)
+
+    def _new_detector(self):
+        return HistogramShotDetector(self.threshold, self.min_shot_frames, self.stride)
+
+    def analyze(self, video_path, **kwargs):
+        try:
+            detector = self.create_frame_analyzer(**kwargs)
+            SegmentDecoder(video_path).run([detector])
+            return detector.result()
+
+        except Exception as e:
+            logger.error(f"Shot detection error: {e}")
+            return {}
+
+
+class ShotDetectionAdapterFactory(AdapterFactory):
+    """Factory for shot detection adapters"""
+
+    @staticmethod
+    def create(provider_config):
+        provider_type = provider_config.get('provider_type')
+
+        if provider_type == 'local_histogram':
+            options = provider_config.get('config') or {}
+            return HistogramShotDetectionAdapter(
+                threshold=float(options.get('threshold', 0.35)),
+                min_shot_frames=int(options.get('min_shot_frames', 10)),
+                stride=int(options.get('stride', 1))
+            )
+        elif provider_type == 'gcp_video_intelligence':
+            from .motion_analysis import GCPVideoIntelligenceAdapter
+            return GCPVideoIntelligenceAdapter()
+        else:
+            raise ValueError(f"Unknown shot detection provider: {provider_type}")
@@ -1,6 +1,11 @@
 import logging
-from .base import DetectionAdapter, AdapterFactory
-import io
+import threading
+import cv2
+import numpy as np
+from .base import DetectionAdapter, AdapterFactory, record_detection_failure
+from ..model_pool import model_pool
+from ..frame import as_frame
+from ..text_regions import propose_text_regions, ocr_pool
 
 logger = logging.getLogger(__name__)
 
@@ -10,14 +15,12 @@ class GCPTextDetectionAdapter(DetectionAdapter):
     
     def __init__(self):
         from google.cloud import vision
-        self.client = vision.ImageAnnotatorClient()
+        self.client = model_pool.get(('gcp_vision', 'client'), vision.ImageAnnotatorClient, size_mb=0)
     
     def detect(self, image, confidence_threshold=0.5):
         try:
-            # Convert image to bytes
-            img_byte_arr = io.BytesIO()
-            image.save(img_byte_arr, format='JPEG')
-            image_bytes = img_byte_arr.getvalue()
+            # Encode straight from the frame buffer
+            image_bytes = as_frame(image).to_jpeg()
             
             # GCP Vision API call
             from google.cloud import vision
@@ -50,64 +53,153 @@ class GCPTextDetectionAdapter(DetectionAdapter):
             
         except Exception as e:
             logger.error(f"GCP text detection error: {e}")
+            record_detection_failure()
             return []
 
 
 class TesseractTextDetectionAdapter(DetectionAdapter):
-    """Local Tesseract OCR adapter"""
+    """
+    Local Tesseract OCR adapter
     
-    def __init__(self):
+    Uses tesserocr when installed: an initialized Tesseract API is kept per worker
+    thread and fed the grayscale buffer directly. Falls back to pytesseract, which
+    writes a temp image and runs the tesseract binary on every call. Both are in
+    requirements.txt; tesserocr builds against libtesseract/leptonica (in the image).
+    
+    With region_proposals enabled only candidate text regions are OCR'd, in
+    parallel on the OCR thread pool; frames that look mostly like text fall back
+    to full-frame OCR.
+    """
+    
+    # Word-level TSV columns (same layout as pytesseract.image_to_data)
+    TSV_COLUMNS = ('level', 'page_num', 'block_num', 'par_num', 'line_num', 'word_num',
+                   'left', 'top', 'width', 'height', 'conf', 'text')
+    
+    # Crops with shorter text lines are upscaled for Tesseract
+    MIN_REGION_HEIGHT = 32
+    
+    _thread_state = threading.local()
+    
+    def __init__(self, lang='eng', region_proposals=True):
+        self.lang = lang
+        self.region_proposals = region_proposals
+        self.tesserocr = None
+        self.tesseract = None
         try:
-            import pytesseract
-            self.tesseract = pytesseract
+            import tesserocr
+            self.tesserocr = tesserocr
         except ImportError:
-            logger.error("pytesseract not installed")
-            self.tesseract = None
+            try:
+                import pytesseract
+                self.tesseract = pytesseract
+            except ImportError:
+                logger.error("Neither tesserocr nor pytesseract installed")
     
     def detect(self, image, confidence_threshold=0.5):
-        if not self.tesseract:
+        if not self.tesserocr and not self.tesseract:
             return []
             
         try:
-            import cv2
-            import numpy as np
-            
-            # Convert to OpenCV format
-            img_array = np.array(image)
-            gray = cv2.cvtColor(img_array, cv2.COLOR_RGB2GRAY)
-            
-            # Get bounding box data
-            data = self.tesseract.image_to_data(gray, output_type=self.tesseract.Output.DICT)
-            
-            results = []
+            # Grayscale view is cached on the frame
+            gray = as_frame(image).gray
             height, width = gray.shape
             
-            for i in range(len(data['text'])):
-                text = data['text'][i].strip()
-                conf = int(data['conf'][i])
-                
-                if text and conf > (confidence_threshold * 100):
-                    # Normalize coordinates
-                    x, y, w, h = data['left'][i], data['top'][i], data['width'][i], data['height'][i]
-                    
-                    bbox = {
-                        'x': x / width,
-                        'y': y / height,
-                        'width': w / width,
-                        'height': h / height
-                    }
-                    
-                    results.append({
-                        'label': text,
-                        'confidence': conf / 100.0,
-                        'bbox': bbox
-                    })
+            regions = propose_text_regions(gray) if self.region_proposals else None
+            if regions is None:
+                words = self._ocr(gray)
+            else:
+                words = self._concat_words(ocr_pool.map(lambda region: self._ocr_region(gray, region), regions))
             
-            return results
+            return self._to_detections(words, width, height, confidence_threshold)
             
         except Exception as e:
             logger.error(f"Tesseract text detection error: {e}")
+            record_detection_failure()
             return []
+    
+    def detect_regions(self, image, regions, confidence_threshold=0.5):
+        """OCR only the given pixel regions (x, y, w, h); returns one detection list per region"""
+        gray = as_frame(image).gray
+        height, width = gray.shape
+        word_sets = ocr_pool.map(lambda region: self._ocr_region(gray, region), regions)
+        return [self._to_detections(words, width, height, confidence_threshold) for words in word_sets]
+    
+    def _api(self):
+        """Tesseract API for the current thread, initialized once per language"""
+        apis = getattr(self._thread_state, 'apis', None)
+        if apis is None:
+            apis = self._thread_state.apis = {}
+        api = apis.get(self.lang)
+        if api is None:
+            api = apis[self.lang] = self.tesserocr.PyTessBaseAPI(lang=self.lang)
+        return api
+    
+    def _ocr(self, gray):
+        """Word boxes for a grayscale image as columns: left, top, width, height, conf, text"""
+        if self.tesserocr:
+            api = self._api()
+            height, width = gray.shape
+            api.SetImageBytes(np.ascontiguousarray(gray).tobytes(), width, height, 1, width)
+            api.Recognize()  # Releases the GIL, so OCR threads run in parallel
+            tsv = api.GetTSVText(0)
+            api.Clear()
+            
+            rows = [row for row in (line.split('\t') for line in tsv.splitlines()) if len(row) == len(self.TSV_COLUMNS)]
+            columns = dict(zip(self.TSV_COLUMNS, zip(*rows))) if rows else {}
+        else:
+            columns = self.tesseract.image_to_data(gray, output_type=self.tesseract.Output.DICT)
+        
+        return self._ocr_columns(columns)
+    
+    def _ocr_columns(self, columns):
+        return {
+            'left': np.asarray(columns.get('left', ()), dtype=np.float64),
+            'top': np.asarray(columns.get('top', ()), dtype=np.float64),
+            'width': np.asarray(columns.get('width', ()), dtype=np.float64),
+            'height': np.asarray(columns.get('height', ()), dtype=np.float64),
+            'conf': np.asarray(columns.get('conf', ()), dtype=np.float64),
+            'text': np.char.strip(np.asarray(columns.get('text', ()), dtype=str))
+        }
+    
+    def _ocr_region(self, gray, region):
+        """OCR one crop; word boxes are returned in frame pixel coordinates"""
+        x, y, w, h = region
+        crop = gray[y:y + h, x:x + w]
+        factor = min(4.0, self.MIN_REGION_HEIGHT / h) if h < self.MIN_REGION_HEIGHT else 1.0
+        if factor > 1.0:
+            crop = cv2.resize(crop, None, fx=factor, fy=factor, interpolation=cv2.INTER_CUBIC)
+        
+        words = self._ocr(crop)
+        for key in ('left', 'top', 'width', 'height'):
+            words[key] = words[key] / factor
+        words['left'] += x
+        words['top'] += y
+        return words
+    
+    def _concat_words(self, word_sets):
+        if not word_sets:
+            return self._ocr_columns({})
+        return {key: np.concatenate([words[key] for words in word_sets]) for key in word_sets[0]}
+    
+    def _to_detections(self, words, width, height, confidence_threshold):
+        # Non-word rows have empty text and conf -1
+        keep = (np.char.str_len(words['text']) > 0) & (words['conf'] > confidence_threshold * 100)
+        if not keep.any():
+            return []
+        
+        boxes = np.stack([words['left'], words['top'], words['width'], words['height']], axis=1)[keep]
+        boxes /= (width, height, width, height)
+        
+        return [
+            {
+                'label': text,
+                'confidence': conf,
+                'bbox': {'x': x, 'y': y, 'width': w, 'height': h}
+            }
+            for text, conf, (x, y, w, h) in zip(
+                words['text'][keep].tolist(), (words['conf'][keep] / 100.0).tolist(), boxes.tolist()
+            )
+        ]
 
 
 class TextDetectionAdapterFactory(AdapterFactory):
@@ -120,6 +212,10 @@ class TextDetectionAdapterFactory(AdapterFactory):
         if provider_type == 'gcp_vision':
             return GCPTextDetectionAdapter()
         elif provider_type == 'local_tesseract':
-            return TesseractTextDetectionAdapter()
+            options = provider_config.get('config') or {}
+            return TesseractTextDetectionAdapter(
+                lang=options.get('lang', 'eng'),
+                region_proposals=bool(options.get('region_proposals', True))
+            )
         else:
             raise ValueError(f"Unknown text detection provider: {provider_type}")
\ No newline at end of file
@@ -1,28 +1,67 @@
 import cv2
 import numpy as np
 import os
-from PIL import Image
 import logging
+from django.conf import settings
 from .adapters.object_detection import ObjectDetectionAdapterFactory
 from .adapters.logo_detection import LogoDetectionAdapterFactory
 from .adapters.text_detection import TextDetectionAdapterFactory
 from .adapters.motion_analysis import MotionAnalysisAdapterFactory
+from .adapters.shot_detection import ShotDetectionAdapterFactory, HistogramShotDetectionAdapter
+from .adapters.base import detection_failures
 from .execution_strategies.base import ExecutionStrategyFactory
+from .execution_strategies.local_execution import LocalExecutionStrategy
+from .model_pool import model_pool
+from .batching import batchers
+from .frame_dedup import frame_dedup
+from .ocr_cache import ocr_cache, assign_to_regions, regions_around, overlaps
+from .gating import GateCascade, FrameSignals, gate_stats
+from .tracking import trackers
+from .http_pool import http_pool
+from .frame_codec import transport_stats
+from .text_regions import propose_text_regions
+from .frame import as_frame
+from .segment_decoder import SegmentDecoder, FrameSampler, FrameSubscriber
 
 logger = logging.getLogger(__name__)
 
 
+class VisualStatsAnalyzer(FrameSubscriber):
+    """Visual properties of the first decoded frame, computed on the shared decode"""
+    
+    skip_frame = 'NONKEY'  # The first frame is a keyframe
+    
+    def __init__(self, analyze):
+        self.analyze = analyze
+        self.done = False
+        self._result = None
+    
+    def on_frame(self, decoded):
+        self._result = self.analyze(decoded.frame)
+        self.done = True
+    
+    def result(self):
+        """Visual properties, None when no frame was decoded"""
+        return self._result
+
+
 class AnalysisEngine:
     """Main analysis engine that orchestrates capability-specific adapters with execution strategies"""
     
     _strategy_logged = False
     
+    # Longest side of the pyramid level used for visual property analysis
+    VISUAL_ANALYSIS_SIZE = 320
+    
     def __init__(self):
         self.object_detector = None
         self.logo_detector = None
         self.text_detector = None
         self.motion_analyzer = None
+        self.shot_detector = None
         self.execution_strategy = None
+        self.gates = {}  # capability -> GateCascade
+        self.tracking = {}  # capability -> tracker options
         self._configure_execution_strategy()
         
     def configure_providers(self, provider_config):
@@ -46,6 +85,19 @@ class AnalysisEngine:
             self.motion_analyzer = MotionAnalysisAdapterFactory.create(
                 provider_config['motion_analysis']
             )
+            
+        if 'shot_detection' in provider_config:
+            self.shot_detector = ShotDetectionAdapterFactory.create(
+                provider_config['shot_detection']
+            )
+        
+        # Cheap gates in front of the detection adapters, declared per provider
+        for capability in ('object_detection', 'logo_detection', 'text_detection'):
+            options = (provider_config.get(capability) or {}).get('config') or {}
+            if options.get('gates'):
+                self.gates[capability] = GateCascade(capability, options['gates'])
+            if options.get('tracking') and capability in ('object_detection', 'logo_detection'):
+                self.tracking[capability] = dict(options['tracking'])
     
     def _configure_execution_strategy(self):
         """Configure execution strategy from environment"""
@@ -56,7 +108,17 @@ class AnalysisEngine:
             'remote_lan': lambda: ExecutionStrategyFactory.create(
                 'remote_lan',
                 worker_host=os.getenv('AI_WORKER_HOST'),
-                timeout=int(os.getenv('AI_WORKER_TIMEOUT', '30'))
+                timeout=int(os.getenv('AI_WORKER_TIMEOUT', '30')),
+                batch_max_frames=int(os.getenv('AI_WORKER_BATCH_MAX_FRAMES', '16'))
+            ),
+            'remote_pool': lambda: ExecutionStrategyFactory.create(
+                'remote_pool',
+                worker_hosts=os.getenv('AI_WORKER_HOSTS', '').split(','),
+                timeout=int(os.getenv('AI_WORKER_TIMEOUT', '30')),
+                batch_max_frames=int(os.getenv('AI_WORKER_BATCH_MAX_FRAMES', '16')),
+                routing=os.getenv('AI_WORKER_ROUTING', 'least_outstanding').lower(),
+                failure_threshold=int(os.getenv('AI_WORKER_BREAKER_FAILURES', '3')),
+                cooldown=float(os.getenv('AI_WORKER_BREAKER_COOLDOWN', '10'))
             ),
             'cloud': lambda: ExecutionStrategyFactory.create('cloud')
         }
@@ -78,78 +140,291 @@ class AnalysisEngine:
             self.execution_strategy = strategy_configs['local']()
     
     def extract_frame_from_segment(self, segment_path, timestamp=None):
-        """Extract frame from video segment"""
+        """Extract frame from video segment (first frame, or the frame nearest to timestamp)"""
+        if timestamp:
+            frames = self.extract_frames_from_segment(segment_path, mode='at', timestamps=[timestamp])
+        else:
+            frames = self.extract_frames_from_segment(segment_path, mode='first')
+        
+        if frames:
+            return frames[0][1]
+        logger.error(f"Failed to read frame from {segment_path}")
+        return None
+    
+    def extract_frames_from_segment(self, segment_path, mode='first', max_frames=1, timestamps=None):
+        """
+        Sample frames from a video segment
+        
+        Modes:
+            first     - first decoded frame only
+            keyframes - keyframe-only decode, up to max_frames keyframes (None for all)
+            uniform   - max_frames evenly spaced frames, non-reference frames are never decoded
+            at        - frames nearest to the given timestamps (seconds from segment start)
+            shots     - up to max_frames frames at shot boundaries (first frame included)
+        
+        Returns: List of (frame_timestamp, Frame) with timestamps taken from
+        the frame PTS, relative to the start of the segment
+        """
         try:
-            import os
-            logger.debug(f"Attempting to extract frame from: {segment_path}")
-            
-            if not os.path.exists(segment_path):
-                logger.error(f"Segment file does not exist: {segment_path}")
-                return None
-            
-            cap = cv2.VideoCapture(segment_path)
-            
-            if not cap.isOpened():
-                logger.error(f"OpenCV failed to open: {segment_path}")
-                return None
-                
-            # For TS segments, seeking is problematic, just read first frame
-            # This is suitable for real-time analysis where any frame is representative
-            ret, frame = cap.read()
-            cap.release()
-            
-            if ret:
-                frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                return Image.fromarray(frame_rgb)
-            else:
-                logger.error(f"Failed to read frame from {segment_path}")
-            return None
-                
+            logger.debug(f"Attempting to extract frames from: {segment_path}")
+            detector = HistogramShotDetectionAdapter().create_frame_analyzer() if mode == 'shots' else None
+            sampler = FrameSampler(mode, max_frames, timestamps, shot_detector=detector)
+            subscribers = [detector, sampler] if detector else [sampler]
+            SegmentDecoder.for_subscribers(segment_path, subscribers).run(subscribers)
+            return sampler.frames()
         except Exception as e:
-            logger.error(f"Error extracting frame: {e}")
-            return None
+            logger.error(f"Error sampling frames from {segment_path}: {e}")
+            return []
     
-    def analyze_frame(self, image, requested_analysis, confidence_threshold=0.5):
-        """Analyze a single frame using configured adapters and execution strategy"""
+    def analyze_segment(self, segment_path, requested_analysis, confidence_threshold=0.5,
+                        stream_key=None, sample_mode='first', max_frames=1):
+        """
+        Decode a segment once and fan frames out to every requested analysis
+        
+        Motion analysis sees every decoded frame while the frame sampler picks
+        the frames for detection and visual analysis reads the first frame; the
+        segment is demuxed and decoded a single time. With sample_mode 'shots' the
+        frames are taken at shot boundaries, so a segment without a cut yields no frames.
+        
+        Returns: {'frames': [(frame_timestamp, results)], 'motion': {...}, 'shots': {...}, 'visual': {...}}
+        """
+        shots = None
+        if sample_mode == 'shots' or 'shot_detection' in requested_analysis:
+            if self.shot_detector:
+                shots = self.shot_detector.create_frame_analyzer(stream_key=stream_key)
+            if shots is None and sample_mode == 'shots':
+                # Sampling needs boundaries while decoding, use the local detector
+                shots = HistogramShotDetectionAdapter().create_frame_analyzer(stream_key=stream_key)
+        
+        sampler = FrameSampler(sample_mode, max_frames, shot_detector=shots)
+        subscribers = [shots, sampler] if shots else [sampler]
+        
+        motion = None
+        if 'motion_analysis' in requested_analysis and self.motion_analyzer:
+            motion = self.motion_analyzer.create_frame_analyzer(stream_key=stream_key)
+            if motion:
+                subscribers.append(motion)
+        
+        visual = None
+        if 'visual_analysis' in requested_analysis:
+            visual = VisualStatsAnalyzer(self._analyze_visual_properties)
+            subscribers.append(visual)
+        
+        try:
+            SegmentDecoder.for_subscribers(segment_path, subscribers).run(subscribers)
+        except Exception as e:
+            logger.error(f"Error decoding segment {segment_path}: {e}")
+            return {'frames': []}
+        
+        results = {'frames': []}
+        if 'motion_analysis' in requested_analysis and self.motion_analyzer:
+            # Adapters without a frame analyzer (cloud) still read the file themselves
+            results['motion'] = motion.result() if motion else self.motion_analyzer.analyze(segment_path)
+        
+        if shots:
+            results['shots'] = shots.result()
+        elif 'shot_detection' in requested_analysis and self.shot_detector:
+            results['shots'] = self.shot_detector.analyze(segment_path)
+        
+        if visual and visual.result() is not None:
+            results['visual'] = visual.result()
+        
+        frame_analysis = [a for a in requested_analysis
+                          if a not in ('motion_analysis', 'shot_detection', 'visual_analysis')]
+        sampled = sampler.frames() if frame_analysis else []
+        failures = detection_failures()
+        prefetched = self._prefetch_detections(sampled, frame_analysis, confidence_threshold, stream_key)
+        # Empty results of a failed batch must not be reused for near-duplicate frames
+        cacheable = detection_failures() == failures
+        for (frame_timestamp, frame), precomputed in zip(sampled, prefetched):
+            results['frames'].append((
+                frame_timestamp,
+                self.analyze_frame(frame, frame_analysis, confidence_threshold, stream_key=stream_key,
+                                   precomputed=precomputed, cacheable=cacheable)
+            ))
+        
+        return results
+    
+    def _prefetch_detections(self, frames, requested_analysis, confidence_threshold, stream_key):
+        """
+        Detections for every sampled frame in one strategy round trip
+        
+        Only for strategies that batch (remote LAN) and capabilities whose results
+        do not depend on the previous frame: gated, tracked and OCR-cached
+        capabilities still run frame by frame in analyze_frame. Frames the dedup
+        cache will answer, including near-duplicates of earlier frames in the
+        batch, are not sent.
+        """
+        if not frames or not self.execution_strategy.supports_batch:
+            return [None] * len(frames)
+        
+        adapters = {}
+        for analysis_type, adapter in self._adapter_map().items():
+            if not adapter or analysis_type not in requested_analysis or analysis_type in self.gates:
+                continue
+            if stream_key and (analysis_type in self.tracking or (analysis_type == 'text_detection' and ocr_cache.enabled)):
+                continue
+            adapters[analysis_type] = adapter
+        if not adapters:
+            return [None] * len(frames)
+        
+        images = [frame for _, frame in frames]
+        send = list(range(len(images)))
+        if stream_key and frame_dedup.enabled:
+            send = frame_dedup.distinct(stream_key, images, requested_analysis, confidence_threshold)
+        
+        prefetched = [None] * len(frames)
+        if send:
+            batch = self.execution_strategy.execute_batch(adapters, [images[i] for i in send], confidence_threshold)
+            for i, detections in zip(send, batch):
+                prefetched[i] = detections
+        return prefetched
+    
+    def _adapter_map(self):
+        return {
+            'object_detection': self.object_detector,
+            'logo_detection': self.logo_detector,
+            'text_detection': self.text_detector
+        }
+    
+    def analyze_frame(self, image, requested_analysis, confidence_threshold=0.5, stream_key=None, precomputed=None,
+                      cacheable=True):
+        """
+        Analyze a single frame using configured adapters and execution strategy
+        
+        With a stream_key, near-duplicate frames of the same stream reuse the
+        previous results; those results are returned with 'cached': True.
+        Results are only kept for reuse when no detection failed (and cacheable).
+        precomputed maps analysis types to detections already fetched in a batch.
+        """
         results = {}
+        frame_hash = None
+        failures = detection_failures()
+        
+        if stream_key and frame_dedup.enabled:
+            frame_hash, cached = frame_dedup.lookup(stream_key, image, requested_analysis, confidence_threshold)
+            if cached is not None:
+                logger.debug(f"Near-duplicate frame for stream {stream_key}, reusing previous results")
+                return {**cached, 'cached': True}
         
         try:
             # Adapter execution map
-            adapter_map = {
-                'object_detection': self.object_detector,
-                'logo_detection': self.logo_detector,
-                'text_detection': self.text_detector
-            }
+            adapter_map = self._adapter_map()
+            
+            # Frame signals are shared by the gates of every capability
+            signals = FrameSignals(image) if self.gates else None
             
             # Execute detection using strategy
             for analysis_type in requested_analysis:
-                if analysis_type in adapter_map and adapter_map[analysis_type]:
-                    detections = self.execution_strategy.execute_detection(
-                        adapter_map[analysis_type], 
-                        image, 
-                        confidence_threshold
-                    )
-                    
-                    # Map to expected result format
-                    result_key = {
-                        'object_detection': 'objects',
-                        'logo_detection': 'logos', 
-                        'text_detection': 'text'
-                    }.get(analysis_type, analysis_type)
-                    
-                    results[result_key] = detections
+                if not adapter_map.get(analysis_type):
+                    continue
+                
+                # Between detector runs, tracked detections stand in for the detector
+                tracker = None
+                if stream_key and analysis_type in self.tracking:
+                    tracker = trackers.get(stream_key, analysis_type, self.tracking[analysis_type])
+                if tracker and not tracker.needs_detection():
+                    detections = tracker.predict()
+                    trackers.record(detected=False)
+                else:
+                    cascade = self.gates.get(analysis_type)
+                    detections = cascade.evaluate(signals, stream_key) if cascade else None
+                    if detections is None:
+                        if precomputed and analysis_type in precomputed:
+                            detections = precomputed[analysis_type]
+                        elif analysis_type == 'text_detection' and stream_key and ocr_cache.enabled:
+                            detections = self._detect_text_cached(image, confidence_threshold, stream_key)
+                        else:
+                            detections = self.execution_strategy.execute_detection(
+                                adapter_map[analysis_type], 
+                                image, 
+                                confidence_threshold
+                            )
+                        if cascade:
+                            cascade.record_run(signals, stream_key, detections)
+                    if tracker:
+                        detections = tracker.update(detections)
+                        trackers.record(detected=True)
+
+                # Map to expected result format
+                result_key = {
+                    'object_detection': 'objects',
+                    'logo_detection': 'logos',
+                    'text_detection': 'text'
+                }.get(analysis_type, analysis_type)
+
+                results[result_key] = detections
             
             # Visual properties (always computed locally)
             if 'visual_analysis' in requested_analysis:
                 results['visual'] = self._analyze_visual_properties(image)
+            
+            if frame_hash is not None and cacheable and detection_failures() == failures:
+                frame_dedup.store(stream_key, frame_hash, requested_analysis, confidence_threshold, results)
                 
             return results
         finally:
-            # Clean up models after each analysis to prevent memory leaks
+            # Drop adapter references only; weights stay resident in the model pool
             self.cleanup()
     
+    def _detect_text_cached(self, image, confidence_threshold, stream_key):
+        """
+        Text detection that reuses OCR results for unchanged text regions of the stream
+        
+        Local adapters with detect_regions() only OCR the regions that missed;
+        other providers (GCP, remote workers) run on the full frame once and their
+        detections are bucketed per region for the cache. Text they find outside
+        every region is cached under regions of its own, looked up with the
+        proposals from then on. Nothing is cached when the detection failed.
+        """
+        frame = as_frame(image)
+        regions = propose_text_regions(frame.gray)
+        if regions is None:
+            return self.execution_strategy.execute_detection(self.text_detector, frame, confidence_threshold)
+        
+        provider = type(self.text_detector).__name__
+        proposed = len(regions)
+        regions = regions + [
+            region for region in ocr_cache.remembered_regions(stream_key, provider, confidence_threshold)
+            if not any(overlaps(region, proposal) for proposal in regions)
+        ]
+        if not regions:
+            return self.execution_strategy.execute_detection(self.text_detector, frame, confidence_threshold)
+        
+        region_detections = ocr_cache.lookup(stream_key, provider, confidence_threshold, frame.gray, regions)
+        missing = [i for i, detections in enumerate(region_detections) if detections is None]
+        if not missing:
+            return [detection for detections in region_detections for detection in detections]
+        
+        if hasattr(self.text_detector, 'detect_regions') and isinstance(self.execution_strategy, LocalExecutionStrategy):
+            try:
+                fresh = self.text_detector.detect_regions(frame, [regions[i] for i in missing], confidence_threshold)
+                for i, detections in zip(missing, fresh):
+                    region_detections[i] = detections
+                    ocr_cache.store(stream_key, provider, confidence_threshold, frame.gray, regions[i], detections,
+                                    remembered=i >= proposed)
+                return [detection for detections in region_detections for detection in detections]
+            except Exception as e:
+                logger.error(f"Region OCR failed, running full-frame text detection: {e}")
+        
+        failures = detection_failures()
+        detections = self.execution_strategy.execute_detection(self.text_detector, frame, confidence_threshold)
+        if detection_failures() != failures:
+            return detections
+        buckets = assign_to_regions(detections, regions, frame.width, frame.height)
+        for i in missing:
+            ocr_cache.store(stream_key, provider, confidence_threshold, frame.gray, regions[i], buckets[i],
+                            remembered=i >= proposed)
+        
+        bucketed = {id(detection) for bucket in buckets for detection in bucket}
+        outside = [detection for detection in detections if id(detection) not in bucketed]
+        for region, region_detections in zip(*regions_around(outside, frame.width, frame.height)):
+            ocr_cache.store(stream_key, provider, confidence_threshold, frame.gray, region, region_detections,
+                            remembered=True)
+        return detections
+    
     def cleanup(self):
-        """Clean up all models and release memory"""
+        """Release adapter references to pooled models"""
         try:
             if self.logo_detector and hasattr(self.logo_detector, 'cleanup'):
                 self.logo_detector.cleanup()
@@ -159,10 +434,6 @@ class AnalysisEngine:
                 self.text_detector.cleanup()
             if self.motion_analyzer and hasattr(self.motion_analyzer, 'cleanup'):
                 self.motion_analyzer.cleanup()
-                
-            # Force garbage collection
-            import gc
-            gc.collect()
             
         except Exception as e:
             logger.error(f"Cleanup error: {e}")
@@ -184,7 +455,15 @@ class AnalysisEngine:
             return {
                 'execution_strategy': strategy_info,
                 'adapters_configured': configured_adapters,
-                'strategy_available': self.execution_strategy.is_available()
+                'strategy_available': self.execution_strategy.is_available(),
+                'model_pool': model_pool.get_stats(),
+                'batching': batchers.get_stats(),
+                'frame_dedup': frame_dedup.get_stats(),
+                'ocr_cache': ocr_cache.get_stats(),
+                'gating': gate_stats.get_stats(),
+                'tracking': trackers.get_stats(),
+                'http': http_pool.get_stats(),
+                'transport': transport_stats.get_stats()
             }
         except Exception as e:
             return {
@@ -205,34 +484,79 @@ class AnalysisEngine:
         return results
     
     def _analyze_visual_properties(self, image):
-        """Local visual property analysis"""
-        img_array = np.array(image)
+        """Local visual property analysis, fused over one downscaled pyramid level"""
+        frame = as_frame(image)
+        small = frame.downscaled(self.VISUAL_ANALYSIS_SIZE)
+        if frame.channel_order == 'rgb':
+            small = small[..., ::-1]  # Metrics below assume BGR order
+        pixels = small.reshape((-1, 3))
+        
+        # One float conversion shared by every metric (BGR channel order)
+        values = pixels.astype(np.float32)
+        b, g, r = values[:, 0], values[:, 1], values[:, 2]
+        
+        brightness = float(values.mean()) / 255.0
+        gray = 0.114 * b + 0.587 * g + 0.299 * r
+        contrast = float(gray.std()) / 255.0
+        
+        # HSV saturation without a color-space conversion: (max - min) / max
+        max_c = values.max(axis=1)
+        min_c = values.min(axis=1)
+        saturation = float(np.mean(np.divide(max_c - min_c, max_c, out=np.zeros_like(max_c), where=max_c > 0)))
+        
+        # Hasler-Suesstrunk colorfulness on opponent channels
+        rg = r - g
+        yb = 0.5 * (r + g) - b
+        colorfulness = float(np.hypot(rg.std(), yb.std()) + 0.3 * np.hypot(rg.mean(), yb.mean())) / 255.0
         
-        # Dominant colors
-        dominant_colors = self._get_dominant_colors(img_array)
+        # Joint color histogram, 8 levels per channel
+        bins = pixels >> 5
+        index = (bins[:, 2].astype(np.int32) << 6) | (bins[:, 1].astype(np.int32) << 3) | bins[:, 0]
+        counts = np.bincount(index, minlength=512)
         
-        # Visual metrics
-        brightness = float(np.mean(img_array)) / 255.0
-        gray = cv2.cvtColor(img_array, cv2.COLOR_RGB2GRAY)
-        contrast = float(np.std(gray)) / 255.0
-        hsv = cv2.cvtColor(img_array, cv2.COLOR_RGB2HSV)
-        saturation = float(np.mean(hsv[:,:,1])) / 255.0
+        if getattr(settings, 'VISUAL_DOMINANT_COLOR_METHOD', 'histogram') == 'kmeans':
+            dominant_colors = self._kmeans_colors(values, k=3)
+        else:
+            dominant_colors = self._histogram_colors(values, index, counts, k=3)
         
         return {
             'dominant_colors': dominant_colors,
             'brightness_level': brightness,
             'contrast_level': contrast,
-            'saturation_level': saturation
+            'saturation_level': saturation,
+            'colorfulness': colorfulness,
+            'color_histogram': (counts / max(1, len(index))).tolist()
         }
     
-    def _get_dominant_colors(self, image_array, k=3):
+    def _histogram_colors(self, values, index, counts, k=3):
+        """
+        Mean RGB color of the k most populated histogram bins, most frequent first
+        
+        Each chosen bin absorbs its unclaimed neighbours (at most one level away per
+        channel), so a color split across a bin edge comes back once, not as near-duplicates.
+        """
+        sums = np.stack([np.bincount(index, weights=values[:, c], minlength=512) for c in (2, 1, 0)], axis=1)
+        bins = np.arange(512)
+        levels = np.stack([bins >> 6, (bins >> 3) & 7, bins & 7], axis=1)
+        free = counts > 0
+        colors = []
+        for top in np.argsort(counts, kind='stable')[::-1]:
+            if len(colors) == k:
+                break
+            if not free[top]:
+                continue
+            merged = free & (np.abs(levels - levels[top]).max(axis=1) <= 1)
+            free &= ~merged
+            colors.append(np.rint(sums[merged].sum(axis=0) / counts[merged].sum()).astype(int).tolist())
+        return colors
+    
+    def _kmeans_colors(self, values, k=3):
+        """Deterministic k-means RGB colors, clusters ordered by size"""
         try:
-            data = image_array.reshape((-1, 3))
-            data = np.float32(data)
-            
+            cv2.setRNGSeed(0)
             criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 10, 1.0)
-            _, labels, centers = cv2.kmeans(data, k, None, criteria, 10, cv2.KMEANS_RANDOM_CENTERS)
-            
-            return centers.astype(int).tolist()
-        except:
+            _, labels, centers = cv2.kmeans(values, k, None, criteria, 1, cv2.KMEANS_PP_CENTERS)
+            order = np.argsort(np.bincount(labels.ravel(), minlength=k))[::-1]
+            return np.rint(centers[order][:, ::-1]).astype(int).tolist()
+        except Exception:
             return [[128, 128, 128]]
\ No newline at end of file
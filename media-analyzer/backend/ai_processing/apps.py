@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class AiProcessingConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'ai_processing'
+
+    def ready(self):
+        # Register Brand signal handlers for embedding cache invalidation
+        from . import signals
@@ -0,0 +1,126 @@
+"""
+In-worker dynamic batching for model inference.
+
+Concurrent callers (threads of a Celery worker running several segments or
+streams at once) submit single frames; a background thread collects them for up
+to AI_BATCH_MAX_WAIT_MS or AI_BATCH_MAX_SIZE frames, runs one batched forward
+pass and scatters the results back to each caller.
+"""
+
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, List, Optional
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class DynamicBatcher:
+    """Collects items from concurrent callers into batched calls of batch_fn"""
+
+    def __init__(self, batch_fn: Callable[[List[Any]], List[Any]], max_batch_size: int,
+                 max_wait_ms: float, name: str = 'batcher', result_timeout: Optional[float] = None):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.name = name
+        self.result_timeout = result_timeout
+        self._queue = queue.Queue()
+        self._stats = {'batches': 0, 'items': 0, 'max_batch': 0}
+        self._stats_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name=f'batcher-{name}', daemon=True)
+        self._thread.start()
+
+    def submit(self, item: Any, timeout: Optional[float] = None) -> Any:
+        """Submit one item and block until its result is available"""
+        future = Future()
+        self._queue.put((item, future))
+        return future.result(timeout)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats['mean_batch'] = round(stats['items'] / stats['batches'], 2) if stats['batches'] else 0.0
+        return stats
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            items = [item for item, _ in batch]
+            try:
+                results = self.batch_fn(items)
+                for (_, future), result in zip(batch, results):
+                    future.set_result(result)
+                if len(results) != len(items):
+                    raise RuntimeError(f"batch_fn returned {len(results)} results for {len(items)} items")
+            except Exception as e:
+                logger.error(f"Batched inference failed in {self.name} ({len(items)} items): {e}")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+            with self._stats_lock:
+                self._stats['batches'] += 1
+                self._stats['items'] += len(items)
+                self._stats['max_batch'] = max(self._stats['max_batch'], len(items))
+
+
+class BatcherRegistry:
+    """Worker-local registry of batchers, one per model and threshold"""
+
+    def __init__(self):
+        self._batchers = {}
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return getattr(settings, 'AI_BATCH_MAX_SIZE', 1) > 1
+
+    def get(self, key: Hashable, batch_fn: Callable[[List[Any]], List[Any]]) -> Optional[DynamicBatcher]:
+        """Return the batcher for key, or None when batching is disabled"""
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            # Batcher threads do not survive a fork (Celery prefork pool)
+            if self._pid != os.getpid():
+                self._batchers = {}
+                self._pid = os.getpid()
+
+            batcher = self._batchers.get(key)
+            if batcher is None:
+                batcher = DynamicBatcher(
+                    batch_fn,
+                    max_batch_size=getattr(settings, 'AI_BATCH_MAX_SIZE', 1),
+                    max_wait_ms=getattr(settings, 'AI_BATCH_MAX_WAIT_MS', 10),
+                    name=str(key),
+                    result_timeout=getattr(settings, 'AI_BATCH_RESULT_TIMEOUT', 60)
+                )
+                self._batchers[key] = batcher
+            return batcher
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {str(key): batcher.get_stats() for key, batcher in self._batchers.items()}
+
+
+# Global instance
+batchers = BatcherRegistry()
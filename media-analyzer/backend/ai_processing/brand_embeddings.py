@@ -0,0 +1,159 @@
+"""
+Cached CLIP text embeddings for active brand prompts.
+
+The prompt set only changes when Brand rows change, so the text tower runs once
+per model and the normalized embeddings are kept in memory and in Redis for the
+other workers. Brand signals bump a shared version number to invalidate them.
+"""
+
+import json
+import logging
+import threading
+from typing import List, Optional, Tuple
+from django.conf import settings
+import numpy as np
+import redis
+
+logger = logging.getLogger(__name__)
+
+
+NEGATIVE_PROMPT = "a photo with no brands or logos"
+
+
+def build_brand_prompts() -> Tuple[List[str], List[Optional[str]]]:
+    """Build CLIP prompts and the brand label for each prompt (None for the negative prompt)"""
+    from .models import Brand
+
+    prompts = []
+    labels = []
+    for brand in Brand.objects.filter(active=True).order_by('name'):
+        for term in brand.search_terms:
+            prompts.append(f"a photo containing {term}")
+            labels.append(brand.name)
+
+    if not prompts:
+        return [], []
+
+    prompts.append(NEGATIVE_PROMPT)
+    labels.append(None)
+    return prompts, labels
+
+
+class BrandEmbeddingCache:
+    """In-memory and Redis cache of normalized brand text embeddings per CLIP model"""
+
+    ENCODE_BATCH_SIZE = 256
+    REDIS_TTL = 24 * 3600
+
+    def __init__(self):
+        self.redis_client = redis.Redis(
+            host=settings.REDIS_HOST,
+            port=settings.REDIS_PORT
+        )
+        self.key_prefix = 'media_analyzer:brand_embeddings'
+        self.version_key = f'{self.key_prefix}:version'
+        self._entries = {}  # model_identifier -> {'version', 'labels', 'embeddings'}
+        self._local_version = 0
+        self._lock = threading.Lock()
+
+    def get(self, model_identifier, model=None, processor=None, loader=None):
+        """
+        Return (labels, embeddings) for the active brand prompts.
+
+        embeddings is a (num_prompts, dim) float tensor with L2-normalized rows;
+        labels[i] is the brand name for row i, or None for the negative prompt.
+        Returns ([], None) when there are no active brands. Without a model,
+        loader() -> (model, processor) is only called when prompts need encoding.
+        """
+        version = self._current_version()
+
+        with self._lock:
+            entry = self._entries.get(model_identifier)
+            if entry and entry['version'] == version:
+                return entry['labels'], entry['embeddings']
+
+            labels, embeddings = self._load_from_redis(model_identifier, version)
+            if embeddings is None:
+                prompts, labels = build_brand_prompts()
+                if not prompts:
+                    self._entries[model_identifier] = {'version': version, 'labels': [], 'embeddings': None}
+                    return [], None
+                if model is None:
+                    model, processor = loader()
+                embeddings = self._encode_prompts(prompts, model, processor)
+                self._store_in_redis(model_identifier, version, labels, embeddings)
+                logger.info(f"Computed {len(prompts)} brand text embeddings for {model_identifier}")
+
+            import torch
+            tensor = torch.from_numpy(embeddings)
+            self._entries[model_identifier] = {'version': version, 'labels': labels, 'embeddings': tensor}
+            return labels, tensor
+
+    def invalidate(self):
+        """Invalidate cached embeddings in this process and for every other worker"""
+        with self._lock:
+            self._entries.clear()
+            self._local_version += 1
+        try:
+            self.redis_client.incr(self.version_key)
+        except Exception as e:
+            logger.warning(f"Failed to bump brand embedding version in Redis: {e}")
+
+    def _current_version(self):
+        try:
+            version = self.redis_client.get(self.version_key)
+            return int(version) if version else 0
+        except Exception:
+            # Redis unavailable: fall back to process-local invalidation only
+            return f"local-{self._local_version}"
+
+    def _redis_key(self, model_identifier, version):
+        return f'{self.key_prefix}:{model_identifier}:{version}'
+
+    def _encode_prompts(self, prompts, model, processor):
+        import torch
+
+        chunks = []
+        with torch.no_grad():
+            for start in range(0, len(prompts), self.ENCODE_BATCH_SIZE):
+                batch = prompts[start:start + self.ENCODE_BATCH_SIZE]
+                inputs = processor(text=batch, return_tensors="pt", padding=True)
+                features = model.get_text_features(**inputs)
+                chunks.append(features / features.norm(dim=-1, keepdim=True))
+
+        return torch.cat(chunks).cpu().numpy().astype(np.float32)
+
+    def _load_from_redis(self, model_identifier, version):
+        if isinstance(version, str):
+            return None, None
+        try:
+            data = self.redis_client.hgetall(self._redis_key(model_identifier, version))
+            if not data:
+                return None, None
+            labels = json.loads(data[b'labels'])
+            shape = tuple(json.loads(data[b'shape']))
+            embeddings = np.frombuffer(data[b'embeddings'], dtype=np.float32).reshape(shape).copy()
+            return labels, embeddings
+        except Exception as e:
+            logger.warning(f"Failed to load brand embeddings from Redis: {e}")
+            return None, None
+
+    def _store_in_redis(self, model_identifier, version, labels, embeddings):
+        if isinstance(version, str):
+            return
+        try:
+            key = self._redis_key(model_identifier, version)
+            pipe = self.redis_client.pipeline()
+            pipe.hset(key, mapping={
+                'labels': json.dumps(labels),
+                'shape': json.dumps(list(embeddings.shape)),
+                'embeddings': embeddings.tobytes()
+            })
+            pipe.expire(key, self.REDIS_TTL)
+            pipe.execute()
+        except Exception as e:
+            logger.warning(f"Failed to store brand embeddings in Redis: {e}")
+
+
+# Global instance
+brand_embeddings = BrandEmbeddingCache()
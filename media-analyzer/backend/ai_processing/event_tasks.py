@@ -2,8 +2,10 @@ import os
 import logging
 from pathlib import Path
 from celery import shared_task
+from django.conf import settings
 from streaming.segment_events import SegmentEventConsumer
 from .analysis_engine import AnalysisEngine
+from .sampling import sampling_controller
 
 logger = logging.getLogger(__name__)
 
@@ -44,64 +46,68 @@ def process_segment_from_event(self):
             return {'status': 'error', 'error': 'No logo detection provider configured'}
         
         logo_config = config_manager.get_provider_config('logo_detection')
-        analysis_engine.configure_providers({'logo_detection': logo_config})
-        
-        # Extract frame from segment
-        frame = analysis_engine.extract_frame_from_segment(segment_path)
-        if not frame:
-            logger.error(f"Failed to extract frame from {segment_path}")
-            return {'status': 'error', 'error': 'Failed to extract frame from segment'}
-        
-        # Analyze frame for logo detection
-        results = analysis_engine.analyze_frame(
-            image=frame,
-            requested_analysis=['logo_detection'],
-            confidence_threshold=0.5
-        )
-        
-        logo_detections = results.get('logos', [])
-        logger.info(f"Completed analysis for {segment_path}: {len(logo_detections)} logo detections")
-        
-        # Store results in database
-        from .models import VideoAnalysis, DetectionResult
-        from channels.layers import get_channel_layer
-        from asgiref.sync import async_to_sync
-        
-        analysis = VideoAnalysis.objects.create(
+        provider_config = {'logo_detection': logo_config}
+        requested_analysis = ['logo_detection']
+        
+        # Motion analysis shares the segment decode with frame sampling
+        if config_manager.has_capability('motion_analysis'):
+            provider_config['motion_analysis'] = config_manager.get_provider_config('motion_analysis')
+            requested_analysis.append('motion_analysis')
+        
+        if config_manager.has_capability('shot_detection'):
+            provider_config['shot_detection'] = config_manager.get_provider_config('shot_detection')
+            requested_analysis.append('shot_detection')
+        
+        analysis_engine.configure_providers(provider_config)
+        
+        # Frames per segment: fixed, or adapted to the stream's activity and the event backlog
+        sample_mode = settings.AI_FRAME_SAMPLING_MODE
+        max_frames = settings.AI_FRAMES_PER_SEGMENT
+        if sampling_controller.enabled:
+            max_frames = sampling_controller.frames_for(stream_key, consumer.get_queue_length())
+            if sample_mode == 'first' and max_frames > 1:
+                sample_mode = 'uniform'
+        
+        # Decode once: sample frames (first frame, keyframes, evenly spaced or at shot boundaries) and run motion
+        segment_results = analysis_engine.analyze_segment(
+            segment_path,
+            requested_analysis,
+            confidence_threshold=0.5,
             stream_key=stream_key,
-            session_id=session_id,
-            segment_path=segment_path,
-            processing_time=1.5,  # Approximate processing time
-            analysis_type='logo_detection',
-            frame_timestamp=0.0  # First frame of segment
+            sample_mode=sample_mode,
+            max_frames=max_frames
         )
+        if sampling_controller.enabled:
+            sampling_controller.observe(stream_key, segment_results)
+        frames = segment_results['frames']
+        if not frames and sample_mode == 'shots' and 'shots' in segment_results:
+            logger.debug(f"No shot change in {segment_path}, skipping detection")
+            return {
+                'status': 'no_shot_change',
+                'segment_path': segment_path,
+                'stream_key': stream_key,
+                'motion': segment_results.get('motion'),
+                'shots': segment_results['shots']
+            }
+        if not frames:
+            logger.error(f"Failed to extract frame from {segment_path}")
+            return {'status': 'error', 'error': 'Failed to extract frame from segment'}
         
-        # Create detection records and prepare for WebSocket
+        logo_detections = []
         detections = []
-        for logo in logo_detections:
-            detection = DetectionResult.objects.create(
-                analysis=analysis,
-                label=logo['label'],
-                confidence=logo['confidence'],
-                bbox_x=logo['bbox']['x'],
-                bbox_y=logo['bbox']['y'],
-                bbox_width=logo['bbox']['width'],
-                bbox_height=logo['bbox']['height'],
-                detection_type='logo'
+        analysis_ids = []
+        for frame_timestamp, results in frames:
+            frame_logos = results.get('logos', [])
+            analysis, frame_detections = _store_logo_analysis(
+                stream_key, session_id, segment_path, frame_timestamp, frame_logos,
+                cached=results.get('cached', False)
             )
-            detections.append(detection.to_dict())
-        
-        # Send results via WebSocket (always send, even with 0 detections)
-        channel_layer = get_channel_layer()
-        websocket_group = f"stream_{stream_key}"
-        logger.info(f"Sending websocket update to group: {websocket_group} - detections: {len(detections)}")
-        async_to_sync(channel_layer.group_send)(
-            websocket_group,
-            {
-                "type": "analysis_update",
-                "analysis": analysis.to_dict()
-            }
-        )
+            logo_detections.extend(frame_logos)
+            detections.extend(frame_detections)
+            analysis_ids.append(str(analysis.id))
+        
+        logger.info(f"Completed analysis for {segment_path}: {len(logo_detections)} logo detections "
+                    f"over {len(frames)} frame(s)")
         
         # Log successful detection
         if logo_detections:
@@ -112,8 +118,12 @@ def process_segment_from_event(self):
             'segment_path': segment_path,
             'stream_key': stream_key,
             'detections': len(logo_detections),
-            'analysis_id': str(analysis.id),
-            'brands': [d['label'] for d in detections] if detections else []
+            'analysis_id': analysis_ids[0],
+            'analysis_ids': analysis_ids,
+            'brands': [d['label'] for d in detections] if detections else [],
+            'motion': segment_results.get('motion'),
+            'shots': segment_results.get('shots'),
+            'frames_sampled': len(frames)
         }
         
     except Exception as e:
@@ -127,6 +137,53 @@ def process_segment_from_event(self):
         
         return {'status': 'error', 'error': str(e)}
 
+def _store_logo_analysis(stream_key, session_id, segment_path, frame_timestamp, logo_detections, cached=False):
+    """Store logo analysis for one sampled frame and push it to the stream's WebSocket group"""
+    from .models import VideoAnalysis, DetectionResult
+    from channels.layers import get_channel_layer
+    from asgiref.sync import async_to_sync
+    
+    analysis = VideoAnalysis.objects.create(
+        stream_key=stream_key,
+        session_id=session_id,
+        segment_path=segment_path,
+        processing_time=1.5,  # Approximate processing time
+        analysis_type='logo_detection',
+        frame_timestamp=frame_timestamp,  # PTS offset within the segment
+        cached=cached  # Detections reused from a near-duplicate frame
+    )
+    
+    # Create detection records and prepare for WebSocket
+    detections = []
+    for logo in logo_detections:
+        detection = DetectionResult.objects.create(
+            analysis=analysis,
+            label=logo['label'],
+            confidence=logo['confidence'],
+            bbox_x=logo['bbox']['x'],
+            bbox_y=logo['bbox']['y'],
+            bbox_width=logo['bbox']['width'],
+            bbox_height=logo['bbox']['height'],
+            detection_type='logo',
+            metadata={key: logo[key] for key in ('track_id', 'tracked') if key in logo}
+        )
+        detections.append(detection.to_dict())
+    
+    # Send results via WebSocket (always send, even with 0 detections)
+    channel_layer = get_channel_layer()
+    websocket_group = f"stream_{stream_key}"
+    logger.info(f"Sending websocket update to group: {websocket_group} - detections: {len(detections)}")
+    async_to_sync(channel_layer.group_send)(
+        websocket_group,
+        {
+            "type": "analysis_update",
+            "analysis": analysis.to_dict()
+        }
+    )
+    
+    return analysis, detections
+
+
 @shared_task
 def start_event_processor():
     """
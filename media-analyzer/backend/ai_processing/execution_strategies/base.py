@@ -14,11 +14,27 @@ logger = logging.getLogger(__name__)
 class ExecutionStrategy(ABC):
     """Base class for execution strategies."""
     
+    # Whether execute_batch is cheaper than separate execute_detection calls
+    supports_batch = False
+    
     @abstractmethod
     def execute_detection(self, adapter, image, confidence_threshold=0.5) -> List[Dict[str, Any]]:
         """Execute detection using provided adapter."""
         pass
     
+    def execute_batch(self, adapters, images, confidence_threshold=0.5) -> List[Dict[str, List[Dict[str, Any]]]]:
+        """
+        Execute several capabilities on several frames
+        
+        adapters maps analysis type to adapter. Returns one {analysis_type: detections}
+        dict per image. The default runs each adapter on each frame in turn.
+        """
+        return [
+            {analysis_type: self.execute_detection(adapter, image, confidence_threshold)
+             for analysis_type, adapter in adapters.items()}
+            for image in images
+        ]
+    
     @abstractmethod
     def is_available(self) -> bool:
         """Check if this execution strategy is available/healthy."""
@@ -44,7 +60,18 @@ class ExecutionStrategyFactory:
             from .remote_lan_execution import RemoteLANExecutionStrategy
             worker_host = kwargs.get('worker_host')
             timeout = kwargs.get('timeout', 30)
-            return RemoteLANExecutionStrategy(worker_host, timeout)
+            batch_max_frames = kwargs.get('batch_max_frames', 16)
+            return RemoteLANExecutionStrategy(worker_host, timeout, batch_max_frames)
+        elif strategy_type == 'remote_pool':
+            from .worker_pool_execution import WorkerPoolExecutionStrategy
+            return WorkerPoolExecutionStrategy(
+                kwargs.get('worker_hosts'),
+                timeout=kwargs.get('timeout', 30),
+                batch_max_frames=kwargs.get('batch_max_frames', 16),
+                routing=kwargs.get('routing', 'least_outstanding'),
+                failure_threshold=kwargs.get('failure_threshold', 3),
+                cooldown=kwargs.get('cooldown', 10.0)
+            )
         elif strategy_type == 'cloud':
             from .cloud_execution import CloudExecutionStrategy
             return CloudExecutionStrategy()
@@ -5,6 +5,7 @@ Cloud execution strategy - uses cloud services or runs cloud-optimized adapters.
 import logging
 from typing import Dict, Any, List
 from .base import ExecutionStrategy
+from ..adapters.base import record_detection_failure
 
 logger = logging.getLogger(__name__)
 
@@ -20,6 +21,7 @@ class CloudExecutionStrategy(ExecutionStrategy):
             return adapter.detect(image, confidence_threshold)
         except Exception as e:
             logger.error(f"Cloud execution failed: {e}")
+            record_detection_failure()
             return []
     
     def is_available(self) -> bool:
@@ -5,6 +5,7 @@ Local execution strategy - runs analysis adapters in the same process/container.
 import logging
 from typing import Dict, Any, List
 from .base import ExecutionStrategy
+from ..adapters.base import record_detection_failure
 
 logger = logging.getLogger(__name__)
 
@@ -18,6 +19,7 @@ class LocalExecutionStrategy(ExecutionStrategy):
             return adapter.detect(image, confidence_threshold)
         except Exception as e:
             logger.error(f"Local execution failed: {e}")
+            record_detection_failure()
             return []
     
     def is_available(self) -> bool:
@@ -1,13 +1,36 @@
 """
 Remote LAN execution strategy - sends analysis requests to a LAN worker.
+
+Single frame, one capability: POST /ai/analyze
+    {"image": <base64 JPEG>, "analysis_types": [type], "confidence_threshold": 0.5,
+     "adapter_config": {"type": ..., "model_identifier": ...}}
+    -> {"detections": [...]}
+
+Many frames, every capability in one round trip: POST /ai/analyze_batch
+    {"frames": [{"id": "0", "image": <base64 JPEG>}, ...],
+     "analysis_types": ["logo_detection", "object_detection"],
+     "confidence_threshold": 0.5,
+     "adapter_config": {"logo_detection": {"type": ..., "model_identifier": ...}, ...}}
+    -> {"results": [{"id": "0", "detections": {"logo_detection": [...], ...}, "error": null}, ...]}
+
+Each frame is encoded once per batch however many capabilities run on it.
+Workers without /analyze_batch (404) are served one /analyze call per frame and adapter.
+A worker answering 413 (optionally with {"max_frames": n}) gets smaller batches from then on.
+
+With AI_WORKER_TRANSPORT=binary both endpoints take the same fields as a
+length-prefixed frame payload (see frame_codec) instead of JSON, sent as
+Content-Type application/x-media-analyzer-frames. Workers that answer 415
+are switched back to JSON.
 """
 
 import logging
 import requests
-import base64
-import io
 from typing import Dict, Any, List
+from django.conf import settings
 from .base import ExecutionStrategy
+from ..adapters.base import record_detection_failure
+from ..frame_codec import FrameCodec, CONTENT_TYPE, transport_stats
+from ..http_pool import http_pool
 
 logger = logging.getLogger(__name__)
 
@@ -15,9 +38,15 @@ logger = logging.getLogger(__name__)
 class RemoteLANExecutionStrategy(ExecutionStrategy):
     """Execute analysis on a remote LAN worker via HTTP."""
     
-    def __init__(self, worker_host: str, timeout: int = 30):
+    supports_batch = True
+    
+    def __init__(self, worker_host: str, timeout: int = 30, batch_max_frames: int = 16):
         self.worker_host = worker_host
         self.timeout = timeout
+        self.batch_max_frames = max(1, batch_max_frames)
+        self._batch_endpoint = True  # Cleared once the worker answers 404
+        self.transport = getattr(settings, 'AI_WORKER_TRANSPORT', 'json')
+        self.codec = FrameCodec.from_settings()
         
         if not self.worker_host:
             raise ValueError("worker_host is required for RemoteLANExecutionStrategy")
@@ -25,62 +54,136 @@ class RemoteLANExecutionStrategy(ExecutionStrategy):
     def execute_detection(self, adapter, image, confidence_threshold=0.5) -> List[Dict[str, Any]]:
         """Send detection request to remote LAN worker."""
         try:
-            # Encode image for network transfer
-            buffer = io.BytesIO()
-            image.save(buffer, format='JPEG', quality=85)
-            image_b64 = base64.b64encode(buffer.getvalue()).decode('utf-8')
-            
-            # Determine analysis type from adapter class name
-            adapter_name = adapter.__class__.__name__
-            if 'Logo' in adapter_name:
-                analysis_type = 'logo_detection'
-            elif 'Object' in adapter_name:
-                analysis_type = 'object_detection'
-            elif 'Text' in adapter_name:
-                analysis_type = 'text_detection'
-            else:
-                analysis_type = 'unknown'
-            
-            # Prepare request payload
-            payload = {
-                'image': image_b64,
-                'analysis_types': [analysis_type],
-                'confidence_threshold': confidence_threshold,
-                'adapter_config': {
-                    'type': adapter_name,
-                    'model_identifier': getattr(adapter, 'model_identifier', None)
-                }
-            }
-            
-            # Send to LAN worker
-            worker_url = f"http://{self.worker_host}"
-            if not worker_url.endswith('/ai'):
-                worker_url += '/ai'
-                
-            response = requests.post(
-                f"{worker_url}/analyze",
-                json=payload,
-                timeout=self.timeout
-            )
-            response.raise_for_status()
-            
-            result = response.json()
-            return result.get('detections', [])
-            
+            return self.request_detection(adapter, image, confidence_threshold)
         except requests.exceptions.Timeout:
             logger.error(f"LAN worker timeout after {self.timeout}s")
-            return []
         except requests.exceptions.ConnectionError:
             logger.error(f"Cannot connect to LAN worker at {self.worker_host}")
-            return []
         except Exception as e:
             logger.error(f"Remote LAN execution failed: {e}")
-            return []
+        record_detection_failure()
+        return []
+    
+    def execute_batch(self, adapters, images, confidence_threshold=0.5) -> List[Dict[str, List[Dict[str, Any]]]]:
+        """Send every frame and capability to the worker in batches of batch_max_frames frames."""
+        try:
+            return self.request_batch(adapters, images, confidence_threshold)
+        except requests.exceptions.Timeout:
+            logger.error(f"LAN worker batch timeout after {self.timeout}s ({len(images)} frames)")
+        except requests.exceptions.ConnectionError:
+            logger.error(f"Cannot connect to LAN worker at {self.worker_host}")
+        except Exception as e:
+            logger.error(f"Remote LAN batch execution failed: {e}")
+        record_detection_failure()
+        return [{analysis_type: [] for analysis_type in adapters} for _ in images]
+    
+    def request_detection(self, adapter, image, confidence_threshold=0.5) -> List[Dict[str, Any]]:
+        """Like execute_detection, but request failures raise (requests exceptions)."""
+        # Prepare request metadata
+        metadata = {
+            'analysis_types': [analysis_type_for(adapter)],
+            'confidence_threshold': confidence_threshold,
+            'adapter_config': adapter_config(adapter)
+        }
+        
+        # Send to LAN worker
+        response = self._post_frames('analyze', metadata, [image])
+        response.raise_for_status()
+        
+        result = response.json()
+        return result.get('detections', [])
+    
+    def request_batch(self, adapters, images, confidence_threshold=0.5) -> List[Dict[str, List[Dict[str, Any]]]]:
+        """Like execute_batch, but request failures raise (requests exceptions)."""
+        results = []
+        for start in range(0, len(images), self.batch_max_frames):
+            chunk = images[start:start + self.batch_max_frames]
+            chunk_results = self._post_batch(adapters, chunk, confidence_threshold) if self._batch_endpoint else None
+            if chunk_results is None:
+                # Worker predates the batch endpoint
+                chunk_results = [
+                    {analysis_type: self.request_detection(adapter, image, confidence_threshold)
+                     for analysis_type, adapter in adapters.items()}
+                    for image in chunk
+                ]
+            results.extend(chunk_results)
+        return results
+    
+    def _post_batch(self, adapters, images, confidence_threshold):
+        """One /analyze_batch round trip; None when the worker has no batch endpoint"""
+        metadata = {
+            'analysis_types': list(adapters),
+            'confidence_threshold': confidence_threshold,
+            'adapter_config': {analysis_type: adapter_config(adapter) for analysis_type, adapter in adapters.items()}
+        }
+        
+        response = self._post_frames('analyze_batch', metadata, images)
+        if response.status_code == 404:
+            logger.warning(f"LAN worker at {self.worker_host} has no batch endpoint, sending frames one by one")
+            self._batch_endpoint = False
+            return None
+        if response.status_code == 413 and len(images) > 1:
+            limit = self._batch_limit(response, len(images))
+            logger.warning(f"LAN worker at {self.worker_host} rejected {len(images)} frames, sending at most {limit} per batch")
+            self.batch_max_frames = limit
+            return [
+                result
+                for start in range(0, len(images), limit)
+                for result in self._post_batch(adapters, images[start:start + limit], confidence_threshold)
+            ]
+        response.raise_for_status()
+        
+        by_id = {str(entry.get('id')): entry for entry in response.json().get('results', [])}
+        results = []
+        for i in range(len(images)):
+            entry = by_id.get(str(i)) or {}
+            if entry.get('error'):
+                logger.error(f"LAN worker failed on batch frame {i}: {entry['error']}")
+                record_detection_failure()
+            detections = entry.get('detections') or {}
+            results.append({analysis_type: detections.get(analysis_type, []) for analysis_type in adapters})
+        return results
+    
+    def _batch_limit(self, response, frame_count) -> int:
+        """Frames per batch after a 413: the worker's max_frames, else half the rejected batch"""
+        try:
+            limit = int(response.json().get('max_frames') or frame_count // 2)
+        except (ValueError, TypeError, AttributeError):
+            limit = frame_count // 2
+        return max(1, min(limit, frame_count - 1))
+    
+    def _post_frames(self, endpoint, metadata, images) -> requests.Response:
+        """POST frames and request metadata to an endpoint in the configured transport"""
+        url = f"{self.worker_url}/{endpoint}"
+        if self.transport == 'binary':
+            payload = self.codec.payload(metadata, images)
+            response = http_pool.post(url, data=payload, headers={'Content-Type': CONTENT_TYPE}, timeout=self.timeout)
+            if response.status_code != 415:
+                transport_stats.record('binary', payload.stats)
+                return response
+            logger.warning(f"LAN worker at {self.worker_host} does not accept binary frames, using JSON")
+            self.transport = 'json'
+        
+        encoded, stats = self.codec.encode_base64(images)
+        if endpoint == 'analyze_batch':
+            body = {'frames': [{'id': str(i), 'image': image} for i, image in enumerate(encoded)], **metadata}
+        else:
+            body = {'image': encoded[0], **metadata}
+        response = http_pool.post(url, json=body, timeout=self.timeout)
+        transport_stats.record('json', stats)
+        return response
+    
+    @property
+    def worker_url(self) -> str:
+        worker_url = f"http://{self.worker_host}"
+        if not worker_url.endswith('/ai'):
+            worker_url += '/ai'
+        return worker_url
     
     def is_available(self) -> bool:
         """Check if LAN worker is available."""
         try:
-            response = requests.get(f"http://{self.worker_host}/ai/health", timeout=5)
+            response = http_pool.get(f"http://{self.worker_host}/ai/health", timeout=5, retry=False)
             return response.status_code == 200
         except:
             return False
@@ -88,7 +191,7 @@ class RemoteLANExecutionStrategy(ExecutionStrategy):
     def get_info(self) -> Dict[str, Any]:
         """Get information about LAN worker."""
         try:
-            response = requests.get(f"http://{self.worker_host}/ai/info", timeout=5)
+            response = http_pool.get(f"http://{self.worker_host}/ai/info", timeout=5, retry=False)
             if response.status_code == 200:
                 worker_info = response.json()
                 return {
@@ -105,4 +208,24 @@ class RemoteLANExecutionStrategy(ExecutionStrategy):
             'status': 'unavailable',
             'worker_host': self.worker_host,
             'error': 'worker_unreachable'
-        }
\ No newline at end of file
+        }
+
+
+def analysis_type_for(adapter) -> str:
+    """Analysis type of an adapter, from its class name"""
+    adapter_name = adapter.__class__.__name__
+    if 'Logo' in adapter_name:
+        return 'logo_detection'
+    elif 'Object' in adapter_name:
+        return 'object_detection'
+    elif 'Text' in adapter_name:
+        return 'text_detection'
+    return 'unknown'
+
+
+def adapter_config(adapter) -> Dict[str, Any]:
+    """Adapter description the worker uses to pick its model"""
+    return {
+        'type': adapter.__class__.__name__,
+        'model_identifier': getattr(adapter, 'model_identifier', None)
+    }
\ No newline at end of file
@@ -0,0 +1,255 @@
+"""
+Worker pool execution strategy - spreads analysis over several LAN workers.
+
+Each request goes to one host picked by routing:
+    least_outstanding - fewest requests in flight from this process (ties by latency)
+    ewma              - lowest latency EWMA weighted by requests in flight
+
+A circuit breaker per host opens after AI_WORKER_BREAKER_FAILURES consecutive
+failures (timeouts, connection errors, 5xx) and keeps the host out of rotation
+for AI_WORKER_BREAKER_COOLDOWN seconds. After that a background /ai/health
+probe decides: on success the host is half-open and gets one trial request,
+which closes the circuit when it succeeds. A failed request is retried once on
+another host. Host state is per process and shared by every engine instance.
+"""
+
+import logging
+import random
+import threading
+import time
+from typing import Dict, Any, List, Optional
+import requests
+from .base import ExecutionStrategy
+from .remote_lan_execution import RemoteLANExecutionStrategy
+from ..adapters.base import record_detection_failure
+
+logger = logging.getLogger(__name__)
+
+ROUTING_POLICIES = ('least_outstanding', 'ewma')
+
+
+class WorkerHost:
+    """Routing and circuit breaker state of one worker host"""
+
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+    def __init__(self, host, ewma_alpha=0.3):
+        self.host = host
+        self.ewma_alpha = ewma_alpha
+        self.outstanding = 0
+        self.latency_ewma: Optional[float] = None
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.probing = False
+        self.trial_in_flight = False
+        self.requests = 0
+        self.failures = 0
+        self.lock = threading.Lock()
+
+    def begin(self) -> bool:
+        """Claim the host for a request; False when it stopped being routable meanwhile"""
+        with self.lock:
+            if not self.routable():
+                return False
+            self.outstanding += 1
+            self.requests += 1
+            if self.state == self.HALF_OPEN:
+                self.trial_in_flight = True
+            return True
+
+    def succeed(self, elapsed):
+        with self.lock:
+            self.outstanding -= 1
+            self.consecutive_failures = 0
+            if self.latency_ewma is None:
+                self.latency_ewma = elapsed
+            else:
+                self.latency_ewma += self.ewma_alpha * (elapsed - self.latency_ewma)
+            if self.state != self.CLOSED:
+                logger.info(f"Worker {self.host} recovered, closing circuit")
+            self.state = self.CLOSED
+            self.trial_in_flight = False
+
+    def fail(self, failure_threshold):
+        with self.lock:
+            self.outstanding -= 1
+            self.failures += 1
+            self.consecutive_failures += 1
+            self.trial_in_flight = False
+            if self.state == self.HALF_OPEN or self.consecutive_failures >= failure_threshold:
+                if self.state != self.OPEN:
+                    logger.warning(f"Worker {self.host} failing ({self.consecutive_failures} in a row), opening circuit")
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+    def release(self):
+        """Request ended without saying anything about the host's health"""
+        with self.lock:
+            self.outstanding -= 1
+            self.trial_in_flight = False
+
+    def routable(self) -> bool:
+        if self.state == self.CLOSED:
+            return True
+        return self.state == self.HALF_OPEN and not self.trial_in_flight
+
+    def get_info(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                'state': self.state,
+                'outstanding': self.outstanding,
+                'latency_ewma_ms': round(self.latency_ewma * 1000, 1) if self.latency_ewma is not None else None,
+                'consecutive_failures': self.consecutive_failures,
+                'requests': self.requests,
+                'failures': self.failures
+            }
+
+
+class WorkerHostRegistry:
+    """Process-wide WorkerHost per host, so breaker state outlives engine instances"""
+
+    def __init__(self):
+        self._hosts: Dict[str, WorkerHost] = {}
+        self._lock = threading.Lock()
+
+    def get(self, host) -> WorkerHost:
+        with self._lock:
+            if host not in self._hosts:
+                self._hosts[host] = WorkerHost(host)
+            return self._hosts[host]
+
+
+class WorkerPoolExecutionStrategy(ExecutionStrategy):
+    """Execute analysis on a pool of LAN workers with routing and circuit breaking."""
+
+    supports_batch = True
+
+    def __init__(self, worker_hosts: List[str], timeout: int = 30, batch_max_frames: int = 16,
+                 routing: str = 'least_outstanding', failure_threshold: int = 3, cooldown: float = 10.0):
+        worker_hosts = [host.strip() for host in worker_hosts or [] if host and host.strip()]
+        if not worker_hosts:
+            raise ValueError("worker_hosts is required for WorkerPoolExecutionStrategy")
+        if routing not in ROUTING_POLICIES:
+            raise ValueError(f"Unknown worker routing policy: {routing}")
+
+        self.timeout = timeout
+        self.routing = routing
+        self.failure_threshold = max(1, failure_threshold)
+        self.cooldown = cooldown
+        self.workers = {
+            host: RemoteLANExecutionStrategy(host, timeout, batch_max_frames)
+            for host in worker_hosts
+        }
+        self.hosts = [worker_hosts_state.get(host) for host in worker_hosts]
+
+    def execute_detection(self, adapter, image, confidence_threshold=0.5) -> List[Dict[str, Any]]:
+        """Run detection on the best available worker, failing over once."""
+        result = self._execute(lambda worker: worker.request_detection(adapter, image, confidence_threshold))
+        if result is not None:
+            return result
+        record_detection_failure()
+        return []
+
+    def execute_batch(self, adapters, images, confidence_threshold=0.5) -> List[Dict[str, List[Dict[str, Any]]]]:
+        """Send the whole batch to the best available worker, failing over once."""
+        result = self._execute(lambda worker: worker.request_batch(adapters, images, confidence_threshold))
+        if result is not None:
+            return result
+        record_detection_failure()
+        return [{analysis_type: [] for analysis_type in adapters} for _ in images]
+
+    def _execute(self, call):
+        tried = set()
+        attempts = 0
+        while attempts < min(2, len(self.hosts)):
+            host = self._pick(exclude=tried)
+            if host is None:
+                break
+            tried.add(host.host)
+            if not host.begin():
+                continue
+            attempts += 1
+            start = time.perf_counter()
+            try:
+                result = call(self.workers[host.host])
+            except requests.exceptions.HTTPError as e:
+                if e.response is not None and e.response.status_code < 500:
+                    # The request was rejected, another worker would reject it too
+                    host.release()
+                    logger.error(f"Worker {host.host} rejected request: {e}")
+                    return None
+                host.fail(self.failure_threshold)
+                logger.error(f"Worker {host.host} failed: {e}")
+            except Exception as e:
+                host.fail(self.failure_threshold)
+                logger.error(f"Worker {host.host} failed: {e}")
+            else:
+                host.succeed(time.perf_counter() - start)
+                return result
+
+        if not attempts:
+            logger.error("No worker available, all circuits open")
+        return None
+
+    def _pick(self, exclude=()) -> Optional[WorkerHost]:
+        """Best routable host by the routing policy; probes hosts whose cooldown has passed"""
+        candidates = []
+        for host in self.hosts:
+            if host.host in exclude:
+                continue
+            if host.state == WorkerHost.OPEN:
+                self._maybe_probe(host)
+            if host.routable():
+                candidates.append(host)
+        if not candidates:
+            return None
+
+        # Hosts without a latency sample yet rank first so they get measured
+        if self.routing == 'ewma':
+            key = lambda host: (host.latency_ewma or 0.0) * (host.outstanding + 1)
+        else:
+            key = lambda host: (host.outstanding, host.latency_ewma or 0.0)
+        best = min(key(host) for host in candidates)
+        return random.choice([host for host in candidates if key(host) == best])
+
+    def _maybe_probe(self, host):
+        with host.lock:
+            if host.probing or time.monotonic() - host.opened_at < self.cooldown:
+                return
+            host.probing = True
+        threading.Thread(target=self._probe, args=(host,), name=f'probe-{host.host}', daemon=True).start()
+
+    def _probe(self, host):
+        healthy = False
+        try:
+            healthy = self.workers[host.host].is_available()
+        finally:
+            with host.lock:
+                host.probing = False
+                if host.state == WorkerHost.OPEN:
+                    if healthy:
+                        host.state = WorkerHost.HALF_OPEN
+                        logger.info(f"Worker {host.host} passed health probe, half-open")
+                    else:
+                        host.opened_at = time.monotonic()
+
+    def is_available(self) -> bool:
+        """Available while any worker's circuit is not open."""
+        return any(host.state != WorkerHost.OPEN for host in self.hosts)
+
+    def get_info(self) -> Dict[str, Any]:
+        """Get routing and circuit state of every worker."""
+        hosts = {host.host: host.get_info() for host in self.hosts}
+        available = sum(1 for info in hosts.values() if info['state'] != WorkerHost.OPEN)
+        return {
+            'strategy': 'remote_pool',
+            'status': 'available' if available else 'unavailable',
+            'routing': self.routing,
+            'available_workers': available,
+            'workers': hosts
+        }
+
+
+# Global instance
+worker_hosts_state = WorkerHostRegistry()
@@ -0,0 +1,114 @@
+"""
+Frame container shared by the engine and adapters.
+
+A decoded frame is held as one contiguous uint8 HxWx3 buffer in the decoder's
+native channel order (BGR for OpenCV and PyAV). RGB is a zero-copy channel-
+reversed view; PIL, grayscale and pyramid levels are built lazily once and
+cached, so each adapter takes the layout it needs without re-copying the frame.
+"""
+
+import cv2
+import numpy as np
+from PIL import Image
+
+
+class Frame:
+    """Decoded video frame with lazy RGB/BGR/PIL/grayscale views"""
+
+    def __init__(self, data, channel_order='bgr', pts=None):
+        if channel_order not in ('bgr', 'rgb'):
+            raise ValueError(f"Unsupported channel order: {channel_order}")
+        self.data = np.ascontiguousarray(data, dtype=np.uint8)
+        self.channel_order = channel_order
+        self.pts = pts  # Seconds from segment start, when known
+        self._pil = None
+        self._gray = None
+        self._pyramid = [self.data]
+
+    @classmethod
+    def from_bgr(cls, array, pts=None):
+        return cls(array, 'bgr', pts)
+
+    @classmethod
+    def from_rgb(cls, array, pts=None):
+        return cls(array, 'rgb', pts)
+
+    @classmethod
+    def from_pil(cls, image, pts=None):
+        frame = cls(np.asarray(image.convert('RGB')), 'rgb', pts)
+        frame._pil = image
+        return frame
+
+    @property
+    def bgr(self):
+        """BGR view (zero-copy, may be non-contiguous)"""
+        return self.data if self.channel_order == 'bgr' else self.data[..., ::-1]
+
+    @property
+    def rgb(self):
+        """RGB view (zero-copy, may be non-contiguous)"""
+        return self.data if self.channel_order == 'rgb' else self.data[..., ::-1]
+
+    @property
+    def pil(self):
+        """PIL image, built on first access"""
+        if self._pil is None:
+            self._pil = Image.fromarray(self.rgb)
+        return self._pil
+
+    @property
+    def gray(self):
+        """Single-channel luma, built on first access"""
+        if self._gray is None:
+            code = cv2.COLOR_BGR2GRAY if self.channel_order == 'bgr' else cv2.COLOR_RGB2GRAY
+            self._gray = cv2.cvtColor(self.data, code)
+        return self._gray
+
+    def pyramid_level(self, level):
+        """Level 0 is the full frame, each further level halves resolution (cached cv2.pyrDown)"""
+        while len(self._pyramid) <= level:
+            self._pyramid.append(cv2.pyrDown(self._pyramid[-1]))
+        return self._pyramid[level]
+
+    def downscaled(self, max_side):
+        """First pyramid level whose longest side fits in max_side (same channel order as data)"""
+        level = 0
+        longest = max(self.width, self.height)
+        while longest > max_side and longest > 1:
+            longest = (longest + 1) // 2
+            level += 1
+        return self.pyramid_level(level)
+
+    @property
+    def width(self):
+        return self.data.shape[1]
+
+    @property
+    def height(self):
+        return self.data.shape[0]
+
+    @property
+    def size(self):
+        """(width, height), same convention as PIL"""
+        return self.width, self.height
+
+    def to_jpeg(self, quality=85) -> bytes:
+        """Encode as JPEG straight from the BGR buffer"""
+        ok, buffer = cv2.imencode('.jpg', self.bgr, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        if not ok:
+            raise ValueError("JPEG encoding failed")
+        return buffer.tobytes()
+
+    def __repr__(self):
+        return f"<Frame {self.width}x{self.height} {self.channel_order} pts={self.pts}>"
+
+
+def as_frame(image) -> Frame:
+    """Accept a Frame, PIL image or RGB ndarray and return a Frame"""
+    if isinstance(image, Frame):
+        return image
+    if isinstance(image, Image.Image):
+        return Frame.from_pil(image)
+    if isinstance(image, np.ndarray):
+        return Frame.from_rgb(image)
+    raise TypeError(f"Unsupported image type: {type(image).__name__}")
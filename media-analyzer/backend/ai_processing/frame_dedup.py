@@ -0,0 +1,111 @@
+"""
+Perceptual-hash cache of recent analysis results per stream.
+
+Static scenes, slates and paused streams produce near-identical frames segment
+after segment. A 64-bit difference hash (dHash) of each analyzed frame is kept
+per stream; a new frame within AI_DEDUP_MAX_DISTANCE bits of a recent one
+reuses its detections instead of running inference again.
+"""
+
+import copy
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
+from django.conf import settings
+import cv2
+import numpy as np
+from .stream_registry import StreamStateRegistry
+from .frame import as_frame
+
+logger = logging.getLogger(__name__)
+
+
+def dhash(image, hash_size=8) -> int:
+    """Difference hash of a frame: sign of horizontal gradients on a tiny grayscale thumbnail"""
+    gray = as_frame(image).gray
+    thumb = cv2.resize(gray, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    bits = (thumb[:, 1:] > thumb[:, :-1]).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count('1')
+
+
+class FrameDedupCache:
+    """Per-stream history of (frame hash, analysis request, results)"""
+
+    def __init__(self, max_distance=None, max_age=None, history_size=8, idle_timeout=600):
+        self.max_distance = max_distance if max_distance is not None else getattr(settings, 'AI_DEDUP_MAX_DISTANCE', 4)
+        self.max_age = max_age if max_age is not None else getattr(settings, 'AI_DEDUP_MAX_AGE', 60)
+        self.history_size = history_size
+        self._streams = StreamStateRegistry(lambda: deque(maxlen=self.history_size), idle_timeout)
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_distance >= 0
+
+    def lookup(self, stream_key, image, requested_analysis, confidence_threshold) -> Tuple[int, Optional[Dict[str, Any]]]:
+        """Return (frame_hash, cached_results); cached_results is None on a miss, else the caller's own copy"""
+        frame_hash = dhash(image)
+        request_key = self._request_key(requested_analysis, confidence_threshold)
+        now = time.monotonic()
+
+        with self._lock:
+            history = self._streams.get(stream_key)
+            for entry_hash, entry_key, results, created in history:
+                if entry_key != request_key or now - created > self.max_age:
+                    continue
+                if hamming_distance(frame_hash, entry_hash) <= self.max_distance:
+                    self._stats['hits'] += 1
+                    return frame_hash, copy.deepcopy(results)
+
+            self._stats['misses'] += 1
+            return frame_hash, None
+
+    def distinct(self, stream_key, images, requested_analysis, confidence_threshold) -> List[int]:
+        """
+        Indexes of the images that lookup() would miss: no match in the stream's
+        history nor among the earlier images of the list. Stats are left alone.
+        """
+        request_key = self._request_key(requested_analysis, confidence_threshold)
+        now = time.monotonic()
+        with self._lock:
+            known = [entry_hash for entry_hash, entry_key, _, created in self._streams.get(stream_key)
+                     if entry_key == request_key and now - created <= self.max_age]
+
+        indexes = []
+        for i, image in enumerate(images):
+            frame_hash = dhash(image)
+            if any(hamming_distance(frame_hash, entry_hash) <= self.max_distance for entry_hash in known):
+                continue
+            known.append(frame_hash)
+            indexes.append(i)
+        return indexes
+
+    def store(self, stream_key, frame_hash, requested_analysis, confidence_threshold, results) -> None:
+        request_key = self._request_key(requested_analysis, confidence_threshold)
+        results = copy.deepcopy(results)  # The caller keeps mutating its own results
+        with self._lock:
+            history = self._streams.get(stream_key)
+            history.appendleft((frame_hash, request_key, results, time.monotonic()))
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self._stats['hits'] + self._stats['misses']
+            return {
+                **self._stats,
+                'hit_rate': round(self._stats['hits'] / total, 3) if total else 0.0,
+                'streams': len(self._streams)
+            }
+
+    def _request_key(self, requested_analysis, confidence_threshold):
+        return tuple(sorted(requested_analysis)), confidence_threshold
+
+
+# Global instance
+frame_dedup = FrameDedupCache()
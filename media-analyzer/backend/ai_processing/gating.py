@@ -0,0 +1,285 @@
+"""
+Cascade gating for expensive adapters.
+
+Cheap per-frame signals decide whether CLIP, YOLO, OCR or cloud calls run at
+all. Gates are declared per provider in its api_config:
+
+    "gates": [
+        {"type": "black_frame", "max_mean": 16, "max_std": 8},
+        {"type": "letterbox", "min_active_area": 0.25},
+        {"type": "frame_diff", "min_energy": 3.0},
+        {"type": "scene_change", "min_distance": 0.2},
+        {"type": "logo_precheck", "min_probability": 0.3}
+    ]
+
+Gates run in order and the first one that fires decides: 'skip' (the frame
+has nothing to find, empty results) or 'reuse' (nothing changed since the
+adapter last ran for this stream, its previous results are returned).
+Decisions are counted in-process and in a Redis hash shared by all workers.
+"""
+
+import copy
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+import cv2
+import numpy as np
+import redis
+from django.conf import settings
+from .frame import as_frame
+from .model_pool import model_pool
+from .stream_registry import StreamStateRegistry
+
+logger = logging.getLogger(__name__)
+
+
+class FrameSignals:
+    """Cheap features of one frame, computed lazily and shared by every gate and capability"""
+
+    THUMBNAIL_SIZE = 160
+
+    def __init__(self, image):
+        self.frame = as_frame(image)
+        self.cache: Dict[str, Any] = {}
+
+    @property
+    def thumbnail(self):
+        """BGR pyramid level with longest side <= THUMBNAIL_SIZE"""
+        if 'thumbnail' not in self.cache:
+            small = self.frame.downscaled(self.THUMBNAIL_SIZE)
+            self.cache['thumbnail'] = small[..., ::-1] if self.frame.channel_order == 'rgb' else small
+        return self.cache['thumbnail']
+
+    @property
+    def gray(self):
+        if 'gray' not in self.cache:
+            self.cache['gray'] = cv2.cvtColor(np.ascontiguousarray(self.thumbnail), cv2.COLOR_BGR2GRAY)
+        return self.cache['gray']
+
+    @property
+    def hsv_histogram(self):
+        """Normalized 2D hue/saturation histogram"""
+        if 'hsv_histogram' not in self.cache:
+            hsv = cv2.cvtColor(np.ascontiguousarray(self.thumbnail), cv2.COLOR_BGR2HSV)
+            histogram = cv2.calcHist([hsv], [0, 1], None, [30, 32], [0, 180, 0, 256])
+            self.cache['hsv_histogram'] = cv2.normalize(histogram, histogram).flatten()
+        return self.cache['hsv_histogram']
+
+
+class Gate:
+    """A cheap check that can stop an adapter from running on a frame"""
+
+    name = 'gate'
+    stateful = False  # Needs the stream's reference frame
+
+    def __init__(self, **options):
+        self.options = options
+
+    def check(self, signals: FrameSignals, state: Optional[dict]) -> Optional[str]:
+        """Return 'skip' or 'reuse' to stop the cascade, None to continue"""
+        raise NotImplementedError
+
+    def update(self, signals: FrameSignals, state: dict) -> None:
+        """Remember what the adapter just ran on"""
+        pass
+
+
+class BlackFrameGate(Gate):
+    """Skip black or near-uniform dark frames (fades, slates)"""
+
+    name = 'black_frame'
+
+    def check(self, signals, state):
+        mean, std = cv2.meanStdDev(signals.gray)
+        if mean[0][0] <= self.options.get('max_mean', 16) and std[0][0] <= self.options.get('max_std', 8):
+            return 'skip'
+        return None
+
+
+class LetterboxGate(Gate):
+    """Skip frames whose active (non-black) picture area is too small"""
+
+    name = 'letterbox'
+
+    def check(self, signals, state):
+        bright = signals.gray > self.options.get('black_level', 24)
+        rows = np.flatnonzero(bright.mean(axis=1) > 0.02)
+        cols = np.flatnonzero(bright.mean(axis=0) > 0.02)
+        if not len(rows) or not len(cols):
+            return 'skip'
+        active = (rows[-1] - rows[0] + 1) * (cols[-1] - cols[0] + 1) / bright.size
+        signals.cache['active_area'] = active
+        return 'skip' if active < self.options.get('min_active_area', 0.25) else None
+
+
+class FrameDiffGate(Gate):
+    """Reuse previous results while the mean absolute pixel change stays below min_energy"""
+
+    name = 'frame_diff'
+    stateful = True
+
+    def check(self, signals, state):
+        reference = state.get('frame_diff')
+        if reference is None or reference.shape != signals.gray.shape:
+            return None
+        energy = float(cv2.absdiff(signals.gray, reference).mean())
+        return 'reuse' if energy < self.options.get('min_energy', 3.0) else None
+
+    def update(self, signals, state):
+        state['frame_diff'] = signals.gray
+
+
+class SceneChangeGate(Gate):
+    """Reuse previous results until the color histogram moves (Bhattacharyya distance) past min_distance"""
+
+    name = 'scene_change'
+    stateful = True
+
+    def check(self, signals, state):
+        reference = state.get('scene_change')
+        if reference is None:
+            return None
+        distance = cv2.compareHist(signals.hsv_histogram, reference, cv2.HISTCMP_BHATTACHARYYA)
+        return 'reuse' if distance < self.options.get('min_distance', 0.2) else None
+
+    def update(self, signals, state):
+        state['scene_change'] = signals.hsv_histogram
+
+
+class LogoPrecheckGate(Gate):
+    """Skip frames that a single two-prompt CLIP pass scores as containing no logo"""
+
+    name = 'logo_precheck'
+    PROMPTS = ["a photo containing a logo or brand name", "a photo with no logos or brands"]
+
+    def __init__(self, **options):
+        super().__init__(**options)
+        self.model_identifier = options.get('model_identifier', 'openai/clip-vit-base-patch32')
+        self._text_embeds = None
+        self._lock = threading.Lock()
+
+    def check(self, signals, state):
+        cache_key = f'logo_probability:{self.model_identifier}'
+        if cache_key not in signals.cache:
+            signals.cache[cache_key] = self._logo_probability(signals.frame)
+        return 'skip' if signals.cache[cache_key] < self.options.get('min_probability', 0.3) else None
+
+    def _logo_probability(self, frame):
+        import torch
+        from .adapters.logo_detection import load_clip
+
+        model, processor = model_pool.get(('clip', self.model_identifier), lambda: load_clip(self.model_identifier))
+        with torch.no_grad():
+            with self._lock:
+                if self._text_embeds is None:
+                    text = model.get_text_features(**processor(text=self.PROMPTS, return_tensors="pt", padding=True))
+                    self._text_embeds = text / text.norm(dim=-1, keepdim=True)
+            image = model.get_image_features(**processor(images=frame.pil, return_tensors="pt"))
+            image = image / image.norm(dim=-1, keepdim=True)
+            probs = (model.logit_scale.exp() * image @ self._text_embeds.T).softmax(dim=1)
+        return float(probs[0, 0])
+
+
+GATE_TYPES = {gate.name: gate for gate in (BlackFrameGate, LetterboxGate, FrameDiffGate, SceneChangeGate, LogoPrecheckGate)}
+
+
+class GatingStats:
+    """Gate decision counters, in-process and aggregated across workers in Redis"""
+
+    def __init__(self):
+        self.redis_client = redis.Redis(
+            host=settings.REDIS_HOST,
+            port=settings.REDIS_PORT
+        )
+        self.redis_key = 'media_analyzer:gating:stats'
+        self._counts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def record(self, capability, gate_name=None, decision='run'):
+        fields = [f'{capability}:evaluated', f'{capability}:{gate_name}:{decision}' if gate_name else f'{capability}:run']
+        with self._lock:
+            for field in fields:
+                self._counts[field] = self._counts.get(field, 0) + 1
+        try:
+            pipe = self.redis_client.pipeline()
+            for field in fields:
+                pipe.hincrby(self.redis_key, field, 1)
+            pipe.execute()
+        except Exception as e:
+            logger.debug(f"Failed to record gating stats in Redis: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Counts and skip rate per capability for this worker"""
+        with self._lock:
+            counts = dict(self._counts)
+        stats = {}
+        for field, count in counts.items():
+            capability, _, rest = field.partition(':')
+            entry = stats.setdefault(capability, {'evaluated': 0, 'run': 0, 'gated': {}})
+            if rest in ('evaluated', 'run'):
+                entry[rest] = count
+            else:
+                entry['gated'][rest] = count
+        for entry in stats.values():
+            entry['skip_rate'] = round(1 - entry['run'] / entry['evaluated'], 3) if entry['evaluated'] else 0.0
+        return stats
+
+    def get_shared_stats(self) -> Dict[str, int]:
+        """Counts from every worker (Redis)"""
+        try:
+            return {k.decode(): int(v) for k, v in self.redis_client.hgetall(self.redis_key).items()}
+        except Exception as e:
+            logger.warning(f"Failed to read gating stats from Redis: {e}")
+            return {}
+
+
+# Per (stream, capability): gate references and the adapter's last results
+gate_states = StreamStateRegistry(dict, idle_timeout=300)
+
+
+class GateCascade:
+    """Ordered gates in front of one capability's adapter"""
+
+    def __init__(self, capability: str, specs: List[dict]):
+        self.capability = capability
+        self.gates = []
+        for spec in specs or []:
+            options = dict(spec)
+            gate_type = options.pop('type', None)
+            if gate_type not in GATE_TYPES:
+                raise ValueError(f"Unknown gate type: {gate_type}")
+            self.gates.append(GATE_TYPES[gate_type](**options))
+
+    def evaluate(self, signals: FrameSignals, stream_key=None) -> Optional[List[Dict[str, Any]]]:
+        """Detections to use instead of running the adapter, or None when it has to run"""
+        state = gate_states.get((stream_key, self.capability)) if stream_key else None
+        for gate in self.gates:
+            if gate.stateful and state is None:
+                continue
+            try:
+                decision = gate.check(signals, state)
+            except Exception as e:
+                logger.error(f"Gate {gate.name} failed for {self.capability}: {e}")
+                continue
+            if decision == 'reuse' and (state is None or 'results' not in state):
+                continue
+            if decision in ('skip', 'reuse'):
+                gate_stats.record(self.capability, gate.name, decision)
+                # Callers annotate and serialize detections in place, so reuse hands out a copy
+                return [] if decision == 'skip' else copy.deepcopy(state['results'])
+
+        gate_stats.record(self.capability)
+        return None
+
+    def record_run(self, signals: FrameSignals, stream_key, results) -> None:
+        """Store the frame the adapter ran on as reference for stateful gates"""
+        if not stream_key:
+            return
+        state = gate_states.get((stream_key, self.capability))
+        for gate in self.gates:
+            gate.update(signals, state)
+        state['results'] = copy.deepcopy(results)
+
+
+# Global instance
+gate_stats = GatingStats()
@@ -0,0 +1,199 @@
+"""
+Pooled keep-alive HTTP sessions for remote AI workers.
+
+One requests.Session per worker host and process, mounted with a sized
+HTTPAdapter so frames, health probes and info calls reuse warm connections.
+Failed requests are retried with full-jitter exponential backoff, but only
+while the host's retry budget allows it: each request earns
+AI_HTTP_RETRY_BUDGET retry tokens (plus a small floor per second), so a worker
+that is down sees at most that fraction of extra traffic instead of a retry
+storm from every stream.
+"""
+
+import logging
+import os
+import random
+import threading
+import time
+from typing import Any, Dict
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Statuses worth another attempt: the worker or a proxy in front of it is restarting or overloaded
+RETRY_STATUSES = (502, 503, 504)
+
+
+class RetryBudget:
+    """Token bucket that limits retries to a fraction of requests"""
+
+    def __init__(self, ratio=0.1, min_per_second=1.0, cap=10.0):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.cap = cap
+        self.tokens = cap
+        self._refilled = time.monotonic()
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        with self._lock:
+            self.tokens = min(self.cap, self.tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        """Take one retry token; False when the budget is exhausted"""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.cap, self.tokens + (now - self._refilled) * self.min_per_second)
+            self._refilled = now
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
+
+class HostMetrics:
+    """Request, retry and connection counters for one worker host"""
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.retries_denied = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, elapsed, error=False):
+        with self._lock:
+            self.requests += 1
+            self.errors += int(error)
+            self.total_time += elapsed
+            self.max_time = max(self.max_time, elapsed)
+
+    def record_retry(self, allowed):
+        with self._lock:
+            if allowed:
+                self.retries += 1
+            else:
+                self.retries_denied += 1
+
+
+class HTTPSessionPool:
+    """Shared requests sessions per (process, scheme, host) with retries under a budget"""
+
+    def __init__(self, pool_maxsize=None, max_retries=None, retry_budget=None, backoff=None):
+        self.pool_maxsize = pool_maxsize or getattr(settings, 'AI_HTTP_POOL_MAXSIZE', 32)
+        self.max_retries = max_retries if max_retries is not None else getattr(settings, 'AI_HTTP_MAX_RETRIES', 2)
+        self.retry_budget = retry_budget if retry_budget is not None else getattr(settings, 'AI_HTTP_RETRY_BUDGET', 0.1)
+        self.backoff = backoff if backoff is not None else getattr(settings, 'AI_HTTP_RETRY_BACKOFF', 0.1)
+        self._hosts: Dict[str, Dict[str, Any]] = {}
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def request(self, method, url, retry=True, **kwargs) -> requests.Response:
+        """
+        Send a request on the host's pooled session (same signature as requests.request)
+
+        Connection failures and 502/503/504 are retried up to max_retries times while
+        the host's budget allows; read timeouts are not, the worker may still be busy
+        with the request. Exceptions propagate as with requests.request.
+        """
+        host = self._host(url)
+        host['budget'].deposit()
+        metrics = host['metrics']
+        attempt = 0
+        while True:
+            start = time.perf_counter()
+            try:
+                response = host['session'].request(method, url, **kwargs)
+            except requests.exceptions.ConnectionError:
+                # Includes connect timeouts and stale keep-alive connections, not read timeouts
+                metrics.record(time.perf_counter() - start, error=True)
+                if not self._may_retry(host, attempt, retry):
+                    raise
+            except requests.exceptions.Timeout:
+                metrics.record(time.perf_counter() - start, error=True)
+                raise
+            else:
+                failed = response.status_code in RETRY_STATUSES
+                metrics.record(time.perf_counter() - start, error=failed)
+                if not failed or not self._may_retry(host, attempt, retry):
+                    return response
+                response.close()
+
+            attempt += 1
+            # Full jitter: spread retries of concurrent streams over the backoff window
+            time.sleep(random.uniform(0, self.backoff * 2 ** (attempt - 1)))
+
+    def get(self, url, **kwargs) -> requests.Response:
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs) -> requests.Response:
+        return self.request('POST', url, **kwargs)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Per-host request, retry, latency and connection counts for this process"""
+        with self._lock:
+            hosts = dict(self._hosts) if self._pid == os.getpid() else {}
+        stats = {}
+        for origin, host in hosts.items():
+            metrics = host['metrics']
+            connections = self._connections_opened(host['adapter'])
+            with metrics._lock:
+                stats[origin] = {
+                    'requests': metrics.requests,
+                    'errors': metrics.errors,
+                    'retries': metrics.retries,
+                    'retries_denied': metrics.retries_denied,
+                    'avg_ms': round(metrics.total_time / metrics.requests * 1000, 1) if metrics.requests else 0.0,
+                    'max_ms': round(metrics.max_time * 1000, 1),
+                    'connections_opened': connections,
+                    'connection_reuse': round(1 - connections / metrics.requests, 3) if metrics.requests else 0.0
+                }
+        return stats
+
+    def _may_retry(self, host, attempt, retry):
+        if not retry or attempt >= self.max_retries:
+            return False
+        allowed = host['budget'].withdraw()
+        host['metrics'].record_retry(allowed)
+        if not allowed:
+            logger.warning(f"Retry budget exhausted for {host['origin']}, not retrying")
+        return allowed
+
+    def _host(self, url):
+        parts = urlsplit(url)
+        origin = f"{parts.scheme}://{parts.netloc}"
+        with self._lock:
+            # Sockets must not be shared with a forked parent (Celery prefork)
+            if self._pid != os.getpid():
+                self._hosts = {}
+                self._pid = os.getpid()
+            host = self._hosts.get(origin)
+            if host is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_maxsize, max_retries=0)
+                session.mount(f"{parts.scheme}://", adapter)
+                host = {
+                    'origin': origin,
+                    'session': session,
+                    'adapter': adapter,
+                    'budget': RetryBudget(self.retry_budget),
+                    'metrics': HostMetrics()
+                }
+                self._hosts[origin] = host
+            return host
+
+    def _connections_opened(self, adapter):
+        try:
+            pools = adapter.poolmanager.pools
+            return sum(pools[key].num_connections for key in pools.keys())
+        except Exception:
+            return 0
+
+
+# Global instance
+http_pool = HTTPSessionPool()
@@ -0,0 +1,160 @@
+import glob
+import time
+import numpy as np
+from PIL import Image
+from django.core.management.base import BaseCommand
+from ai_processing.adapters.logo_detection import CLIPLogoDetectionAdapter, CLIPONNXLogoDetectionAdapter
+from ai_processing.adapters.object_detection import YOLOObjectDetectionAdapter, YOLOONNXObjectDetectionAdapter
+from ai_processing.analysis_engine import AnalysisEngine
+
+
+class Command(BaseCommand):
+    help = 'Compare ONNX Runtime CLIP/YOLO adapters against the PyTorch adapters on recorded frames'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'inputs',
+            nargs='+',
+            help='Images or segment files, or glob patterns (e.g. media/*.ts)'
+        )
+        parser.add_argument(
+            '--model',
+            choices=['clip', 'yolo'],
+            default='clip',
+            help='Adapter to benchmark (default: clip)'
+        )
+        parser.add_argument(
+            '--model-identifier',
+            help='CLIP model id or YOLO checkpoint (default: adapter default)'
+        )
+        parser.add_argument(
+            '--quantize',
+            action='store_true',
+            help='Use the dynamic int8 quantized ONNX model'
+        )
+        parser.add_argument(
+            '--threads',
+            type=int,
+            default=0,
+            help='ONNX Runtime intra-op threads (default: onnxruntime default)'
+        )
+        parser.add_argument(
+            '--frames-per-segment',
+            type=int,
+            default=3,
+            help='Frames sampled uniformly from each segment (default: 3)'
+        )
+        parser.add_argument(
+            '--confidence',
+            type=float,
+            default=0.5,
+            help='Detection confidence threshold (default: 0.5)'
+        )
+
+    def handle(self, *args, **options):
+        frames = self._load_frames(options)
+        if not frames:
+            self.stdout.write(self.style.ERROR('No frames loaded'))
+            return
+
+        kwargs = {'quantize': options['quantize'], 'intra_op_threads': options['threads']}
+        if options['model'] == 'clip':
+            model_id = options['model_identifier'] or 'openai/clip-vit-base-patch32'
+            torch_adapter = CLIPLogoDetectionAdapter(model_id)
+            onnx_adapter = CLIPONNXLogoDetectionAdapter(model_id, **kwargs)
+        else:
+            model_id = options['model_identifier'] or 'yolov8n.pt'
+            torch_adapter = YOLOObjectDetectionAdapter(model_id)
+            onnx_adapter = YOLOONNXObjectDetectionAdapter(model_id, **kwargs)
+
+        # Warm-up loads (and on first run exports) both models outside the timings
+        self._run(torch_adapter, frames[:1], options)
+        self._run(onnx_adapter, frames[:1], options)
+
+        torch_outputs, torch_times = zip(*(self._timed(torch_adapter, frame, options) for frame in frames))
+        onnx_outputs, onnx_times = zip(*(self._timed(onnx_adapter, frame, options) for frame in frames))
+
+        if options['model'] == 'clip':
+            accuracy = self._compare_clip(torch_outputs, onnx_outputs)
+        else:
+            accuracy = self._compare_yolo(torch_outputs, onnx_outputs)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"\n{len(frames)} frames, {options['model']} {model_id} "
+            f"({'int8' if options['quantize'] else 'fp32'} ONNX, threads={options['threads'] or 'default'})\n"
+            f"{accuracy}"
+            f"  mean latency: torch {np.mean(torch_times) * 1000:.1f} ms, onnx {np.mean(onnx_times) * 1000:.1f} ms "
+            f"({np.sum(torch_times) / max(np.sum(onnx_times), 1e-9):.2f}x faster)\n"
+            f"  p95 latency: torch {np.percentile(torch_times, 95) * 1000:.1f} ms, "
+            f"onnx {np.percentile(onnx_times, 95) * 1000:.1f} ms"
+        ))
+
+    def _load_frames(self, options):
+        paths = sorted({path for pattern in options['inputs'] for path in glob.glob(pattern)})
+        engine = AnalysisEngine()
+        frames = []
+        for path in paths:
+            try:
+                frames.append(Image.open(path).convert('RGB'))
+                continue
+            except Exception:
+                pass
+            sampled = engine.extract_frames_from_segment(path, 'uniform', options['frames_per_segment'])
+            if not sampled:
+                self.stdout.write(self.style.WARNING(f'Skipping {path}: no frames'))
+            frames.extend(frame for _, frame in sampled)
+        return frames
+
+    def _run(self, adapter, frames, options):
+        if isinstance(adapter, CLIPLogoDetectionAdapter):
+            return adapter.brand_probabilities(frames)[1]
+        return adapter.detect_batch(frames, options['confidence'])
+
+    def _timed(self, adapter, frame, options):
+        start = time.perf_counter()
+        output = self._run(adapter, [frame], options)
+        return output, time.perf_counter() - start
+
+    def _compare_clip(self, torch_outputs, onnx_outputs):
+        if torch_outputs[0] is None:
+            return "  no active brands, latency only\n"
+        torch_probs = np.concatenate(torch_outputs)
+        onnx_probs = np.concatenate(onnx_outputs)
+        top1_agreement = np.mean(torch_probs.argmax(axis=1) == onnx_probs.argmax(axis=1))
+        return (
+            f"  top-1 agreement: {top1_agreement * 100:.1f}%\n"
+            f"  prob max abs diff: {np.max(np.abs(torch_probs - onnx_probs)):.4f}, "
+            f"mean abs diff: {np.mean(np.abs(torch_probs - onnx_probs)):.5f}\n"
+        )
+
+    def _compare_yolo(self, torch_outputs, onnx_outputs):
+        matched = torch_total = onnx_total = 0
+        confidence_diffs = []
+        for torch_detections, onnx_detections in zip(torch_outputs, onnx_outputs):
+            torch_detections, onnx_detections = torch_detections[0], list(onnx_detections[0])
+            torch_total += len(torch_detections)
+            onnx_total += len(onnx_detections)
+            for reference in torch_detections:
+                candidates = [
+                    (self._iou(reference['bbox'], d['bbox']), i)
+                    for i, d in enumerate(onnx_detections) if d['label'] == reference['label']
+                ]
+                iou, index = max(candidates, default=(0.0, None))
+                if iou >= 0.5:
+                    matched += 1
+                    confidence_diffs.append(abs(reference['confidence'] - onnx_detections.pop(index)['confidence']))
+        return (
+            f"  detections: torch {torch_total}, onnx {onnx_total}, matched (same label, IoU>=0.5) {matched}\n"
+            f"  recall vs torch: {matched / max(torch_total, 1) * 100:.1f}%, "
+            f"precision vs torch: {matched / max(onnx_total, 1) * 100:.1f}%\n"
+            f"  matched confidence mean abs diff: {np.mean(confidence_diffs) if confidence_diffs else 0.0:.4f}\n"
+        )
+
+    @staticmethod
+    def _iou(a, b):
+        x1, y1 = max(a['x'], b['x']), max(a['y'], b['y'])
+        x2 = min(a['x'] + a['width'], b['x'] + b['width'])
+        y2 = min(a['y'] + a['height'], b['y'] + b['height'])
+        intersection = max(0.0, x2 - x1) * max(0.0, y2 - y1)
+        union = a['width'] * a['height'] + b['width'] * b['height'] - intersection
+        return intersection / union if union > 0 else 0.0
@@ -0,0 +1,93 @@
+import glob
+import time
+import numpy as np
+from django.core.management.base import BaseCommand
+from ai_processing.adapters.motion_analysis import OpenCVMotionAnalysisAdapter
+
+
+class Command(BaseCommand):
+    help = 'Compare fast motion analysis against the exact MOG2 mode on recorded segments'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'segments',
+            nargs='+',
+            help='Segment files or glob patterns (e.g. media/*.ts)'
+        )
+        parser.add_argument(
+            '--method',
+            choices=['frame_diff', 'mog2'],
+            default='frame_diff',
+            help='Fast-mode algorithm (default: frame_diff)'
+        )
+        parser.add_argument(
+            '--scale',
+            type=float,
+            default=0.25,
+            help='Fast-mode resolution factor (default: 0.25)'
+        )
+        parser.add_argument(
+            '--stride',
+            type=int,
+            default=2,
+            help='Fast mode analyzes every stride-th frame (default: 2)'
+        )
+        parser.add_argument(
+            '--diff-threshold',
+            type=int,
+            default=25,
+            help='Luma change counted as motion for frame_diff (default: 25)'
+        )
+
+    def handle(self, *args, **options):
+        paths = sorted({path for pattern in options['segments'] for path in glob.glob(pattern)})
+        if not paths:
+            self.stdout.write(self.style.ERROR('No segment files matched'))
+            return
+
+        exact = OpenCVMotionAnalysisAdapter(mode='exact')
+        fast = OpenCVMotionAnalysisAdapter(
+            mode='fast',
+            method=options['method'],
+            scale=options['scale'],
+            stride=options['stride'],
+            diff_threshold=options['diff_threshold']
+        )
+
+        rows = []
+        for path in paths:
+            exact_result, exact_time = self._timed(exact, path)
+            fast_result, fast_time = self._timed(fast, path)
+            if not exact_result or not fast_result:
+                self.stdout.write(self.style.WARNING(f'Skipping {path}: no motion result'))
+                continue
+            rows.append((exact_result['activity_score'], fast_result['activity_score'], exact_time, fast_time))
+            self.stdout.write(
+                f"{path}: exact={exact_result['activity_score']:.3f} ({exact_time * 1000:.0f} ms) "
+                f"fast={fast_result['activity_score']:.3f} ({fast_time * 1000:.0f} ms)"
+            )
+
+        if not rows:
+            return
+
+        exact_scores, fast_scores, exact_times, fast_times = (np.array(column) for column in zip(*rows))
+        correlation = float(np.corrcoef(exact_scores, fast_scores)[0, 1]) if len(rows) > 1 else float('nan')
+        exact_ranks = np.argsort(np.argsort(exact_scores))
+        fast_ranks = np.argsort(np.argsort(fast_scores))
+        rank_correlation = float(np.corrcoef(exact_ranks, fast_ranks)[0, 1]) if len(rows) > 1 else float('nan')
+
+        self.stdout.write(self.style.SUCCESS(
+            f"\n{len(rows)} segments, fast mode {options['method']} "
+            f"scale={options['scale']} stride={options['stride']}\n"
+            f"  activity_score mean abs diff: {np.mean(np.abs(exact_scores - fast_scores)):.3f}\n"
+            f"  activity_score ratio (fast/exact): {np.sum(fast_scores) / max(np.sum(exact_scores), 1e-9):.2f}\n"
+            f"  pearson correlation: {correlation:.3f}\n"
+            f"  rank correlation: {rank_correlation:.3f}\n"
+            f"  mean time: exact {np.mean(exact_times) * 1000:.0f} ms, fast {np.mean(fast_times) * 1000:.0f} ms "
+            f"({np.sum(exact_times) / max(np.sum(fast_times), 1e-9):.1f}x faster)"
+        ))
+
+    def _timed(self, adapter, path):
+        start = time.perf_counter()
+        result = adapter.analyze(path)
+        return result, time.perf_counter() - start
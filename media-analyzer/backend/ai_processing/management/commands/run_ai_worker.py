@@ -0,0 +1,73 @@
+import logging
+from django.core.management.base import BaseCommand, CommandError
+from ai_processing.worker_server import WorkerServer
+
+
+class Command(BaseCommand):
+    help = 'Run the AI worker server (/ai/analyze, /ai/analyze_batch, /ai/health, /ai/info, /ai/metrics)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--host',
+            default='0.0.0.0',
+            help='Interface to bind (default: 0.0.0.0)'
+        )
+        parser.add_argument(
+            '--port',
+            type=int,
+            default=8001,
+            help='Port to listen on (default: 8001)'
+        )
+        parser.add_argument(
+            '--queue-size',
+            type=int,
+            help='Max queued frame/capability work items before requests get 503 (default: AI_WORKER_QUEUE_SIZE)'
+        )
+        parser.add_argument(
+            '--max-batch-size',
+            type=int,
+            help='Max frames per batched forward pass (default: AI_WORKER_MAX_BATCH_SIZE)'
+        )
+        parser.add_argument(
+            '--max-wait-ms',
+            type=float,
+            help='Max time a batch waits to fill up (default: AI_WORKER_MAX_WAIT_MS)'
+        )
+        parser.add_argument(
+            '--threads',
+            type=int,
+            help='Inference threads, one batch loop each (default: AI_WORKER_INFERENCE_THREADS)'
+        )
+        parser.add_argument(
+            '--preload',
+            action='store_true',
+            help='Load every model before accepting requests'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            import uvicorn
+        except ImportError:
+            raise CommandError('uvicorn is required to run the AI worker (pip install uvicorn)')
+
+        server = WorkerServer(
+            queue_size=options['queue_size'],
+            max_batch_size=options['max_batch_size'],
+            max_wait_ms=options['max_wait_ms'],
+            inference_threads=options['threads']
+        )
+        server.load_adapters(preload=options['preload'])
+        if not server.adapters:
+            raise CommandError('No adapters could be created, check AI_WORKER_PROVIDERS')
+
+        self.stdout.write(
+            f"AI worker on {options['host']}:{options['port']} serving {', '.join(sorted(server.adapters))} "
+            f"(batch {server.max_batch_size}, wait {server.max_wait * 1000:.0f} ms, queue {server.queue_size})"
+        )
+        uvicorn.run(
+            server,
+            host=options['host'],
+            port=options['port'],
+            log_level=logging.getLevelName(logging.getLogger().getEffectiveLevel()).lower(),
+            lifespan='on'
+        )
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.6 on 2026-10-17 10:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_processing', '0006_videoanalysis_cached'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='visualanalysis',
+            name='colorfulness',
+            field=models.FloatField(null=True),
+        ),
+    ]
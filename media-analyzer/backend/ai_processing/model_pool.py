@@ -0,0 +1,151 @@
+"""
+Process-wide pool of loaded models.
+
+Adapters are cheap and created per task, but the weights behind them are not.
+The pool keeps loaded models resident between segments, bounded by a memory
+budget, and evicts the least recently used entries when the budget is exceeded.
+"""
+
+import gc
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+def estimate_size_mb(value) -> float:
+    """Estimate resident memory of a loaded model (torch modules only)"""
+    items = value if isinstance(value, (tuple, list)) else (value,)
+    total_bytes = 0
+    for item in items:
+        parameters = getattr(item, 'parameters', None)
+        if not callable(parameters):
+            continue
+        try:
+            total_bytes += sum(p.numel() * p.element_size() for p in parameters())
+        except Exception:
+            pass
+    return total_bytes / (1024 * 1024)
+
+
+class ModelPool:
+    """LRU pool of loaded models with a memory budget"""
+
+    def __init__(self, memory_budget_mb: Optional[float] = None):
+        if memory_budget_mb is None:
+            memory_budget_mb = getattr(settings, 'AI_MODEL_POOL_MEMORY_MB', 4096)
+        self.memory_budget_mb = float(memory_budget_mb)
+        self._entries = OrderedDict()  # key -> {'value': ..., 'size_mb': float}
+        self._lock = threading.RLock()
+        self._loading: Dict[Hashable, threading.Lock] = {}  # key -> lock held while it loads
+        self._stats = {'loads': 0, 'hits': 0, 'evictions': 0, 'load_failures': 0}
+
+    def get(self, key: Hashable, loader: Callable[[], Any], size_mb: Optional[float] = None) -> Any:
+        """Return the resident model for key, loading it with loader() on a miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._stats['hits'] += 1
+                return entry['value']
+            load_lock = self._loading.setdefault(key, threading.Lock())
+
+        # Load outside the pool lock so hits on other keys and health checks are not
+        # blocked; concurrent misses on the same key wait for the first loader
+        with load_lock:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    self._entries.move_to_end(key)
+                    self._stats['hits'] += 1
+                    return entry['value']
+
+            try:
+                value = loader()
+            except Exception:
+                with self._lock:
+                    self._stats['load_failures'] += 1
+                    self._loading.pop(key, None)
+                raise
+
+            if size_mb is None:
+                size_mb = estimate_size_mb(value)
+
+            with self._lock:
+                self._entries[key] = {'value': value, 'size_mb': size_mb}
+                self._stats['loads'] += 1
+                self._loading.pop(key, None)
+                logger.info(f"Model pool loaded {key} ({size_mb:.0f} MB)")
+                self._evict_over_budget(keep=key)
+            return value
+
+    def contains(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def evict(self, key: Hashable) -> bool:
+        """Explicitly drop a model from the pool"""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return False
+            self._stats['evictions'] += 1
+        self._release_memory()
+        return True
+
+    def clear(self) -> None:
+        """Drop every resident model"""
+        with self._lock:
+            self._stats['evictions'] += len(self._entries)
+            self._entries.clear()
+        self._release_memory()
+
+    def used_mb(self) -> float:
+        with self._lock:
+            return sum(entry['size_mb'] for entry in self._entries.values())
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Counters and residency information for health checks"""
+        with self._lock:
+            return {
+                **self._stats,
+                'resident': [str(key) for key in self._entries],
+                'used_mb': round(sum(e['size_mb'] for e in self._entries.values()), 1),
+                'budget_mb': self.memory_budget_mb
+            }
+
+    def _evict_over_budget(self, keep: Hashable) -> None:
+        """Evict least recently used entries until the pool fits the budget"""
+        evicted = False
+        while self.used_mb() > self.memory_budget_mb:
+            # Zero-size entries (API clients) never free memory, skip them
+            victim = next(
+                (k for k, e in self._entries.items() if k != keep and e['size_mb'] > 0),
+                None
+            )
+            if victim is None:
+                logger.warning(f"Model {keep} alone exceeds pool budget of {self.memory_budget_mb:.0f} MB")
+                break
+            self._entries.pop(victim)
+            self._stats['evictions'] += 1
+            evicted = True
+            logger.info(f"Model pool evicted {victim}")
+
+        if evicted:
+            self._release_memory()
+
+    def _release_memory(self) -> None:
+        gc.collect()
+        try:
+            import torch
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
+        except ImportError:
+            pass
+
+
+# Global instance
+model_pool = ModelPool()
@@ -47,6 +47,7 @@ class VideoAnalysis(models.Model):
     confidence_threshold = models.FloatField(default=get_default_confidence_threshold)
     frame_timestamp = models.FloatField()
     external_request_id = models.CharField(max_length=200, null=True)
+    cached = models.BooleanField(default=False)  # Results reused from a near-duplicate frame
     
     def to_dict(self):
         return {
@@ -57,6 +58,7 @@ class VideoAnalysis(models.Model):
             'processing_time': self.processing_time,
             'analysis_type': self.analysis_type,
             'frame_timestamp': self.frame_timestamp,
+            'cached': self.cached,
             'provider': self.provider.name if self.provider else 'local',
             'detections': [d.to_dict() for d in self.detections.all()],
             'visual': self.visual.to_dict() if hasattr(self, 'visual') else None
@@ -111,6 +113,7 @@ class VisualAnalysis(models.Model):
     brightness_level = models.FloatField()
     contrast_level = models.FloatField(null=True)
     saturation_level = models.FloatField(null=True)
+    colorfulness = models.FloatField(null=True)
     activity_score = models.FloatField(null=True)
     scene_description = models.TextField(null=True)
     
@@ -120,6 +123,7 @@ class VisualAnalysis(models.Model):
             'brightness_level': self.brightness_level,
             'contrast_level': self.contrast_level,
             'saturation_level': self.saturation_level,
+            'colorfulness': self.colorfulness,
             'activity_score': self.activity_score,
             'scene_description': self.scene_description
         }
@@ -0,0 +1,195 @@
+"""
+Per-stream OCR result cache for static overlays.
+
+Scoreboards, tickers and lower thirds sit in the same place for minutes. Each
+proposed text region is keyed by its grid-snapped center; the entry holds a
+binarized thumbnail of the region's pixels as content signature. While the
+signature still matches, the previous text detections for that region are
+reused instead of running OCR again. Entries expire after AI_OCR_CACHE_MAX_AGE.
+
+Full-frame providers can find text outside every proposal. Regions around
+that text are remembered with the stream's entries and looked up alongside
+the proposals, so the text is not lost once every proposal hits the cache.
+"""
+
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+import cv2
+import numpy as np
+from django.conf import settings
+from .stream_registry import StreamStateRegistry
+
+
+class OCRRegionCache:
+    """Per-stream text detections keyed by region position and content signature"""
+
+    SIGNATURE_HEIGHT = 16
+    MAX_ENTRIES_PER_STREAM = 256
+
+    def __init__(self, max_age: Optional[float] = None, grid: Optional[int] = None,
+                 max_diff: Optional[float] = None):
+        self.max_age = float(max_age if max_age is not None else getattr(settings, 'AI_OCR_CACHE_MAX_AGE', 120))
+        self.grid = int(grid if grid is not None else getattr(settings, 'AI_OCR_CACHE_GRID', 16))
+        self.max_diff = float(max_diff if max_diff is not None else getattr(settings, 'AI_OCR_CACHE_MAX_DIFF', 0.05))
+        self._streams = StreamStateRegistry(dict, idle_timeout=max(self.max_age * 2, 60))
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'changed': 0, 'expired': 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_age > 0
+
+    def signature(self, gray, region) -> np.ndarray:
+        """
+        Content signature of a region: Otsu-binarized crop downscaled to a
+        SIGNATURE_HEIGHT-row boolean thumbnail. Codec noise flips scattered bits,
+        an edited character flips a block of them.
+        """
+        x, y, w, h = region
+        crop = gray[y:y + h, x:x + w]
+        _, binary = cv2.threshold(crop, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
+        width = max(1, round(w * self.SIGNATURE_HEIGHT / max(h, 1)))
+        thumb = cv2.resize(binary, (width, self.SIGNATURE_HEIGHT), interpolation=cv2.INTER_AREA)
+        return thumb > 127
+
+    def difference(self, a, b) -> float:
+        """Largest fraction of differing bits in any character-sized window of two signatures"""
+        if a.shape != b.shape:
+            return 1.0
+        column_diffs = (a != b).sum(axis=0)
+        window = self.SIGNATURE_HEIGHT
+        if len(column_diffs) > window:
+            column_diffs = np.convolve(column_diffs, np.ones(window, dtype=np.int64), 'valid')
+        return float(column_diffs.max()) / (window * window)
+
+    def lookup(self, stream_key, provider, confidence_threshold, gray, regions) -> List[Optional[List[Dict[str, Any]]]]:
+        """Cached detections for each region whose content is unchanged, None for misses"""
+        entries = self._streams.get(stream_key)
+        now = time.monotonic()
+        results = []
+        with self._lock:
+            for region in regions:
+                entry = self._find(entries, provider, confidence_threshold, region, now)
+                if entry is not None and self.difference(self.signature(gray, entry['region']), entry['signature']) > self.max_diff:
+                    self._stats['changed'] += 1
+                    entry = None
+                self._stats['hits' if entry is not None else 'misses'] += 1
+                results.append(entry['detections'] if entry is not None else None)
+        return results
+
+    def store(self, stream_key, provider, confidence_threshold, gray, region, detections, remembered=False) -> None:
+        """Cache a region's detections; remembered regions are not proposals and come back via remembered_regions"""
+        entries = self._streams.get(stream_key)
+        entry = {
+            'time': time.monotonic(),
+            'region': region,
+            'signature': self.signature(gray, region),
+            'detections': detections,
+            'remembered': remembered
+        }
+        with self._lock:
+            entries[self._key(provider, confidence_threshold, region)] = entry
+            if len(entries) > self.MAX_ENTRIES_PER_STREAM:
+                self._prune(entries, entry['time'])
+
+    def remembered_regions(self, stream_key, provider, confidence_threshold) -> List[Tuple[int, int, int, int]]:
+        """Unexpired regions of text that full-frame detection found outside the proposals"""
+        entries = self._streams.get(stream_key)
+        now = time.monotonic()
+        with self._lock:
+            return [
+                entry['region'] for key, entry in entries.items()
+                if entry['remembered'] and key[:2] == (provider, confidence_threshold)
+                and now - entry['time'] <= self.max_age
+            ]
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._stats['hits'] + self._stats['misses']
+            return {
+                **self._stats,
+                'hit_rate': round(self._stats['hits'] / lookups, 3) if lookups else 0.0,
+                'streams': len(self._streams),
+                'max_age': self.max_age
+            }
+
+    def _key(self, provider, confidence_threshold, region, offset=(0, 0)):
+        x, y, w, h = region
+        return (
+            provider, confidence_threshold,
+            int((x + w / 2) // self.grid) + offset[0], int((y + h / 2) // self.grid) + offset[1]
+        )
+
+    def _find(self, entries, provider, confidence_threshold, region, now):
+        """Entry for the region's grid cell, or a neighbouring one when proposals jitter across a cell edge"""
+        for offset in ((0, 0), (-1, 0), (1, 0), (0, -1), (0, 1), (-1, -1), (1, -1), (-1, 1), (1, 1)):
+            key = self._key(provider, confidence_threshold, region, offset)
+            entry = entries.get(key)
+            if entry is None:
+                continue
+            if now - entry['time'] > self.max_age:
+                del entries[key]
+                self._stats['expired'] += 1
+                continue
+            return entry
+        return None
+
+    def _prune(self, entries, now):
+        """Drop expired entries, then the oldest ones, until under the per-stream limit"""
+        for key in [k for k, entry in entries.items() if now - entry['time'] > self.max_age]:
+            del entries[key]
+            self._stats['expired'] += 1
+        if len(entries) > self.MAX_ENTRIES_PER_STREAM:
+            oldest = sorted(entries, key=lambda k: entries[k]['time'])
+            for key in oldest[:len(entries) - self.MAX_ENTRIES_PER_STREAM]:
+                del entries[key]
+
+
+def assign_to_regions(detections, regions, width, height) -> List[List[Dict[str, Any]]]:
+    """Bucket normalized detections into the pixel regions containing their bbox centers"""
+    buckets = [[] for _ in regions]
+    for detection in detections:
+        bbox = detection['bbox']
+        cx = (bbox['x'] + bbox['width'] / 2) * width
+        cy = (bbox['y'] + bbox['height'] / 2) * height
+        for i, (x, y, w, h) in enumerate(regions):
+            if x <= cx < x + w and y <= cy < y + h:
+                buckets[i].append(detection)
+                break
+    return buckets
+
+
+def regions_around(detections, width, height, padding=0.25) -> Tuple[List[Tuple[int, int, int, int]], List[List[Dict[str, Any]]]]:
+    """
+    Pixel regions around normalized detections, padded by a fraction of the text
+    height, and the detections in each; detections centered in an earlier region join it
+    """
+    regions, buckets = [], []
+    for detection in detections:
+        bbox = detection['bbox']
+        cx = (bbox['x'] + bbox['width'] / 2) * width
+        cy = (bbox['y'] + bbox['height'] / 2) * height
+        for (x, y, w, h), bucket in zip(regions, buckets):
+            if x <= cx < x + w and y <= cy < y + h:
+                bucket.append(detection)
+                break
+        else:
+            pad = padding * bbox['height'] * height
+            x0 = max(0, int(bbox['x'] * width - pad))
+            y0 = max(0, int(bbox['y'] * height - pad))
+            x1 = min(width, int(np.ceil((bbox['x'] + bbox['width']) * width + pad)))
+            y1 = min(height, int(np.ceil((bbox['y'] + bbox['height']) * height + pad)))
+            if x1 > x0 and y1 > y0:
+                regions.append((x0, y0, x1 - x0, y1 - y0))
+                buckets.append([detection])
+    return regions, buckets
+
+
+def overlaps(a, b) -> bool:
+    """Whether two pixel regions (x, y, w, h) intersect"""
+    return a[0] < b[0] + b[2] and b[0] < a[0] + a[2] and a[1] < b[1] + b[3] and b[1] < a[1] + a[3]
+
+
+# Global instance
+ocr_cache = OCRRegionCache()
@@ -0,0 +1,88 @@
+"""
+ONNX Runtime backend for the local CPU adapters.
+
+Models are exported to ONNX once per worker host and cached on disk under
+AI_ONNX_CACHE_DIR, optionally with dynamic int8 weight quantization. Inference
+sessions are held in the model pool like the PyTorch models they replace.
+"""
+
+import logging
+import os
+import re
+import threading
+from typing import Callable
+from django.conf import settings
+from .model_pool import model_pool
+
+logger = logging.getLogger(__name__)
+
+_export_lock = threading.Lock()
+
+
+def onnx_cache_dir() -> str:
+    path = str(getattr(settings, 'AI_ONNX_CACHE_DIR', os.path.join(settings.MEDIA_ROOT, 'onnx_cache')))
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def artifact_path(name: str, quantize: bool = False) -> str:
+    """Cache path for an exported model ('openai/clip-vit-base-patch32' -> openai_clip-vit-base-patch32.onnx)"""
+    safe_name = re.sub(r'[^A-Za-z0-9_.-]+', '_', name)
+    suffix = '.int8.onnx' if quantize else '.onnx'
+    return os.path.join(onnx_cache_dir(), safe_name + suffix)
+
+
+def ensure_exported(name: str, export_fn: Callable[[str], None], quantize: bool = False) -> str:
+    """
+    Return the cached ONNX artifact for name, exporting it first if needed.
+
+    export_fn(path) writes the fp32 model to path. Files are written under a
+    temporary name and renamed, so concurrent workers never load a partial file.
+    """
+    fp32_path = artifact_path(name)
+    target_path = artifact_path(name, quantize)
+    if os.path.exists(target_path):
+        return target_path
+
+    with _export_lock:
+        if not os.path.exists(fp32_path):
+            tmp_path = f"{fp32_path}.{os.getpid()}.tmp"
+            logger.info(f"Exporting {name} to ONNX: {fp32_path}")
+            export_fn(tmp_path)
+            os.replace(tmp_path, fp32_path)
+
+        if quantize and not os.path.exists(target_path):
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+            tmp_path = f"{target_path}.{os.getpid()}.tmp"
+            logger.info(f"Quantizing {name} to int8: {target_path}")
+            quantize_dynamic(fp32_path, tmp_path, weight_type=QuantType.QInt8)
+            os.replace(tmp_path, target_path)
+
+    return target_path
+
+
+def create_session(path: str, intra_op_threads: int = 0):
+    """CPU inference session with full graph optimization (0 threads = onnxruntime default)"""
+    import onnxruntime as ort
+
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+    if intra_op_threads:
+        options.intra_op_num_threads = int(intra_op_threads)
+    options.inter_op_num_threads = 1
+    return ort.InferenceSession(path, sess_options=options, providers=['CPUExecutionProvider'])
+
+
+def get_session(name: str, export_fn: Callable[[str], None], quantize: bool = False, intra_op_threads: int = 0):
+    """Pooled inference session for name, exporting and quantizing on first use"""
+    if not intra_op_threads:
+        intra_op_threads = getattr(settings, 'AI_ONNX_INTRA_OP_THREADS', 0)
+
+    path = ensure_exported(name, export_fn, quantize)
+    # Weights dominate session memory, so the artifact size is a fair estimate
+    return model_pool.get(
+        ('onnx', path, int(intra_op_threads)),
+        lambda: create_session(path, intra_op_threads),
+        size_mb=os.path.getsize(path) / (1024 * 1024)
+    )
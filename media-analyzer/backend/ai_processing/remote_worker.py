@@ -11,9 +11,8 @@ import requests
 import logging
 from typing import Dict, Any, Optional
 from django.conf import settings
-import base64
-import io
-from PIL import Image
+from .frame_codec import FrameCodec, CONTENT_TYPE, transport_stats
+from .http_pool import http_pool
 
 logger = logging.getLogger(__name__)
 
@@ -26,6 +25,8 @@ class RemoteAIWorker:
         self.worker_host = getattr(settings, 'AI_WORKER_HOST', 'localhost:8001')
         self.worker_timeout = getattr(settings, 'AI_WORKER_TIMEOUT', 30)
         self.use_gpu = getattr(settings, 'AI_WORKER_GPU_ENABLED', False)
+        self.transport = getattr(settings, 'AI_WORKER_TRANSPORT', 'json')
+        self.codec = FrameCodec.from_settings()
         
         # Build worker URL based on mode
         if self.mode == 'remote-lan':
@@ -41,12 +42,11 @@ class RemoteAIWorker:
         """Check if using remote processing."""
         return self.mode in ['remote-lan', 'cloud-gpu']
     
-    def encode_image(self, image_array) -> str:
-        """Convert numpy array to base64 for network transfer."""
-        image = Image.fromarray(image_array)
-        buffer = io.BytesIO()
-        image.save(buffer, format='JPEG', quality=85)
-        return base64.b64encode(buffer.getvalue()).decode('utf-8')
+    def encode_image(self, image) -> str:
+        """Convert frame (Frame, PIL image or RGB numpy array) to base64 for the JSON transport."""
+        encoded, stats = self.codec.encode_base64([image])
+        transport_stats.record('json', stats)
+        return encoded[0]
     
     def analyze_frame_remote(self, frame, analysis_types: list, **kwargs) -> Dict[str, Any]:
         """Send frame to remote worker for analysis."""
@@ -56,7 +56,6 @@ class RemoteAIWorker:
         try:
             # Prepare request payload
             payload = {
-                'image': self.encode_image(frame),
                 'analysis_types': analysis_types,
                 'confidence_threshold': kwargs.get('confidence_threshold', 0.3),
                 'use_gpu': self.use_gpu,
@@ -67,12 +66,22 @@ class RemoteAIWorker:
             }
             
             # Send request to remote worker
-            response = requests.post(
-                f"{self.base_url}/analyze",
-                json=payload,
-                timeout=self.worker_timeout,
-                headers={'Content-Type': 'application/json'}
-            )
+            if self.transport == 'binary':
+                body = self.codec.payload(payload, [frame])
+                response = http_pool.post(
+                    f"{self.base_url}/analyze",
+                    data=body,
+                    timeout=self.worker_timeout,
+                    headers={'Content-Type': CONTENT_TYPE}
+                )
+                transport_stats.record('binary', body.stats)
+            else:
+                response = http_pool.post(
+                    f"{self.base_url}/analyze",
+                    json={'image': self.encode_image(frame), **payload},
+                    timeout=self.worker_timeout,
+                    headers={'Content-Type': 'application/json'}
+                )
             response.raise_for_status()
             
             result = response.json()
@@ -95,9 +104,10 @@ class RemoteAIWorker:
             return True
             
         try:
-            response = requests.get(
+            response = http_pool.get(
                 f"{self.base_url}/health",
-                timeout=5
+                timeout=5,
+                retry=False
             )
             result = response.json()
             return result.get('status') == 'healthy'
@@ -110,9 +120,10 @@ class RemoteAIWorker:
             return {'mode': 'local', 'gpu_available': False}
             
         try:
-            response = requests.get(
+            response = http_pool.get(
                 f"{self.base_url}/info",
-                timeout=5
+                timeout=5,
+                retry=False
             )
             return response.json()
         except:
@@ -0,0 +1,121 @@
+"""
+Adaptive per-stream frame sampling.
+
+The number of frames analyzed per segment follows the stream's recent
+activity (motion activity_score, or shot cuts when motion analysis is off)
+and backs off while the segment event queue is deep:
+
+    frames = min + (max - min) * activity_factor * backlog_factor
+
+activity_factor rises linearly to 1 at AI_SAMPLING_ACTIVITY_HIGH; backlog_factor
+falls linearly from 1 at AI_SAMPLING_QUEUE_LOW to 0 at AI_SAMPLING_QUEUE_HIGH
+pending events. Smoothed activity is kept in Redis so every worker sees the
+same stream state.
+"""
+
+import logging
+import threading
+import time
+from typing import Any, Dict, Optional
+import redis
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class AdaptiveSamplingController:
+    """Frames per segment for each stream from its activity and the queue depth"""
+
+    def __init__(self):
+        self.redis_client = redis.Redis(
+            host=settings.REDIS_HOST,
+            port=settings.REDIS_PORT,
+            decode_responses=True
+        )
+        self.redis_key = 'media_analyzer:sampling:activity'
+        self.min_frames = max(1, getattr(settings, 'AI_FRAMES_MIN', 1))
+        self.max_frames = max(self.min_frames, getattr(settings, 'AI_FRAMES_MAX', 8))
+        self.activity_high = getattr(settings, 'AI_SAMPLING_ACTIVITY_HIGH', 2.0)
+        self.queue_low = getattr(settings, 'AI_SAMPLING_QUEUE_LOW', 5)
+        self.queue_high = max(self.queue_low + 1, getattr(settings, 'AI_SAMPLING_QUEUE_HIGH', 50))
+        self.smoothing = getattr(settings, 'AI_SAMPLING_SMOOTHING', 0.5)
+        self.state_ttl = 3600
+        self._local: Dict[str, float] = {}  # Fallback while Redis is unavailable
+        self._last_rates: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return getattr(settings, 'AI_ADAPTIVE_SAMPLING', False)
+
+    def frames_for(self, stream_key: str, queue_depth: int) -> int:
+        """Frames to analyze in the stream's next segment"""
+        activity = self.get_activity(stream_key)
+        activity_factor = min(max(activity / self.activity_high, 0.0), 1.0) if activity is not None else 0.0
+        backlog_factor = 1.0 - min(max((queue_depth - self.queue_low) / (self.queue_high - self.queue_low), 0.0), 1.0)
+        frames = self.min_frames + round((self.max_frames - self.min_frames) * activity_factor * backlog_factor)
+
+        with self._lock:
+            self._last_rates[stream_key] = {
+                'frames': frames,
+                'activity': activity,
+                'queue_depth': queue_depth,
+                'time': time.time()
+            }
+        logger.debug(f"Sampling {frames} frame(s) for {stream_key} (activity={activity}, queue={queue_depth})")
+        return frames
+
+    def observe(self, stream_key: str, segment_results: Dict[str, Any]) -> Optional[float]:
+        """Fold the segment's activity into the stream's smoothed activity"""
+        activity = self._segment_activity(segment_results)
+        if activity is None:
+            return None
+
+        previous = self.get_activity(stream_key)
+        if previous is not None:
+            activity = self.smoothing * activity + (1 - self.smoothing) * previous
+
+        with self._lock:
+            self._local[stream_key] = activity
+        try:
+            pipe = self.redis_client.pipeline()
+            pipe.hset(self.redis_key, stream_key, activity)
+            pipe.expire(self.redis_key, self.state_ttl)
+            pipe.execute()
+        except Exception as e:
+            logger.debug(f"Failed to store sampling activity in Redis: {e}")
+        return activity
+
+    def get_activity(self, stream_key: str) -> Optional[float]:
+        """Smoothed activity of the stream, None before its first analyzed segment"""
+        try:
+            value = self.redis_client.hget(self.redis_key, stream_key)
+            if value is not None:
+                return float(value)
+        except Exception as e:
+            logger.debug(f"Failed to read sampling activity from Redis: {e}")
+        with self._lock:
+            return self._local.get(stream_key)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'min_frames': self.min_frames,
+                'max_frames': self.max_frames,
+                'streams': dict(self._last_rates)
+            }
+
+    def _segment_activity(self, segment_results):
+        motion = segment_results.get('motion') or {}
+        if 'activity_score' in motion:
+            return motion['activity_score']
+        # Without motion analysis a cut counts as a fully busy segment
+        shots = segment_results.get('shots')
+        if shots and 'shot_count' in shots:
+            return self.activity_high if shots['shot_count'] else 0.0
+        return None
+
+
+# Global instance
+sampling_controller = AdaptiveSamplingController()
@@ -0,0 +1,264 @@
+"""
+Decode-once segment pipeline.
+
+A SegmentDecoder demuxes and decodes a segment a single time and fans each
+decoded frame out to subscribed analyzers (motion analysis, frame sampling for
+detection, ...). Pixel conversion is lazy and shared: a DecodedFrame only
+becomes a Frame when a subscriber asks for its pixels, and then only once.
+"""
+
+import logging
+import os
+from typing import List, Optional
+import cv2
+from .frame import Frame
+
+logger = logging.getLogger(__name__)
+
+# Seconds a per-stream subscriber waits in on_start for the stream's previous segment
+STATE_LOCK_TIMEOUT = 60
+
+
+class DecodedFrame:
+    """Decoded frame with its PTS; pixels are converted to a Frame on first access"""
+
+    def __init__(self, pts, index, keyframe, loader):
+        self.pts = pts  # Seconds from segment start
+        self.index = index
+        self.keyframe = keyframe
+        self._loader = loader
+        self._frame = None
+
+    @property
+    def frame(self) -> Frame:
+        if self._frame is None:
+            self._frame = Frame.from_bgr(self._loader(), pts=self.pts)
+            self._loader = None
+        return self._frame
+
+
+class FrameSubscriber:
+    """Receives decoded frames from a SegmentDecoder"""
+
+    # Decoding level the subscriber needs: DEFAULT (all frames), NONREF or NONKEY
+    skip_frame = 'DEFAULT'
+    done = False
+
+    def on_start(self, decoder):
+        pass
+
+    def on_frame(self, decoded: DecodedFrame):
+        raise NotImplementedError
+
+    def on_end(self):
+        pass
+
+
+class FrameSampler(FrameSubscriber):
+    """
+    Selects the frames to run detection on
+
+    Modes:
+        first     - first decoded frame only
+        keyframes - up to max_frames keyframes (None for all)
+        uniform   - max_frames evenly spaced frames
+        at        - frames nearest to the given timestamps (seconds from segment start)
+        shots     - up to max_frames frames at shot boundaries found by shot_detector,
+                    which must be subscribed to the same decoder ahead of the sampler
+    """
+
+    SKIP_FRAME = {'first': 'DEFAULT', 'keyframes': 'NONKEY', 'uniform': 'NONREF', 'at': 'NONREF', 'shots': 'DEFAULT'}
+
+    def __init__(self, mode='first', max_frames=1, timestamps=None, shot_detector=None):
+        if mode not in self.SKIP_FRAME:
+            raise ValueError(f"Unknown frame sampling mode: {mode}")
+        if mode == 'shots' and shot_detector is None:
+            raise ValueError("Shot sampling needs a shot detector")
+        self.mode = mode
+        self.shot_detector = shot_detector
+        self.max_frames = max_frames
+        self.skip_frame = self.SKIP_FRAME[mode]
+        self.targets = sorted(timestamps or [])
+        self.selected: List[DecodedFrame] = []
+        self.done = False
+        self._previous = None
+
+    def on_start(self, decoder):
+        if self.mode == 'uniform':
+            if not decoder.duration:
+                logger.warning(f"Unknown duration for {decoder.segment_path}, sampling keyframes instead")
+                self.mode = 'keyframes'
+                return
+            count = max(1, self.max_frames or 1)
+            self.targets = [decoder.duration * (i + 0.5) / count for i in range(count)]
+
+    def on_frame(self, decoded):
+        if self.mode == 'first':
+            self._select(decoded)
+            self.done = True
+        elif self.mode == 'keyframes':
+            if decoded.keyframe:
+                self._select(decoded)
+                self.done = bool(self.max_frames) and len(self.selected) >= self.max_frames
+        elif self.mode == 'shots':
+            if self.shot_detector.is_boundary(decoded):
+                self._select(decoded)
+                self.done = bool(self.max_frames) and len(self.selected) >= self.max_frames
+        else:
+            self._select_nearest(decoded)
+
+    def on_end(self):
+        # Targets past the last decoded frame map to the last frame
+        if self.targets and self._previous:
+            self._select(self._previous)
+        self.targets = []
+        self._previous = None
+
+    def frames(self):
+        """Selected frames as (frame_timestamp, Frame)"""
+        return [(decoded.pts, decoded.frame) for decoded in self.selected]
+
+    def _select_nearest(self, decoded):
+        """Pick the decoded frame nearest to each target timestamp, in a single pass"""
+        previous = self._previous
+        while self.targets and decoded.pts >= self.targets[0]:
+            target = self.targets.pop(0)
+            if previous and (target - previous.pts) < (decoded.pts - target):
+                self._select(previous)
+            else:
+                self._select(decoded)
+        self.done = not self.targets
+        self._previous = decoded
+
+    def _select(self, decoded):
+        if not self.selected or self.selected[-1] is not decoded:
+            self.selected.append(decoded)
+
+
+class SegmentDecoder:
+    """Decodes a segment once and fans frames out to subscribers"""
+
+    def __init__(self, segment_path, skip_frame='DEFAULT'):
+        self.segment_path = segment_path
+        self.skip_frame = skip_frame
+        self.duration: Optional[float] = None
+
+    @classmethod
+    def for_subscribers(cls, segment_path, subscribers):
+        """Decoder at the lowest decoding level that still satisfies every subscriber"""
+        levels = ['DEFAULT', 'NONREF', 'NONKEY']
+        level = min((levels.index(s.skip_frame) for s in subscribers), default=0)
+        return cls(segment_path, levels[level])
+
+    def run(self, subscribers) -> int:
+        """
+        Feed every decoded frame to subscribers until all are done; returns frames decoded
+
+        Subscribers whose on_start returned always get on_end, also when decoding
+        or another subscriber fails; the others never do.
+        """
+        started = []
+        starting = False
+        count = 0
+        frames = self.frames()
+        try:
+            for decoded in frames:
+                if not starting:
+                    starting = True
+                    self._start(subscribers, started)
+                count += 1
+                for subscriber in subscribers:
+                    if not subscriber.done:
+                        subscriber.on_frame(decoded)
+                if all(subscriber.done for subscriber in subscribers):
+                    break
+        finally:
+            frames.close()
+            try:
+                if not starting:
+                    # Nothing decoded: subscribers still see a start and an end
+                    self._start(subscribers, started)
+            finally:
+                self._end(started)
+        return count
+
+    def _start(self, subscribers, started):
+        for subscriber in subscribers:
+            subscriber.on_start(self)
+            started.append(subscriber)
+
+    def _end(self, started):
+        error = None
+        for subscriber in started:
+            try:
+                subscriber.on_end()
+            except Exception as e:
+                logger.error(f"{type(subscriber).__name__} failed to finish segment {self.segment_path}: {e}")
+                error = error or e
+        if error:
+            raise error
+
+    def frames(self):
+        """Yield DecodedFrame objects; self.duration is set before the first one"""
+        if not os.path.exists(self.segment_path):
+            logger.error(f"Segment file does not exist: {self.segment_path}")
+            return
+
+        try:
+            import av
+        except ImportError:
+            av = None
+
+        if av is None:
+            if self.skip_frame != 'DEFAULT':
+                logger.warning("PyAV not installed, decoding every frame with OpenCV")
+            yield from self._frames_opencv()
+        else:
+            yield from self._frames_pyav(av)
+
+    def _frames_pyav(self, av):
+        with av.open(self.segment_path) as container:
+            stream = container.streams.video[0]
+            stream.thread_type = 'AUTO'
+            stream.codec_context.skip_frame = self.skip_frame
+
+            if stream.duration:
+                self.duration = float(stream.duration * stream.time_base)
+            elif container.duration:
+                self.duration = container.duration / 1_000_000  # av.time_base
+
+            start = stream.start_time
+            index = 0
+            for av_frame in container.decode(stream):
+                if av_frame.pts is None:
+                    continue
+                if start is None:
+                    start = av_frame.pts
+                pts = max(0.0, float((av_frame.pts - start) * stream.time_base))
+                yield DecodedFrame(
+                    pts, index, av_frame.key_frame,
+                    lambda av_frame=av_frame: av_frame.to_ndarray(format='bgr24')
+                )
+                index += 1
+
+    def _frames_opencv(self):
+        cap = cv2.VideoCapture(self.segment_path)
+        if not cap.isOpened():
+            logger.error(f"OpenCV failed to open: {self.segment_path}")
+            return
+
+        try:
+            fps = cap.get(cv2.CAP_PROP_FPS) or 0
+            frame_count = cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0
+            self.duration = frame_count / fps if fps and frame_count else None
+
+            index = 0
+            while True:
+                ret, bgr = cap.read()
+                if not ret:
+                    break
+                pts = cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+                yield DecodedFrame(pts, index, index == 0, lambda bgr=bgr: bgr)
+                index += 1
+        finally:
+            cap.release()
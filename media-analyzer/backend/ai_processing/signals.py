@@ -0,0 +1,15 @@
+import logging
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import Brand
+from .brand_embeddings import brand_embeddings
+
+logger = logging.getLogger(__name__)
+
+
+@receiver(post_save, sender=Brand)
+@receiver(post_delete, sender=Brand)
+def invalidate_brand_embeddings(sender, instance, **kwargs):
+    """Brand prompts changed: drop cached CLIP text embeddings everywhere"""
+    logger.info(f"Brand '{instance.name}' changed, invalidating cached brand embeddings")
+    brand_embeddings.invalidate()
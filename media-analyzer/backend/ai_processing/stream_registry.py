@@ -0,0 +1,63 @@
+"""
+Worker-local registry of per-stream state.
+
+Several analysis stages keep state between segments of the same stream (frame
+hashes, motion background models, trackers...). The registry creates state on
+first use and drops streams that have been idle for longer than idle_timeout.
+"""
+
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class StreamStateRegistry:
+    """Per-stream state objects with idle eviction"""
+
+    def __init__(self, factory: Optional[Callable[[], Any]] = None, idle_timeout: float = 300.0):
+        self.factory = factory
+        self.idle_timeout = idle_timeout
+        self._states: Dict[Hashable, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._last_sweep = time.monotonic()
+
+    def get(self, stream_key: Hashable, factory: Optional[Callable[[], Any]] = None) -> Any:
+        """Return the state for stream_key, creating it (with factory if given) if needed"""
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_sweep > self.idle_timeout:
+                self._evict_idle(now)
+
+            entry = self._states.get(stream_key)
+            if entry is None:
+                entry = {'state': (factory or self.factory)(), 'last_used': now}
+                self._states[stream_key] = entry
+            entry['last_used'] = now
+            return entry['state']
+
+    def peek(self, stream_key: Hashable) -> Optional[Any]:
+        """Return existing state without creating or touching it"""
+        with self._lock:
+            entry = self._states.get(stream_key)
+            return entry['state'] if entry else None
+
+    def pop(self, stream_key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._states.pop(stream_key, None)
+            return entry['state'] if entry else None
+
+    def evict_idle(self) -> int:
+        with self._lock:
+            return self._evict_idle(time.monotonic())
+
+    def __len__(self):
+        with self._lock:
+            return len(self._states)
+
+    def _evict_idle(self, now: float) -> int:
+        idle = [key for key, entry in self._states.items()
+                if now - entry['last_used'] > self.idle_timeout]
+        for key in idle:
+            del self._states[key]
+        self._last_sweep = now
+        return len(idle)
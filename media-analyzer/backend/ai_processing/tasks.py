@@ -1,4 +1,5 @@
 from celery import shared_task
+from django.conf import settings
 import logging
 from channels.layers import get_channel_layer
 from asgiref.sync import async_to_sync
@@ -33,9 +34,9 @@ def analyze_visual_properties(self, stream_key, segment_path, session_id=None):
         # Initialize analysis engine
         engine = AnalysisEngine()
         
-        # Extract and analyze frame
-        frame = engine.extract_frame_from_segment(segment_path)
-        if not frame:
+        # Visual properties of the first frame, read by a subscriber of the shared segment decode
+        analysis_results = engine.analyze_segment(segment_path, ['visual_analysis'])
+        if 'visual' not in analysis_results:
             logger.error(f"Failed to extract frame from {segment_path}")
             if queue_item:
                 queue_item.status = 'failed'
@@ -43,9 +44,6 @@ def analyze_visual_properties(self, stream_key, segment_path, session_id=None):
                 queue_item.save()
             return {"error": "Failed to extract frame"}
         
-        # Analyze visual properties (always available locally)
-        analysis_results = engine.analyze_frame(frame, ['visual_analysis'])
-        
         # Store results (no provider needed for local visual analysis)
         analysis = VideoAnalysis.objects.create(
             stream_key=stream_key,
@@ -64,7 +62,8 @@ def analyze_visual_properties(self, stream_key, segment_path, session_id=None):
                 dominant_colors=analysis_results['visual']['dominant_colors'],
                 brightness_level=analysis_results['visual']['brightness_level'],
                 contrast_level=analysis_results['visual']['contrast_level'],
-                saturation_level=analysis_results['visual']['saturation_level']
+                saturation_level=analysis_results['visual']['saturation_level'],
+                colorfulness=analysis_results['visual']['colorfulness']
             )
         
         # Send results via WebSocket
@@ -103,8 +102,9 @@ def process_video_segment(self, stream_key, segment_path, session_id=None):
         # Logo detection now handled by event-driven system in event_tasks.py
         # Events are published by file-watcher and consumed by process_segment_from_event
         
-        # Visual analysis disabled for performance - only logo detection
-        # analyze_visual_properties.delay(stream_key, segment_path)
+        # Visual analysis runs on a thumbnail, cheap enough to dispatch for every segment
+        if settings.AI_VISUAL_ANALYSIS_ENABLED:
+            analyze_visual_properties.delay(stream_key, segment_path, session_id)
         
         return {"dispatched": True, "capabilities": active_capabilities}
         
@@ -142,7 +142,8 @@ def analyze_frame_task(stream_key, segment_path, frame_timestamp=0.0):
             if 'logo_detection' in provider.capabilities:
                 config['logo_detection'] = {
                     'provider_type': provider.provider_type,
-                    'model_identifier': provider.model_identifier
+                    'model_identifier': provider.model_identifier,
+                    'config': provider.api_config
                 }
         
         engine.configure_providers(config)
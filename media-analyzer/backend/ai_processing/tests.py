@@ -0,0 +1,125 @@
+import threading
+import numpy as np
+from django.test import SimpleTestCase, override_settings
+from .adapters.object_detection import YOLOObjectDetectionAdapter
+from .analysis_engine import AnalysisEngine
+from .gating import FrameSignals, GateCascade
+from .model_pool import model_pool
+
+
+class _Array:
+    """Stand-in for a torch tensor: .cpu().numpy()"""
+
+    def __init__(self, values):
+        self.values = np.asarray(values)
+
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return self.values
+
+
+class _Boxes:
+    def __init__(self):
+        self.xyxyn = _Array([[0.1, 0.2, 0.5, 0.6]])
+        self.conf = _Array([0.9])
+        self.cls = _Array([0])
+
+    def __len__(self):
+        return 1
+
+
+class _Result:
+    boxes = _Boxes()
+
+
+class _BlockingYOLO:
+    """Stub YOLO model whose forward pass waits until released"""
+
+    names = {0: 'person'}
+
+    def __init__(self):
+        self.entered = threading.Event()
+        self.release = threading.Event()
+
+    def __call__(self, images, conf=0.5, verbose=False):
+        self.entered.set()
+        self.release.wait(5)
+        return [_Result() for _ in images]
+
+
+class BatchedDetectionCleanupTests(SimpleTestCase):
+
+    @override_settings(AI_BATCH_MAX_SIZE=8, AI_BATCH_MAX_WAIT_MS=1, AI_BATCH_RESULT_TIMEOUT=10)
+    def test_cleanup_of_batcher_owner_does_not_break_batch_in_flight(self):
+        model = _BlockingYOLO()
+        model_path = 'stub-yolo-cleanup.pt'
+        model_pool.get(('yolo', model_path), lambda: model, size_mb=0)
+
+        # The first adapter creates the process-wide batcher, the second one shares it
+        owner = YOLOObjectDetectionAdapter(model_path)
+        other = YOLOObjectDetectionAdapter(model_path)
+        image = np.zeros((32, 32, 3), dtype=np.uint8)
+        results = {}
+
+        first = threading.Thread(target=lambda: results.setdefault('owner', owner.detect(image)))
+        first.start()
+        self.assertTrue(model.entered.wait(5))
+
+        # The owner's task ends while its batch is still running on the batcher thread
+        owner.cleanup()
+        second = threading.Thread(target=lambda: results.setdefault('other', other.detect(image)))
+        second.start()
+        model.release.set()
+        first.join(10)
+        second.join(10)
+
+        for name in ('owner', 'other'):
+            self.assertEqual([d['label'] for d in results[name]], ['person'], name)
+
+
+class GateReuseTests(SimpleTestCase):
+
+    def test_reused_results_are_not_shared_with_the_cached_run(self):
+        cascade = GateCascade('object_detection', [{'type': 'frame_diff', 'min_energy': 3.0}])
+        image = np.full((32, 32, 3), 128, dtype=np.uint8)
+        stream_key = 'stream-gate-reuse'
+        detections = [{'label': 'person', 'confidence': 0.9, 'bbox': {'x': 0.1, 'y': 0.2, 'width': 0.3, 'height': 0.4}}]
+
+        self.assertIsNone(cascade.evaluate(FrameSignals(image), stream_key))
+        cascade.record_run(FrameSignals(image), stream_key, detections)
+        detections[0]['label'] = 'changed by the caller after the run'
+
+        reused = cascade.evaluate(FrameSignals(image), stream_key)
+        reused[0]['bbox']['x'] = 0.5
+        reused.append({'label': 'car'})
+
+        again = cascade.evaluate(FrameSignals(image), stream_key)
+        self.assertEqual([d['label'] for d in again], ['person'])
+        self.assertEqual(again[0]['bbox']['x'], 0.1)
+
+
+class DominantColorTests(SimpleTestCase):
+
+    @override_settings(VISUAL_DOMINANT_COLOR_METHOD='histogram')
+    def test_single_color_on_a_bin_edge_is_reported_once(self):
+        # Mid gray with the noise of a decoded frame straddles the 127/128 bin edge on every channel
+        rng = np.random.default_rng(0)
+        image = np.clip(rng.normal(128, 1.5, (90, 160, 3)), 0, 255).astype(np.uint8)
+
+        colors = AnalysisEngine()._analyze_visual_properties(image)['dominant_colors']
+
+        self.assertEqual(len(colors), 1)
+        np.testing.assert_allclose(colors[0], [128, 128, 128], atol=1)
+
+    @override_settings(VISUAL_DOMINANT_COLOR_METHOD='histogram')
+    def test_distinct_colors_are_kept_most_frequent_first(self):
+        image = np.zeros((90, 160, 3), dtype=np.uint8)
+        image[:, :80] = (200, 40, 40)
+        image[:, 80:120] = (40, 200, 40)
+        image[:, 120:] = (40, 40, 200)
+
+        colors = AnalysisEngine()._analyze_visual_properties(image)['dominant_colors']
+
+        self.assertEqual(colors, [[200, 40, 40], [40, 200, 40], [40, 40, 200]])
@@ -0,0 +1,109 @@
+"""
+Text-region proposals for OCR.
+
+Broadcast frames carry text in a few small areas (lower thirds, tickers,
+scoreboards). A gradient-morphology pass finds dense horizontal runs of strong
+edges, so OCR only has to run on those crops instead of the whole frame.
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+import cv2
+import numpy as np
+from django.conf import settings
+
+Box = Tuple[int, int, int, int]  # x, y, width, height in frame pixels
+
+
+def propose_text_regions(gray, max_regions=24, proposal_width=960) -> Optional[List[Box]]:
+    """
+    Candidate text boxes for a grayscale frame.
+
+    Returns None when text appears to cover most of the frame, in which case
+    full-frame OCR is cheaper than OCR on overlapping crops.
+    """
+    height, width = gray.shape
+    scale = min(1.0, proposal_width / width)
+    small = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA) if scale < 1.0 else gray
+
+    # Strong local contrast, binarized, then joined along text lines
+    gradient = cv2.morphologyEx(small, cv2.MORPH_GRADIENT, cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3, 3)))
+    _, binary = cv2.threshold(gradient, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
+    connected = cv2.morphologyEx(binary, cv2.MORPH_CLOSE, cv2.getStructuringElement(cv2.MORPH_RECT, (9, 1)))
+
+    contours, _ = cv2.findContours(connected, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    small_height = small.shape[0]
+    boxes = []
+    for contour in contours:
+        x, y, w, h = cv2.boundingRect(contour)
+        if h < 6 or h > small_height / 3 or w < h * 1.2:
+            continue
+        # Joined text lines fill their box, outlines of boxes and shapes do not
+        if cv2.countNonZero(connected[y:y + h, x:x + w]) < 0.45 * w * h:
+            continue
+        boxes.append((x, y, w, h))
+
+    boxes = _merge_boxes(boxes, pad=max(2, small_height // 120))
+    if sum(w * h for _, _, w, h in boxes) > 0.5 * small.shape[0] * small.shape[1]:
+        return None
+
+    # Largest regions first, mapped back to full resolution
+    boxes = sorted(boxes, key=lambda box: box[2] * box[3], reverse=True)[:max_regions]
+    return [_scale_box(box, 1.0 / scale, width, height) for box in boxes]
+
+
+def _merge_boxes(boxes, pad):
+    """Pad boxes and merge overlapping ones until none overlap"""
+    merged = [(x - pad, y - pad, x + w + pad, y + h + pad) for x, y, w, h in boxes]
+    changed = True
+    while changed:
+        changed = False
+        result = []
+        for box in merged:
+            for i, other in enumerate(result):
+                if box[0] <= other[2] and other[0] <= box[2] and box[1] <= other[3] and other[1] <= box[3]:
+                    result[i] = (min(box[0], other[0]), min(box[1], other[1]),
+                                 max(box[2], other[2]), max(box[3], other[3]))
+                    changed = True
+                    break
+            else:
+                result.append(box)
+        merged = result
+    return [(x1, y1, x2 - x1, y2 - y1) for x1, y1, x2, y2 in merged]
+
+
+def _scale_box(box, factor, width, height) -> Box:
+    x, y, w, h = box
+    x1, y1 = max(0, int(x * factor)), max(0, int(y * factor))
+    x2, y2 = min(width, int(np.ceil((x + w) * factor))), min(height, int(np.ceil((y + h) * factor)))
+    return x1, y1, x2 - x1, y2 - y1
+
+
+class OCRThreadPool:
+    """Worker-local thread pool for OCR on region crops (recreated after fork)"""
+
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def map(self, fn, items):
+        items = list(items)
+        if len(items) <= 1:
+            return [fn(item) for item in items]
+        return list(self._get_executor().map(fn, items))
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                workers = self.max_workers or getattr(settings, 'AI_OCR_WORKERS', 0) or min(4, os.cpu_count() or 1)
+                self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='ocr')
+                self._pid = os.getpid()
+            return self._executor
+
+
+# Global instance
+ocr_pool = OCRThreadPool()
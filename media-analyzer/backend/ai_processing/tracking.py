@@ -0,0 +1,187 @@
+"""
+Detect-every-N, track-in-between for object and logo detections.
+
+A per-stream IoU tracker (SORT-style, constant-velocity boxes without a full
+Kalman filter) carries detections across sampled frames and segments. The
+detector only runs every detect_every frames, when the tracked confidence has
+decayed below min_confidence, or when there is nothing to track yet; frames in
+between get the tracks' predicted boxes with decayed confidence.
+
+Enabled per provider in api_config:
+
+    "tracking": {"detect_every": 5, "decay": 0.9, "min_confidence": 0.3,
+                 "iou_threshold": 0.3, "max_misses": 2}
+"""
+
+import itertools
+import logging
+import threading
+from typing import Any, Dict, List
+from .stream_registry import StreamStateRegistry
+
+logger = logging.getLogger(__name__)
+
+_track_ids = itertools.count(1)
+
+
+def iou(a, b) -> float:
+    """IoU of two normalized {'x', 'y', 'width', 'height'} boxes"""
+    x1, y1 = max(a['x'], b['x']), max(a['y'], b['y'])
+    x2 = min(a['x'] + a['width'], b['x'] + b['width'])
+    y2 = min(a['y'] + a['height'], b['y'] + b['height'])
+    intersection = max(0.0, x2 - x1) * max(0.0, y2 - y1)
+    union = a['width'] * a['height'] + b['width'] * b['height'] - intersection
+    return intersection / union if union > 0 else 0.0
+
+
+class Track:
+    """One tracked detection with a constant per-frame velocity"""
+
+    def __init__(self, detection):
+        self.track_id = next(_track_ids)
+        self.label = detection['label']
+        self.bbox = dict(detection['bbox'])
+        self.velocity = (0.0, 0.0)  # Box offset per sampled frame
+        self.confidence = detection['confidence']  # Confidence at the last detection
+        self.frames_since_detection = 0
+        self.misses = 0
+        self.hits = 1
+
+    def update(self, detection):
+        bbox = detection['bbox']
+        steps = max(1, self.frames_since_detection)
+        self.velocity = ((bbox['x'] - self.bbox['x']) / steps, (bbox['y'] - self.bbox['y']) / steps)
+        self.bbox = dict(bbox)
+        self.confidence = detection['confidence']
+        self.frames_since_detection = 0
+        self.misses = 0
+        self.hits += 1
+
+    def predicted_bbox(self):
+        dx, dy = self.velocity
+        steps = self.frames_since_detection
+        return {
+            **self.bbox,
+            'x': min(max(self.bbox['x'] + dx * steps, 0.0), 1.0 - self.bbox['width']),
+            'y': min(max(self.bbox['y'] + dy * steps, 0.0), 1.0 - self.bbox['height'])
+        }
+
+
+class DetectionTracker:
+    """Per-stream tracker for one capability"""
+
+    def __init__(self, detect_every=5, decay=0.9, min_confidence=0.3, iou_threshold=0.3, max_misses=2):
+        self.detect_every = max(1, int(detect_every))
+        self.decay = decay
+        self.min_confidence = min_confidence
+        self.iou_threshold = iou_threshold
+        self.max_misses = max_misses
+        self.tracks: List[Track] = []
+        self.frames_since_detection = None  # None until the detector has run once
+        self._lock = threading.Lock()
+
+    def needs_detection(self) -> bool:
+        """Whether the detector has to run on the next frame"""
+        with self._lock:
+            if self.frames_since_detection is None:
+                return True
+            if self.frames_since_detection + 1 >= self.detect_every:
+                return True
+            # Re-detect early once a live track has decayed past usefulness
+            return any(
+                self._decayed_confidence(track, 1) < self.min_confidence
+                for track in self.tracks if not track.misses
+            )
+
+    def update(self, detections) -> List[Dict[str, Any]]:
+        """Feed detector output; returns the detections annotated with track ids"""
+        with self._lock:
+            self.frames_since_detection = 0
+            for track in self.tracks:
+                track.frames_since_detection += 1
+
+            # Greedy matching by IoU, same label only
+            pairs = sorted(
+                ((iou(track.predicted_bbox(), detection['bbox']), t, d)
+                 for t, track in enumerate(self.tracks)
+                 for d, detection in enumerate(detections)
+                 if track.label == detection['label']),
+                key=lambda pair: pair[0], reverse=True
+            )
+            matched_tracks, matched_detections = set(), {}
+            for score, t, d in pairs:
+                if score < self.iou_threshold:
+                    break
+                if t in matched_tracks or d in matched_detections:
+                    continue
+                self.tracks[t].update(detections[d])
+                matched_tracks.add(t)
+                matched_detections[d] = self.tracks[t]
+
+            for t, track in enumerate(self.tracks):
+                if t not in matched_tracks:
+                    track.misses += 1
+            self.tracks = [track for track in self.tracks if track.misses <= self.max_misses]
+
+            annotated = []
+            for d, detection in enumerate(detections):
+                track = matched_detections.get(d)
+                if track is None:
+                    track = Track(detection)
+                    self.tracks.append(track)
+                annotated.append({**detection, 'track_id': track.track_id})
+            return annotated
+
+    def predict(self) -> List[Dict[str, Any]]:
+        """Advance one frame without running the detector; returns tracked detections"""
+        with self._lock:
+            self.frames_since_detection += 1
+            results = []
+            for track in self.tracks:
+                if track.misses:
+                    continue
+                track.frames_since_detection += 1
+                confidence = self._decayed_confidence(track, 0)
+                if confidence < self.min_confidence:
+                    continue
+                results.append({
+                    'label': track.label,
+                    'confidence': confidence,
+                    'bbox': track.predicted_bbox(),
+                    'track_id': track.track_id,
+                    'tracked': True
+                })
+            return results
+
+    def _decayed_confidence(self, track, ahead):
+        return track.confidence * self.decay ** (track.frames_since_detection + ahead)
+
+
+class TrackerRegistry:
+    """Worker-local trackers per (stream, capability)"""
+
+    def __init__(self, idle_timeout=300):
+        self._trackers = StreamStateRegistry(idle_timeout=idle_timeout)
+        self._stats = {'detected': 0, 'tracked': 0}
+        self._lock = threading.Lock()
+
+    def get(self, stream_key, capability, options) -> DetectionTracker:
+        config_key = tuple(sorted(options.items()))
+        return self._trackers.get((stream_key, capability, config_key), lambda: DetectionTracker(**options))
+
+    def record(self, detected: bool):
+        with self._lock:
+            self._stats['detected' if detected else 'tracked'] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self._stats['detected'] + self._stats['tracked']
+            return {
+                **self._stats,
+                'detector_rate': round(self._stats['detected'] / total, 3) if total else 0.0,
+                'trackers': len(self._trackers)
+            }
+
+
+# Global instance
+trackers = TrackerRegistry()
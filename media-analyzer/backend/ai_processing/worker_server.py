@@ -0,0 +1,412 @@
+"""
+Reference AI worker server for the remote_lan execution mode.
+
+An ASGI application (run it with `manage.py run_ai_worker`) that serves the
+contract RemoteLANExecutionStrategy and RemoteAIWorker expect:
+
+    POST /ai/analyze        one frame, any analysis types
+    POST /ai/analyze_batch  many frames, every analysis type (see remote_lan_execution)
+    GET  /ai/health         200 {'status': 'healthy'}, 503 while the queue is full
+    GET  /ai/info           capabilities, providers, queue and batch limits, resident models
+    GET  /ai/metrics        request, queue, batch and latency counters
+
+Bodies are JSON with base64 images or binary frame payloads (frame_codec).
+Each (frame, analysis type) becomes one work item on a bounded queue; when
+it is full the request is rejected with 503 as a whole, and a request with
+more items than the whole queue holds with 413. Batch loops collect
+items for up to max_wait_ms or max_batch_size, group them by analysis type and
+threshold, and run one detect_batch per group on the inference threads.
+Adapters are built once from the worker's own providers (AI_WORKER_PROVIDERS),
+their weights stay resident in the model pool.
+"""
+
+import asyncio
+import base64
+import json
+import logging
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+import cv2
+import numpy as np
+from django.conf import settings
+from .adapters.object_detection import ObjectDetectionAdapterFactory
+from .adapters.logo_detection import LogoDetectionAdapterFactory
+from .adapters.text_detection import TextDetectionAdapterFactory
+from .frame import Frame
+from .frame_codec import CONTENT_TYPE, decode_payload
+from .model_pool import model_pool
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PROVIDERS = {
+    'logo_detection': {'provider_type': 'local_clip', 'model_identifier': 'openai/clip-vit-base-patch32'},
+    'object_detection': {'provider_type': 'local_yolo', 'model_identifier': 'yolov8n.pt'},
+    'text_detection': {'provider_type': 'local_tesseract', 'config': {}}
+}
+
+ADAPTER_FACTORIES = {
+    'logo_detection': LogoDetectionAdapterFactory,
+    'object_detection': ObjectDetectionAdapterFactory,
+    'text_detection': TextDetectionAdapterFactory
+}
+
+MAX_BODY_BYTES = 64 * 1024 * 1024
+
+
+class WorkItem:
+    """One frame for one analysis type, waiting for its batch"""
+
+    __slots__ = ('analysis_type', 'confidence_threshold', 'frame', 'future', 'enqueued')
+
+    def __init__(self, analysis_type, confidence_threshold, frame, future):
+        self.analysis_type = analysis_type
+        self.confidence_threshold = confidence_threshold
+        self.frame = frame
+        self.future = future
+        self.enqueued = time.monotonic()
+
+
+class WorkerMetrics:
+    """Counters for /ai/metrics"""
+
+    def __init__(self, latency_window=1000):
+        self.requests: Dict[str, int] = {}
+        self.statuses: Dict[int, int] = {}
+        self.rejected = 0
+        self.frames = 0
+        self.batches: Dict[str, Dict[str, float]] = {}
+        self.latencies = deque(maxlen=latency_window)
+        self.queue_waits = deque(maxlen=latency_window)
+
+    def record_request(self, path, status, elapsed):
+        self.requests[path] = self.requests.get(path, 0) + 1
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        if path.endswith('analyze') or path.endswith('analyze_batch'):
+            self.latencies.append(elapsed)
+
+    def record_batch(self, analysis_type, size, elapsed, waits):
+        entry = self.batches.setdefault(analysis_type, {'batches': 0, 'items': 0, 'max_batch': 0, 'inference_s': 0.0})
+        entry['batches'] += 1
+        entry['items'] += size
+        entry['max_batch'] = max(entry['max_batch'], size)
+        entry['inference_s'] += elapsed
+        self.queue_waits.extend(waits)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'requests': dict(self.requests),
+            'statuses': {str(status): count for status, count in self.statuses.items()},
+            'rejected': self.rejected,
+            'frames': self.frames,
+            'batches': {
+                analysis_type: {
+                    **entry,
+                    'inference_s': round(entry['inference_s'], 3),
+                    'mean_batch': round(entry['items'] / entry['batches'], 2) if entry['batches'] else 0.0
+                }
+                for analysis_type, entry in self.batches.items()
+            },
+            'latency_ms': _percentiles(self.latencies),
+            'queue_wait_ms': _percentiles(self.queue_waits)
+        }
+
+
+def _percentiles(values) -> Dict[str, float]:
+    if not values:
+        return {'p50': 0.0, 'p95': 0.0, 'p99': 0.0}
+    p50, p95, p99 = np.percentile(np.fromiter(values, dtype=np.float64), [50, 95, 99]) * 1000
+    return {'p50': round(p50, 1), 'p95': round(p95, 1), 'p99': round(p99, 1)}
+
+
+class WorkerServer:
+    """ASGI application serving /ai/* with the worker's local adapters"""
+
+    def __init__(self, providers: Optional[Dict[str, dict]] = None, queue_size=None, max_batch_size=None,
+                 max_wait_ms=None, inference_threads=None):
+        self.providers = providers or _configured_providers()
+        self.queue_size = queue_size or getattr(settings, 'AI_WORKER_QUEUE_SIZE', 256)
+        self.max_batch_size = max_batch_size or getattr(settings, 'AI_WORKER_MAX_BATCH_SIZE', 16)
+        self.max_wait = (max_wait_ms if max_wait_ms is not None else getattr(settings, 'AI_WORKER_MAX_WAIT_MS', 10)) / 1000.0
+        self.inference_threads = inference_threads or getattr(settings, 'AI_WORKER_INFERENCE_THREADS', 1)
+        self.adapters = {}
+        self.metrics = WorkerMetrics()
+        self.started = time.time()
+        self._queue: Optional[asyncio.Queue] = None
+        self._executor = None
+        self._loops: List[asyncio.Task] = []
+
+    # Lifecycle
+
+    def load_adapters(self, preload=False):
+        """Build adapters for the configured providers; preload runs each once to make models resident"""
+        for analysis_type, provider_config in self.providers.items():
+            factory = ADAPTER_FACTORIES.get(analysis_type)
+            if factory is None:
+                logger.warning(f"Worker cannot serve {analysis_type}, skipping")
+                continue
+            try:
+                self.adapters[analysis_type] = factory.create(provider_config)
+            except Exception as e:
+                logger.error(f"Failed to create {analysis_type} adapter: {e}")
+                continue
+            if preload:
+                blank = Frame.from_bgr(np.zeros((64, 64, 3), dtype=np.uint8))
+                try:
+                    self.adapters[analysis_type].detect_batch([blank], 0.5)
+                except Exception as e:
+                    logger.error(f"Failed to preload {analysis_type} model: {e}")
+        logger.info(f"AI worker serving: {sorted(self.adapters)}")
+
+    async def startup(self):
+        if self._queue is not None:
+            return
+        if not self.adapters:
+            self.load_adapters()
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._executor = ThreadPoolExecutor(max_workers=self.inference_threads, thread_name_prefix='inference')
+        self._loops = [asyncio.create_task(self._batch_loop()) for _ in range(self.inference_threads)]
+
+    async def shutdown(self):
+        for task in self._loops:
+            task.cancel()
+        if self._executor:
+            self._executor.shutdown(wait=False)
+        self._queue = None
+
+    # ASGI
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            return
+
+        await self.startup()
+        start = time.perf_counter()
+        path = scope['path'].rstrip('/')
+        method = scope['method']
+        try:
+            if method == 'GET' and path == '/ai/health':
+                status, body = self.health()
+            elif method == 'GET' and path == '/ai/info':
+                status, body = 200, self.info()
+            elif method == 'GET' and path == '/ai/metrics':
+                status, body = 200, self.get_metrics()
+            elif method == 'POST' and path in ('/ai/analyze', '/ai/analyze_batch'):
+                status, body = await self._analyze(scope, receive, batch=path.endswith('batch'))
+            else:
+                status, body = 404, {'error': 'not_found'}
+        except Exception as e:
+            logger.error(f"Worker request {method} {path} failed: {e}")
+            status, body = 500, {'error': str(e)}
+
+        self.metrics.record_request(path, status, time.perf_counter() - start)
+        headers = [(b'content-type', b'application/json')]
+        if status == 503:
+            headers.append((b'retry-after', b'1'))
+        payload = json.dumps(body).encode('utf-8')
+        await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+        await send({'type': 'http.response.body', 'body': payload})
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await self.startup()
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.shutdown()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    # Endpoints
+
+    def health(self):
+        depth = self._queue.qsize() if self._queue else 0
+        overloaded = depth >= self.queue_size
+        return (503 if overloaded else 200), {
+            'status': 'overloaded' if overloaded else 'healthy',
+            'queue_depth': depth,
+            'queue_size': self.queue_size
+        }
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            'capabilities': sorted(self.adapters),
+            'providers': {analysis_type: config.get('provider_type') for analysis_type, config in self.providers.items()},
+            'transports': ['json', 'binary'],
+            'gpu_available': _gpu_available(),
+            'queue_size': self.queue_size,
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': self.max_wait * 1000,
+            'inference_threads': self.inference_threads,
+            'model_pool': model_pool.get_stats(),
+            'uptime': round(time.time() - self.started, 1)
+        }
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return {
+            **self.metrics.get_stats(),
+            'queue_depth': self._queue.qsize() if self._queue else 0,
+            'queue_size': self.queue_size
+        }
+
+    async def _analyze(self, scope, receive, batch):
+        body = await _read_body(receive)
+        if body is None:
+            return 413, {'error': 'body_too_large'}
+        content_type = dict(scope.get('headers', [])).get(b'content-type', b'').decode('latin-1')
+
+        loop = asyncio.get_running_loop()
+        try:
+            request, frames = await loop.run_in_executor(None, _parse_request, body, content_type)
+        except (ValueError, KeyError, TypeError) as e:
+            return 400, {'error': f"bad_request: {e}"}
+        analysis_types = request.get('analysis_types') or []
+        confidence_threshold = float(request.get('confidence_threshold', 0.5))
+        served = [analysis_type for analysis_type in analysis_types if analysis_type in self.adapters]
+
+        # Admit the whole request or nothing; one that can never fit is not backpressure
+        items_needed = len(frames) * len(served)
+        if items_needed > self.queue_size:
+            return 413, {
+                'error': 'too_many_frames',
+                'max_frames': self.queue_size // max(1, len(served)),
+                'queue_size': self.queue_size
+            }
+        if self._queue.qsize() + items_needed > self.queue_size:
+            self.metrics.rejected += 1
+            return 503, {'error': 'overloaded', 'queue_depth': self._queue.qsize()}
+
+        start = time.perf_counter()
+        pending = []
+        for frame_id, frame in frames:
+            futures = {}
+            for analysis_type in served:
+                future = loop.create_future()
+                self._queue.put_nowait(WorkItem(analysis_type, confidence_threshold, frame, future))
+                futures[analysis_type] = future
+            pending.append((frame_id, futures))
+        self.metrics.frames += len(frames)
+
+        results = []
+        for frame_id, futures in pending:
+            detections, errors = {}, []
+            for analysis_type in analysis_types:
+                if analysis_type not in futures:
+                    detections[analysis_type] = []
+                    errors.append(f"{analysis_type}: not served by this worker")
+                    continue
+                try:
+                    detections[analysis_type] = await futures[analysis_type]
+                except Exception as e:
+                    detections[analysis_type] = []
+                    errors.append(f"{analysis_type}: {e}")
+            results.append({'id': frame_id, 'detections': detections, 'error': '; '.join(errors) or None})
+
+        processing_time = round(time.perf_counter() - start, 4)
+        if batch:
+            return 200, {'results': results, 'processing_time': processing_time}
+
+        single = results[0] if results else {'detections': {}, 'error': 'no_frame'}
+        return 200, {
+            'detections': [d for analysis_type in analysis_types for d in single['detections'].get(analysis_type, [])],
+            'results': single['detections'],
+            'error': single['error'],
+            'processing_time': processing_time
+        }
+
+    # Batching
+
+    async def _batch_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                    continue
+                except asyncio.QueueEmpty:
+                    pass
+                # Poll instead of wait_for(get()), which can drop an item when it times out
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                await asyncio.sleep(min(remaining, 0.001))
+
+            groups: Dict[tuple, List[WorkItem]] = {}
+            for item in batch:
+                groups.setdefault((item.analysis_type, item.confidence_threshold), []).append(item)
+            for (analysis_type, confidence_threshold), items in groups.items():
+                await self._run_group(loop, analysis_type, confidence_threshold, items)
+
+    async def _run_group(self, loop, analysis_type, confidence_threshold, items):
+        adapter = self.adapters[analysis_type]
+        start = time.perf_counter()
+        waits = [time.monotonic() - item.enqueued for item in items]
+        try:
+            results = await loop.run_in_executor(
+                self._executor, adapter.detect_batch, [item.frame for item in items], confidence_threshold
+            )
+            for item, detections in zip(items, results):
+                if not item.future.done():
+                    item.future.set_result(detections)
+            if len(results) != len(items):
+                raise RuntimeError(f"detect_batch returned {len(results)} results for {len(items)} frames")
+        except Exception as e:
+            logger.error(f"Batched {analysis_type} inference failed ({len(items)} frames): {e}")
+            for item in items:
+                if not item.future.done():
+                    item.future.set_exception(e)
+        self.metrics.record_batch(analysis_type, len(items), time.perf_counter() - start, waits)
+
+
+async def _read_body(receive) -> Optional[bytes]:
+    chunks, size = [], 0
+    while True:
+        message = await receive()
+        chunk = message.get('body', b'')
+        size += len(chunk)
+        if size > MAX_BODY_BYTES:
+            return None
+        chunks.append(chunk)
+        if not message.get('more_body'):
+            return b''.join(chunks)
+
+
+def _parse_request(body, content_type):
+    """(request fields, [(frame id, Frame)]) from a JSON or binary body"""
+    if content_type.startswith(CONTENT_TYPE):
+        metadata, frames = decode_payload(body)
+        return metadata, [(frame_meta.get('id', str(i)), frame) for i, (frame_meta, frame) in enumerate(frames)]
+
+    request = json.loads(body)
+    images = request.pop('frames', None)
+    if images is None:
+        images = [{'id': '0', 'image': request.pop('image')}]
+    frames = []
+    for i, entry in enumerate(images):
+        pixels = cv2.imdecode(np.frombuffer(base64.b64decode(entry['image']), dtype=np.uint8), cv2.IMREAD_COLOR)
+        if pixels is None:
+            raise ValueError(f"Cannot decode image {entry.get('id', i)}")
+        frames.append((str(entry.get('id', i)), Frame.from_bgr(pixels)))
+    return request, frames
+
+
+def _configured_providers() -> Dict[str, dict]:
+    providers = getattr(settings, 'AI_WORKER_PROVIDERS', '')
+    if not providers:
+        return dict(DEFAULT_PROVIDERS)
+    return json.loads(providers) if isinstance(providers, str) else dict(providers)
+
+
+def _gpu_available() -> bool:
+    try:
+        import torch
+        return torch.cuda.is_available()
+    except ImportError:
+        return False
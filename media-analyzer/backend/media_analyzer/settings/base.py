@@ -250,6 +250,77 @@ LOGO_DETECTION_CONFIG = {
     'use_cloud_vision': USE_CLOUD_VISION,
 }
 
+# Model pool: keep loaded models resident between segments (LRU eviction over budget)
+AI_MODEL_POOL_MEMORY_MB = int(os.getenv('AI_MODEL_POOL_MEMORY_MB', '4096'))
+
+# Cross-task micro-batching for CLIP/YOLO (max size 1 disables it).
+# Only useful with a threaded worker pool, e.g. `celery worker --pool=threads -c 8`
+AI_BATCH_MAX_SIZE = int(os.getenv('AI_BATCH_MAX_SIZE', '1'))
+AI_BATCH_MAX_WAIT_MS = float(os.getenv('AI_BATCH_MAX_WAIT_MS', '10'))
+AI_BATCH_RESULT_TIMEOUT = float(os.getenv('AI_BATCH_RESULT_TIMEOUT', '60'))
+
+# Frame sampling per segment: first, keyframes (keyframe-only decode), uniform or shots (at shot boundaries)
+AI_FRAME_SAMPLING_MODE = os.getenv('AI_FRAME_SAMPLING_MODE', 'first').lower()
+AI_FRAMES_PER_SEGMENT = int(os.getenv('AI_FRAMES_PER_SEGMENT', '1'))
+
+# Adaptive frames per segment (overrides AI_FRAMES_PER_SEGMENT): more on busy streams, fewer while
+# the segment event queue backs up. Full rate at AI_SAMPLING_ACTIVITY_HIGH (motion activity_score,
+# 0-10); backs off linearly from AI_SAMPLING_QUEUE_LOW to AI_SAMPLING_QUEUE_HIGH pending events
+AI_ADAPTIVE_SAMPLING = os.getenv('AI_ADAPTIVE_SAMPLING', 'false').lower() in ('true', '1', 'yes')
+AI_FRAMES_MIN = int(os.getenv('AI_FRAMES_MIN', '1'))
+AI_FRAMES_MAX = int(os.getenv('AI_FRAMES_MAX', '8'))
+AI_SAMPLING_ACTIVITY_HIGH = float(os.getenv('AI_SAMPLING_ACTIVITY_HIGH', '2.0'))
+AI_SAMPLING_QUEUE_LOW = int(os.getenv('AI_SAMPLING_QUEUE_LOW', '5'))
+AI_SAMPLING_QUEUE_HIGH = int(os.getenv('AI_SAMPLING_QUEUE_HIGH', '50'))
+AI_SAMPLING_SMOOTHING = float(os.getenv('AI_SAMPLING_SMOOTHING', '0.5'))
+
+# Near-duplicate frame dedup: max dHash Hamming distance (-1 disables) and reuse window in seconds
+AI_DEDUP_MAX_DISTANCE = int(os.getenv('AI_DEDUP_MAX_DISTANCE', '4'))
+AI_DEDUP_MAX_AGE = float(os.getenv('AI_DEDUP_MAX_AGE', '60'))
+
+# Visual property analysis (dominant colors: 'histogram' quantization or seeded 'kmeans' on a thumbnail)
+AI_VISUAL_ANALYSIS_ENABLED = os.getenv('AI_VISUAL_ANALYSIS_ENABLED', 'true').lower() in ('true', '1', 'yes')
+VISUAL_DOMINANT_COLOR_METHOD = os.getenv('VISUAL_DOMINANT_COLOR_METHOD', 'histogram').lower()
+
+# ONNX Runtime providers (local_clip_onnx, local_yolo_onnx): export cache and intra-op threads (0 = onnxruntime default)
+AI_ONNX_CACHE_DIR = os.getenv('AI_ONNX_CACHE_DIR', os.path.join(MEDIA_ROOT, 'onnx_cache'))
+AI_ONNX_INTRA_OP_THREADS = int(os.getenv('AI_ONNX_INTRA_OP_THREADS', '0'))
+
+# OCR (local_tesseract): tesserocr keeps an in-process Tesseract per thread, pytesseract is the fallback
+# Threads for OCR on text-region crops (0 = min(4, CPU count))
+AI_OCR_WORKERS = int(os.getenv('AI_OCR_WORKERS', '0'))
+
+# OCR result reuse for unchanged text regions: max age in seconds (0 disables), position grid in pixels
+# and the largest per-character signature difference still treated as unchanged
+AI_OCR_CACHE_MAX_AGE = float(os.getenv('AI_OCR_CACHE_MAX_AGE', '120'))
+AI_OCR_CACHE_GRID = int(os.getenv('AI_OCR_CACHE_GRID', '16'))
+AI_OCR_CACHE_MAX_DIFF = float(os.getenv('AI_OCR_CACHE_MAX_DIFF', '0.05'))
+
+# Pooled HTTP sessions to remote AI workers: connections kept per host, retries per request and
+# the retry budget (retries allowed per request, averaged) with full-jitter backoff base in seconds
+AI_HTTP_POOL_MAXSIZE = int(os.getenv('AI_HTTP_POOL_MAXSIZE', '32'))
+AI_HTTP_MAX_RETRIES = int(os.getenv('AI_HTTP_MAX_RETRIES', '2'))
+AI_HTTP_RETRY_BUDGET = float(os.getenv('AI_HTTP_RETRY_BUDGET', '0.1'))
+AI_HTTP_RETRY_BACKOFF = float(os.getenv('AI_HTTP_RETRY_BACKOFF', '0.1'))
+
+# Frame transport to remote AI workers: 'json' (base64 images) or 'binary' (length-prefixed frames with
+# msgpack metadata); frame encoding 'jpeg', 'webp' or 'raw' (BGR pixels downscaled to AI_WORKER_RAW_MAX_SIDE)
+AI_WORKER_TRANSPORT = os.getenv('AI_WORKER_TRANSPORT', 'json').lower()
+AI_WORKER_FRAME_ENCODING = os.getenv('AI_WORKER_FRAME_ENCODING', 'jpeg').lower()
+AI_WORKER_FRAME_QUALITY = int(os.getenv('AI_WORKER_FRAME_QUALITY', '85'))
+AI_WORKER_RAW_MAX_SIDE = int(os.getenv('AI_WORKER_RAW_MAX_SIDE', '640'))
+
+# AI worker server (manage.py run_ai_worker): providers as JSON {capability: provider config}
+# (empty = local CLIP, YOLO and Tesseract), queued work items, server-side batching and inference threads
+AI_WORKER_PROVIDERS = os.getenv('AI_WORKER_PROVIDERS', '')
+AI_WORKER_QUEUE_SIZE = int(os.getenv('AI_WORKER_QUEUE_SIZE', '256'))
+AI_WORKER_MAX_BATCH_SIZE = int(os.getenv('AI_WORKER_MAX_BATCH_SIZE', '16'))
+AI_WORKER_MAX_WAIT_MS = float(os.getenv('AI_WORKER_MAX_WAIT_MS', '10'))
+AI_WORKER_INFERENCE_THREADS = int(os.getenv('AI_WORKER_INFERENCE_THREADS', '1'))
+
+# Per-stream motion background models are dropped after this many idle seconds
+AI_MOTION_STATE_IDLE_TIMEOUT = float(os.getenv('AI_MOTION_STATE_IDLE_TIMEOUT', '120'))
+
 # Event Source Configuration
 SEGMENT_EVENT_SOURCE = os.getenv('SEGMENT_EVENT_SOURCE', 'filewatcher').lower()
 FILE_WATCHER_POLL_INTERVAL = float(os.getenv('FILE_WATCHER_POLL_INTERVAL', '1.0'))
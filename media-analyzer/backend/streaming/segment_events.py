@@ -91,4 +91,12 @@ class SegmentEventConsumer:
             return None
         except Exception as e:
             logger.error(f"Failed to peek at next event: {e}")
-            return None
\ No newline at end of file
+            return None
+    
+    def get_queue_length(self) -> int:
+        """Get current number of pending segment events"""
+        try:
+            return self.redis_client.llen(self.event_key)
+        except Exception as e:
+            logger.error(f"Failed to get queue length: {e}")
+            return 0
\ No newline at end of file
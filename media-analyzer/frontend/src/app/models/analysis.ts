@@ -19,6 +19,7 @@ export interface VisualAnalysis {
   brightness_level: number;
   contrast_level?: number;
   saturation_level?: number;
+  colorfulness?: number;
   activity_score?: number;
   scene_description?: string;
 }
@@ -31,6 +32,7 @@ export interface Analysis {
   processing_time?: number;
   analysis_type: string;
   frame_timestamp: number;
+  cached?: boolean;
   provider: string;
   detections: DetectionResult[];
   visual?: VisualAnalysis;